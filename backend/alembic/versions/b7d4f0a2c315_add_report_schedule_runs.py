@@ -0,0 +1,48 @@
+"""add_report_schedule_runs
+
+Revision ID: b7d4f0a2c315
+Revises: a6c3e9f1b024
+Create Date: 2026-10-19 18:03:52.660914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d4f0a2c315'
+down_revision: Union[str, None] = 'a6c3e9f1b024'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'report_schedule_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('schedule_id', sa.Integer(), nullable=False),
+        sa.Column('report_id', sa.Integer(), nullable=False),
+        sa.Column('source_report_id', sa.Integer(), nullable=False),
+        sa.Column('coalesce_key', sa.String(length=64), nullable=False),
+        sa.Column('scheduled_for', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('delivered_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['schedule_id'], ['report_schedules.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['report_id'], ['reports.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['source_report_id'], ['reports.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_report_schedule_runs_id'), 'report_schedule_runs', ['id'], unique=False)
+    op.create_index(op.f('ix_report_schedule_runs_schedule_id'), 'report_schedule_runs', ['schedule_id'], unique=False)
+    op.create_index('ix_report_schedule_runs_status', 'report_schedule_runs', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_report_schedule_runs_status', table_name='report_schedule_runs')
+    op.drop_index(op.f('ix_report_schedule_runs_schedule_id'), table_name='report_schedule_runs')
+    op.drop_index(op.f('ix_report_schedule_runs_id'), table_name='report_schedule_runs')
+    op.drop_table('report_schedule_runs')
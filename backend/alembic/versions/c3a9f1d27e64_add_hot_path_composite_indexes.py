@@ -0,0 +1,79 @@
+"""add_hot_path_composite_indexes
+
+Revision ID: c3a9f1d27e64
+Revises: b4ff712cb36a
+Create Date: 2026-10-19 09:12:41.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a9f1d27e64'
+down_revision: Union[str, None] = 'b4ff712cb36a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _partial(condition: str, sqlite_condition: Union[str, None] = None) -> dict:
+    """
+    Partial-index predicate for PostgreSQL and SQLite (ignored elsewhere).
+    SQLite only uses a partial index when the query's WHERE term matches the
+    predicate literally, and SQLAlchemy renders booleans there as 1/0.
+    """
+    return {
+        "postgresql_where": sa.text(condition),
+        "sqlite_where": sa.text(sqlite_condition or condition),
+    }
+
+
+def upgrade() -> None:
+    # Revenue / expense entries: listings scoped by creator and date range,
+    # and approved-only period totals and category summaries
+    for table in ('revenue_entries', 'expense_entries'):
+        op.create_index(f'ix_{table}_created_by_id_date', table, ['created_by_id', 'date'], unique=False)
+        op.create_index(f'ix_{table}_approved_date', table, ['date'], unique=False, **_partial('is_approved = true', 'is_approved = 1'))
+        op.create_index(f'ix_{table}_approved_created_by_id_date', table, ['created_by_id', 'date'], unique=False, **_partial('is_approved = true', 'is_approved = 1'))
+        op.create_index(f'ix_{table}_pending_created_at', table, ['created_at'], unique=False, **_partial('is_approved = false', 'is_approved = 0'))
+
+    # Notifications: per-user unread lists/counts ordered by recency, plus cleanup sweeps
+    op.create_index('ix_notifications_user_id_is_read_created_at', 'notifications', ['user_id', 'is_read', sa.text('created_at DESC')], unique=False)
+    op.create_index('ix_notifications_created_at', 'notifications', ['created_at'], unique=False)
+    op.create_index('ix_notifications_expires_at', 'notifications', ['expires_at'], unique=False, **_partial('expires_at IS NOT NULL'))
+
+    # Audit logs: newest-first listings, by user, by resource and by date range
+    op.create_index('ix_audit_logs_created_at', 'audit_logs', [sa.text('created_at DESC')], unique=False)
+    op.create_index('ix_audit_logs_user_id_created_at', 'audit_logs', ['user_id', sa.text('created_at DESC')], unique=False)
+    op.create_index('ix_audit_logs_resource', 'audit_logs', ['resource_type', 'resource_id', sa.text('created_at DESC')], unique=False)
+
+    # Approval workflows: pending queues per approver, requester history, entry lookups
+    op.create_index('ix_approval_workflows_pending_approver_id', 'approval_workflows', ['approver_id', 'created_at'], unique=False, **_partial("status = 'PENDING'"))
+    op.create_index('ix_approval_workflows_status_created_at', 'approval_workflows', ['status', 'created_at'], unique=False)
+    op.create_index('ix_approval_workflows_requester_id_created_at', 'approval_workflows', ['requester_id', 'created_at'], unique=False)
+    op.create_index('ix_approval_workflows_revenue_entry_id', 'approval_workflows', ['revenue_entry_id'], unique=False)
+    op.create_index('ix_approval_workflows_expense_entry_id', 'approval_workflows', ['expense_entry_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_approval_workflows_expense_entry_id', table_name='approval_workflows')
+    op.drop_index('ix_approval_workflows_revenue_entry_id', table_name='approval_workflows')
+    op.drop_index('ix_approval_workflows_requester_id_created_at', table_name='approval_workflows')
+    op.drop_index('ix_approval_workflows_status_created_at', table_name='approval_workflows')
+    op.drop_index('ix_approval_workflows_pending_approver_id', table_name='approval_workflows')
+
+    op.drop_index('ix_audit_logs_resource', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_user_id_created_at', table_name='audit_logs')
+    op.drop_index('ix_audit_logs_created_at', table_name='audit_logs')
+
+    op.drop_index('ix_notifications_expires_at', table_name='notifications')
+    op.drop_index('ix_notifications_created_at', table_name='notifications')
+    op.drop_index('ix_notifications_user_id_is_read_created_at', table_name='notifications')
+
+    for table in ('expense_entries', 'revenue_entries'):
+        op.drop_index(f'ix_{table}_pending_created_at', table_name=table)
+        op.drop_index(f'ix_{table}_approved_created_by_id_date', table_name=table)
+        op.drop_index(f'ix_{table}_approved_date', table_name=table)
+        op.drop_index(f'ix_{table}_created_by_id_date', table_name=table)
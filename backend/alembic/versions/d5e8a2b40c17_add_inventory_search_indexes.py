@@ -0,0 +1,29 @@
+"""add_inventory_search_indexes
+
+Revision ID: d5e8a2b40c17
+Revises: c3a9f1d27e64
+Create Date: 2026-10-19 11:04:27.390115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.utils.inventory_search import create_inventory_search_index, drop_inventory_search_index
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e8a2b40c17'
+down_revision: Union[str, None] = 'c3a9f1d27e64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keyset pagination indexes, plus pg_trgm GIN indexes on PostgreSQL or an FTS5
+    # trigram shadow table on SQLite (skipped when the build lacks it; search uses LIKE)
+    create_inventory_search_index(op.get_bind())
+
+
+def downgrade() -> None:
+    drop_inventory_search_index(op.get_bind())
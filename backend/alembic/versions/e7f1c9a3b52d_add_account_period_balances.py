@@ -0,0 +1,58 @@
+"""add_account_period_balances
+
+Revision ID: e7f1c9a3b52d
+Revises: d5e8a2b40c17
+Create Date: 2026-10-19 13:26:08.714552
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7f1c9a3b52d'
+down_revision: Union[str, None] = 'd5e8a2b40c17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'account_period_balances',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('account_id', sa.Integer(), nullable=False),
+        sa.Column('period', sa.Date(), nullable=False),
+        sa.Column('debit_total', sa.Float(), nullable=False, server_default='0.0'),
+        sa.Column('credit_total', sa.Float(), nullable=False, server_default='0.0'),
+        sa.Column('line_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('account_id', 'period', name='uq_account_period_balances_account_period')
+    )
+    op.create_index(op.f('ix_account_period_balances_id'), 'account_period_balances', ['id'], unique=False)
+    op.create_index(op.f('ix_account_period_balances_account_id'), 'account_period_balances', ['account_id'], unique=False)
+    op.create_index(op.f('ix_account_period_balances_period'), 'account_period_balances', ['period'], unique=False)
+
+    # Backfill from posted journal lines, by UTC month (as LedgerService.period_start)
+    if op.get_bind().dialect.name == 'sqlite':
+        month = "date(e.entry_date, 'start of month')"
+    else:
+        month = "CAST(date_trunc('month', e.entry_date AT TIME ZONE 'UTC') AS DATE)"
+    op.execute(f"""
+        INSERT INTO account_period_balances (account_id, period, debit_total, credit_total, line_count)
+        SELECT l.account_id, {month}, SUM(l.debit_amount), SUM(l.credit_amount), COUNT(l.id)
+        FROM accounting_journal_entry_lines l
+        JOIN accounting_journal_entries e ON e.id = l.journal_entry_id
+        WHERE e.status = 'POSTED'
+        GROUP BY l.account_id, {month}
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_account_period_balances_period'), table_name='account_period_balances')
+    op.drop_index(op.f('ix_account_period_balances_account_id'), table_name='account_period_balances')
+    op.drop_index(op.f('ix_account_period_balances_id'), table_name='account_period_balances')
+    op.drop_table('account_period_balances')
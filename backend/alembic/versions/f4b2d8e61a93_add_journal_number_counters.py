@@ -0,0 +1,33 @@
+"""add_journal_number_counters
+
+Revision ID: f4b2d8e61a93
+Revises: e7f1c9a3b52d
+Create Date: 2026-10-19 14:48:51.062337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b2d8e61a93'
+down_revision: Union[str, None] = 'e7f1c9a3b52d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # One row per numbering key (e.g. AUTO-20260115), locked by the UPDATE that issues numbers
+    op.create_table(
+        'journal_number_counters',
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('last_value', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('journal_number_counters')
@@ -1,8 +1,7 @@
-from typing import List, Any
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Any, Optional
+from datetime import datetime, date
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
 from ...core.database import get_db
 from ...api import deps
@@ -11,6 +10,8 @@ from ...models.account import Account, AccountType
 from ...models.journal_entry import AccountingJournalEntry, JournalEntryLine, JournalEntryStatus
 from ...schemas import account as account_schema
 from ...schemas import journal_entry as journal_entry_schema
+from ...services.ledger import ledger_service
+from ...services.numbering import numbering_service
 
 router = APIRouter()
 
@@ -57,6 +58,56 @@ def create_account(
     db.refresh(db_account)
     return db_account
 
+@router.get("/accounts/{account_id}/ledger", response_model=account_schema.AccountLedger)
+def get_account_ledger(
+    account_id: int,
+    start_date: Optional[date] = Query(None, description="Defaults to the first day of the end date's month"),
+    end_date: Optional[date] = Query(None, description="Defaults to today"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.require_min_role(UserRole.ACCOUNTANT))
+):
+    """
+    Posted lines for an account in a date range, with opening, running and closing balances.
+    """
+    account = db.query(Account).filter(Account.id == account_id).first()
+    if not account:
+        raise HTTPException(status_code=404, detail="Account not found")
+
+    end_date = end_date or date.today()
+    start_date = start_date or end_date.replace(day=1)
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must be on or before end_date")
+
+    return ledger_service.account_ledger(db, account, start_date, end_date, skip=skip, limit=limit)
+
+# ------------------------------------------------------------------
+# Balances
+# ------------------------------------------------------------------
+
+@router.get("/trial-balance", response_model=account_schema.TrialBalance)
+def get_trial_balance(
+    as_of: Optional[date] = Query(None, description="Include entries dated on or before this day (defaults to today)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.require_min_role(UserRole.ACCOUNTANT))
+):
+    """
+    Trial balance from the per-period account balance snapshots.
+    """
+    return ledger_service.trial_balance(db, as_of)
+
+@router.post("/balances/rebuild")
+def rebuild_account_balances(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.require_min_role(UserRole.ADMIN))
+):
+    """
+    Recompute the account balance snapshots from posted journal lines.
+    """
+    count = ledger_service.rebuild_balances(db)
+    return {"message": "Account balances rebuilt", "periods": count}
+
 # ------------------------------------------------------------------
 # Journal Entries
 # ------------------------------------------------------------------
@@ -93,9 +144,7 @@ def create_journal_entry(
     Create a new journal entry (Draft).
     """
     # Generate Entry Number
-    today_str = datetime.now().strftime("%Y%m%d")
-    count = db.query(func.count(AccountingJournalEntry.id)).scalar() or 0
-    entry_number = f"JE-{today_str}-{count + 1:04d}"
+    entry_number = numbering_service.next_entry_number(db, "JE")
     
     # Create Header
     db_entry = AccountingJournalEntry(
@@ -144,6 +193,7 @@ def post_journal_entry(
     entry.status = JournalEntryStatus.POSTED
     entry.posted_at = datetime.utcnow()
     entry.posted_by_id = current_user.id
+    ledger_service.apply_entry(db, entry)
     
     db.commit()
     db.refresh(entry)
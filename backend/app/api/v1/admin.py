@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks # type: ignore[import-untyped]
+from fastapi.responses import JSONResponse, PlainTextResponse # type: ignore[import-untyped]
 from sqlalchemy.orm import Session # type: ignore[import-untyped]
 from sqlalchemy import text, and_, desc # type: ignore[import-untyped]
 from sqlalchemy.exc import IntegrityError # type: ignore[import-untyped]
@@ -20,7 +21,9 @@ from ...crud.expense import expense as expense_crud
 from ...crud.approval import approval as approval_crud
 from ...models.user import User, UserRole
 from ...api.deps import get_current_active_user, require_min_role
-from ...services.backup import BackupService
+from ...services.backup import BackupService, BackupVerificationError
+from ...core.profiling import list_profiles, load_profile, delete_profile
+from ...services.hierarchy import HierarchyService
 from ...services.email import EmailService
 from ...schemas.user import RoleCreate, RoleUpdate, RoleOut, RoleWithStats
 
@@ -87,42 +90,38 @@ def get_hierarchy(
     db: Session = Depends(get_db)
 ):
     """Get organizational hierarchy"""
-    # Build hierarchy tree
-    all_users = db.query(User).filter(User.is_active == True).all()
+    # Build hierarchy tree from the cached adjacency index (no per-user queries)
+    index = HierarchyService.get_index(db)
     
-    hierarchy = []
-    for user in all_users:
+    nodes = {}
+    for user_id, info in index.users.items():
+        if not info["is_active"]:
+            continue
+        manager_id = index.parent.get(user_id)
         manager_name = None
-        if user.manager_id:
-            manager = db.query(User).filter(User.id == user.manager_id).first()
-            if manager:
-                manager_name = manager.full_name or manager.username
+        if manager_id in index.users:
+            manager = index.users[manager_id]
+            manager_name = manager["full_name"] or manager["username"]
         
-        hierarchy.append({
-            "id": user.id,
-            "name": user.full_name or user.username,
-            "email": user.email,
-            "role": user.role.value,
-            "manager_id": user.manager_id,
+        nodes[user_id] = {
+            "id": user_id,
+            "name": info["full_name"] or info["username"],
+            "email": info["email"],
+            "role": info["role"],
+            "manager_id": manager_id,
             "manager_name": manager_name,
-            "department": user.department,
+            "department": info["department"],
             "subordinates": []
-        })
-    
-    # Build tree structure
-    def build_tree(users_list, manager_id=None):
-        children = []
-        for user in users_list:
-            if user["manager_id"] == manager_id:
-                user["subordinates"] = build_tree(users_list, user["id"])
-                children.append(user)
-        return children
+        }
     
-    tree = build_tree(hierarchy, None)
+    # Attach each node to its manager; users under inactive managers stay out of the tree
+    for node in nodes.values():
+        node["subordinates"] = [nodes[child] for child in index.children.get(node["id"], ()) if child in nodes]
+    tree = [node for node in nodes.values() if node["manager_id"] is None]
     
     return {
         "hierarchy": tree,
-        "flat_list": hierarchy
+        "flat_list": list(nodes.values())
     }
 
 
@@ -555,12 +554,23 @@ def list_backups(
 @router.post("/backup/restore")
 def restore_backup(
     backup_name: str,
+    tables: Optional[List[str]] = Query(None, description="Restore only these tables' data"),
+    verify_only: bool = Query(False, description="Check the backup's checksums without restoring"),
     current_user: User = Depends(require_min_role(UserRole.ADMIN)),
     db: Session = Depends(get_db)
 ):
     """Restore from backup (admin, finance_admin, or super_admin only)"""
     # This is a dangerous operation - should require additional confirmation
-    result = BackupService.restore_backup(backup_name)
+    try:
+        result = BackupService.restore_backup(backup_name, tables=tables, verify_only=verify_only)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except BackupVerificationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if verify_only:
+        return {"message": f"Backup verified: {result}"}
     return {"message": f"Backup restore completed: {result}"}
 
 
@@ -697,6 +707,56 @@ def broadcast_system_notification(
     }
 
 
+@router.get("/profiles")
+def get_request_profiles(
+    current_user: User = Depends(require_min_role(UserRole.ADMIN))
+):
+    """
+    List stored request profiles, newest first (admin or super_admin only).
+    Profile a request by sending it with the "X-Profile: 1" header or "?profile=1" as an admin.
+    """
+    return {"profiles": list_profiles()}
+
+
+@router.get("/profiles/{profile_id}")
+def get_request_profile(
+    profile_id: str,
+    download: bool = Query(False, description="Return as a JSON file attachment"),
+    current_user: User = Depends(require_min_role(UserRole.ADMIN))
+):
+    """Full request profile: hot functions, SQL statements with timings and N+1 candidates"""
+    profile = load_profile(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    headers = {"Content-Disposition": f'attachment; filename="profile-{profile_id}.json"'} if download else None
+    return JSONResponse(content=profile, headers=headers)
+
+
+@router.get("/profiles/{profile_id}/flamegraph", response_class=PlainTextResponse)
+def get_request_profile_flamegraph(
+    profile_id: str,
+    current_user: User = Depends(require_min_role(UserRole.ADMIN))
+):
+    """Collapsed stacks of a profile, for flamegraph.pl or speedscope"""
+    profile = load_profile(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(
+        profile["collapsed_stacks"],
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'}
+    )
+
+
+@router.delete("/profiles/{profile_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_request_profile(
+    profile_id: str,
+    current_user: User = Depends(require_min_role(UserRole.ADMIN))
+):
+    """Delete a stored request profile"""
+    if not delete_profile(profile_id):
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+
 @router.get("/health")
 def system_health_check(
     current_user: User = Depends(require_min_role(UserRole.ADMIN)),
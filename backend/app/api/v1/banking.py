@@ -63,6 +63,27 @@ async def upload_bank_statement(
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to process CSV: {str(e)}")
 
+@router.post("/import-statement", response_model=banking_schema.StatementImportResult)
+def import_bank_statement(
+    bank_account_id: int = Form(...),
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.require_min_role(UserRole.ACCOUNTANT))
+):
+    """
+    Bulk-import a CSV bank statement.
+    The file is streamed and parsed in batches; lines already on record for the
+    account are skipped and invalid lines are reported instead of aborting the import.
+    """
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="Only CSV files are supported")
+
+    try:
+        return banking_service.import_statement(db, bank_account_id, file.file)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Failed to import statement: {str(e)}")
+
 @router.get("/transactions", response_model=List[banking_schema.BankTransaction])
 def get_transactions(
     bank_account_id: int,
@@ -76,6 +97,32 @@ def get_transactions(
         BankTransaction.bank_account_id == bank_account_id
     ).offset(skip).limit(limit).all()
 
+# ------------------------------------------------------------------
+# Reconciliation
+# ------------------------------------------------------------------
+
+@router.post("/reconcile", response_model=banking_schema.ReconciliationResult)
+def reconcile_transactions(
+    request: banking_schema.ReconciliationRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.require_min_role(UserRole.ACCOUNTANT))
+):
+    """
+    Batch-reconcile pending bank transactions in a date window against posted journal entries.
+    Each journal entry is matched to at most one transaction.
+    """
+    if request.end_date < request.start_date:
+        raise HTTPException(status_code=400, detail="end_date must be on or after start_date")
+
+    return banking_service.reconcile_batch(
+        db,
+        start_date=request.start_date,
+        end_date=request.end_date,
+        bank_account_id=request.bank_account_id,
+        amount_tolerance=request.amount_tolerance,
+        date_tolerance_days=request.date_tolerance_days
+    )
+
 # ------------------------------------------------------------------
 # Simulation & Automation
 # ------------------------------------------------------------------
@@ -11,6 +11,9 @@ from ...crud.user import user as user_crud
 from ...crud.approval import approval as approval_crud
 from ...models.user import User, UserRole
 from ...api.deps import get_current_active_user
+from ...models.revenue import RevenueEntry
+from ...models.expense import ExpenseEntry
+from ...services.currency import currency_service
 
 logger = logging.getLogger(__name__)
 
@@ -451,6 +454,34 @@ def get_kpi_metrics(
         )
 
 
+@router.get("/consolidated")
+def get_consolidated_totals(
+    period: str = Query("month", regex="^(week|month|quarter|year)$"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Approved revenue, expenses and profit for a period consolidated into the base currency"""
+    if current_user.role not in [UserRole.ADMIN, UserRole.SUPER_ADMIN, UserRole.MANAGER]:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    days = {"week": 7, "month": 30, "quarter": 90, "year": 365}[period]
+    end_date = datetime.utcnow()
+    start_date = end_date - timedelta(days=days)
+    
+    revenue = currency_service.consolidated_total(db, RevenueEntry, start_date, end_date)
+    expenses = currency_service.consolidated_total(db, ExpenseEntry, start_date, end_date)
+    
+    return {
+        "period": period,
+        "start_date": start_date,
+        "end_date": end_date,
+        "base_currency": revenue["base_currency"],
+        "revenue": revenue,
+        "expenses": expenses,
+        "profit": round(revenue["total"] - expenses["total"], 2)
+    }
+
+
 @router.get("/recent-activity")
 def get_recent_activity(
     limit: int = Query(10, le=50),
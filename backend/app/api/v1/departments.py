@@ -10,6 +10,7 @@ from ...models.user import User, UserRole
 from ...models.department import Department
 from ...api.deps import get_current_active_user, require_min_role
 from ...core.security import verify_password
+from ...services.department import department_service
 
 logger = logging.getLogger(__name__)
 
@@ -22,34 +23,7 @@ def get_departments(
     db: Session = Depends(get_db)
 ):
     """Get all departments - returns unique departments from users"""
-    # Extract unique departments from users
-    departments = db.query(User.department).filter(
-        User.department.isnot(None),
-        User.department != ""
-    ).distinct().all()
-    
-    # Format response
-    result = []
-    for (dept,) in departments:
-        user_count = db.query(User).filter(
-            User.department == dept,
-            User.is_active == True
-        ).count()
-        
-        # Try to get department metadata (description) from Department table
-        dept_metadata = db.query(Department).filter(Department.name == dept).first()
-        description = dept_metadata.description if dept_metadata else f"{dept} department"
-        
-        result.append({
-            "id": dept.lower().replace(" ", "_"),
-            "name": dept,
-            "description": description,
-            "user_count": user_count,
-            "created_at": dept_metadata.created_at.isoformat() if dept_metadata and dept_metadata.created_at else None,
-            "updated_at": dept_metadata.updated_at.isoformat() if dept_metadata and dept_metadata.updated_at else None
-        })
-    
-    return result
+    return department_service.get_departments(db)
 
 
 @router.get("/{department_id}")
@@ -62,69 +36,32 @@ def get_department(
     # Decode URL-encoded department ID
     decoded_id = unquote(department_id)
     
-    # Try multiple formats to match department name
-    # Format 1: Replace underscores with spaces and title case
-    dept_name_v1 = decoded_id.replace("_", " ").title()
-    # Format 2: Replace underscores with spaces and keep original case
-    dept_name_v2 = decoded_id.replace("_", " ")
-    # Format 3: Try exact match with decoded ID
-    dept_name_v3 = decoded_id
-    
-    # First, try to find the department by checking all unique department names
-    all_departments = db.query(User.department).filter(
-        User.department.isnot(None),
-        User.department != ""
-    ).distinct().all()
-    
-    # Find matching department name (case-insensitive)
-    matching_dept_name = None
-    for (dept,) in all_departments:
-        if dept and (
-            dept.lower() == dept_name_v1.lower() or
-            dept.lower() == dept_name_v2.lower() or
-            dept.lower() == dept_name_v3.lower() or
-            dept.lower().replace(" ", "_") == decoded_id.lower()
-        ):
-            matching_dept_name = dept
-            break
-    
-    if not matching_dept_name:
+    summary = department_service.find_department(db, decoded_id)
+    if not summary:
         # Log available departments for debugging
-        available_depts = [dept for (dept,) in all_departments if dept]
+        available_depts = [d["name"] for d in department_service.get_departments(db)]
         logger.warning(f"Department not found. ID: {department_id}, Decoded: {decoded_id}, Available: {available_depts}")
         raise HTTPException(
             status_code=404, 
             detail=f"Department not found. The department '{decoded_id}' does not exist or has no users."
         )
     
-    # Get users with the matching department name
-    users = db.query(User).filter(
-        User.department == matching_dept_name,
-        User.is_active == True
-    ).all()
-    
+    users = department_service.get_active_users(db, summary["name"])
     if not users:
-        logger.warning(f"Department '{matching_dept_name}' exists but has no active users")
+        logger.warning(f"Department '{summary['name']}' exists but has no active users")
         raise HTTPException(
             status_code=404, 
-            detail=f"Department '{matching_dept_name}' has no active users."
+            detail=f"Department '{summary['name']}' has no active users."
         )
     
-    # Generate the ID from the actual department name (consistent with list endpoint)
-    dept_id = matching_dept_name.lower().replace(" ", "_")
-    
-    # Try to get department metadata (description) from Department table
-    dept_metadata = db.query(Department).filter(Department.name == matching_dept_name).first()
-    description = dept_metadata.description if dept_metadata else f"{matching_dept_name} department"
-    
     return {
-        "id": dept_id,
-        "name": matching_dept_name,
-        "description": description,
+        "id": summary["id"],
+        "name": summary["name"],
+        "description": summary["description"],
         "user_count": len(users),
-        "users": [{"id": u.id, "name": u.full_name or u.username, "email": u.email} for u in users],
-        "created_at": dept_metadata.created_at.isoformat() if dept_metadata and dept_metadata.created_at else None,
-        "updated_at": dept_metadata.updated_at.isoformat() if dept_metadata and dept_metadata.updated_at else None
+        "users": users,
+        "created_at": summary["created_at"],
+        "updated_at": summary["updated_at"]
     }
 
 
@@ -1,6 +1,8 @@
+from typing import List
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from ...core.config import settings
 from ...services.ocr import ocr_service
-from ...schemas.ocr import AnalyzedDocument
+from ...schemas.ocr import AnalyzedDocument, OCRBatchAccepted, OCRJobStatus
 from ...models.user import User, UserRole
 from ...api import deps
 
@@ -25,3 +27,56 @@ async def analyze_document(
         raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to analyze document")
+
+
+def _is_supported_upload(file: UploadFile) -> bool:
+    content_type = file.content_type or ""
+    return content_type.startswith('image/') or content_type == 'application/pdf'
+
+
+@router.post("/analyze-batch", response_model=OCRBatchAccepted, status_code=202)
+async def analyze_documents_batch(
+    files: List[UploadFile] = File(...),
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """
+    Queue many receipts/invoices for OCR and return a job id immediately.
+    Poll GET /documents/jobs/{job_id} for progress and results.
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="No files uploaded")
+    if len(files) > settings.OCR_MAX_BATCH_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files. At most {settings.OCR_MAX_BATCH_FILES} documents per batch."
+        )
+    invalid = [f.filename for f in files if not _is_supported_upload(f)]
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file type for: {', '.join(name or 'unknown' for name in invalid)}. Please upload images or PDFs."
+        )
+
+    # Uploads are read now: the request's temporary files are closed once this handler returns
+    payload = [(f.filename or "unknown", await f.read()) for f in files]
+    try:
+        job = ocr_service.submit_batch(payload, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return OCRBatchAccepted(job_id=job["job_id"], status=job["status"], total=job["total"])
+
+
+@router.get("/jobs/{job_id}", response_model=OCRJobStatus)
+async def get_document_job(
+    job_id: str,
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """
+    Progress and results of a batch OCR job. Results are listed in upload order
+    (null while a document is still being processed).
+    """
+    job = ocr_service.get_job(job_id)
+    is_admin = current_user.role in [UserRole.ADMIN, UserRole.SUPER_ADMIN]
+    if not job or (job["user_id"] != current_user.id and not is_admin):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return OCRJobStatus(**{k: v for k, v in job.items() if k in OCRJobStatus.model_fields})
@@ -35,6 +35,19 @@ def create_fixed_asset(
     """
     return crud.create(db, obj_in=asset_in, created_by_id=current_user.id)
 
+@router.post("/depreciation-run", response_model=schemas.DepreciationRunResult)
+def run_period_depreciation(
+    *,
+    db: Session = Depends(get_db),
+    run_in: schemas.DepreciationRunRequest,
+    current_user: User = Depends(deps.require_min_role(UserRole.ACCOUNTANT))
+):
+    """
+    Run month-end depreciation for all active fixed assets.
+    Assets already depreciated for the month are skipped.
+    """
+    return fixed_asset_service.run_period_depreciation(db, period=run_in.period, current_user_id=current_user.id)
+
 @router.get("/{asset_id}", response_model=schemas.FixedAsset)
 def read_fixed_asset(
     *,
@@ -7,7 +7,7 @@ Role-based access control:
 - Employee: Can view items (name, selling_price, stock) and make sales
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
-from fastapi import Request # type: ignore[import-untyped]
+from fastapi import Request, Response # type: ignore[import-untyped]
 from sqlalchemy.orm import Session # type: ignore[import-untyped]
 from typing import List, Optional
 from datetime import datetime
@@ -16,7 +16,7 @@ import logging
 from ...core.database import get_db
 from ...api.deps import get_current_active_user
 from ...models.user import User, UserRole
-from ...crud.inventory import inventory as inventory_crud
+from ...crud.inventory import inventory as inventory_crud, encode_cursor
 from ...crud.user import user as user_crud
 from ...schemas.inventory import (
     InventoryItemCreate, InventoryItemUpdate, InventoryItemOut, 
@@ -186,11 +186,13 @@ def create_inventory_item(
 
 @router.get("/items", response_model=List[InventoryItemOut])
 def get_inventory_items(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     category: Optional[str] = Query(None),
     is_active: Optional[bool] = Query(None),
     search: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from the X-Next-Cursor header of the previous page"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -248,18 +250,18 @@ def get_inventory_items(
         # Other roles: See only their own items
         user_ids = [current_user.id]
     
-    # Get all items first (we'll filter by user_ids if needed)
-    all_items = inventory_crud.get_multi(
-        db, skip=0, limit=10000,  # Get all items, we'll filter and paginate after
-        category=category, is_active=is_active, search=search
-    )
-    
-    # Filter items by user_ids if specified
-    if user_ids is not None:
-        all_items = [item for item in all_items if item.created_by_id in user_ids]
+    # Visibility is applied in SQL (user_ids None = all items)
+    try:
+        items = inventory_crud.get_multi(
+            db, skip=skip, limit=limit,
+            category=category, is_active=is_active, search=search,
+            created_by_ids=user_ids, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Apply pagination after filtering
-    items = all_items[skip:skip + limit]
+    if len(items) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(items[-1])
     
     # Filter items based on role (field visibility)
     result = []
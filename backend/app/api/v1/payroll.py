@@ -84,6 +84,30 @@ def generate_payslips(
         raise HTTPException(status_code=400, detail="Could not generate payslips. Period might not be in DRAFT status.")
     return period
 
+@router.post("/periods/{period_id}/run", response_model=schemas.PayrollPeriod)
+def run_payroll(
+    period_id: int,
+    run_in: schemas.PayrollRunRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.require_min_role(UserRole.FINANCE_ADMIN))
+):
+    """
+    Run payroll for a DRAFT period with a chosen tax table and per-employee adjustments.
+    Re-running replaces the period's existing payslips.
+    """
+    try:
+        period = payroll_service.run_payroll(
+            db,
+            period_id,
+            tax_table=run_in.tax_table,
+            adjustments={emp_id: adj.dict() for emp_id, adj in run_in.adjustments.items()}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not period:
+        raise HTTPException(status_code=400, detail="Could not run payroll. Period might not be in DRAFT status.")
+    return period
+
 @router.post("/periods/{period_id}/approve", response_model=schemas.PayrollPeriod)
 def approve_payroll(
     period_id: int,
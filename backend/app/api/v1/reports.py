@@ -1,20 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks # type: ignore[import-untyped]
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request # type: ignore[import-untyped]
 from sqlalchemy.orm import Session # type: ignore[import-untyped]
 from typing import List, Optional
 from datetime import datetime, timedelta
+import os
 
+from ...core.config import settings
 from ...core.database import get_db
 from ...crud.report import report as report_crud
 from ...crud.user import user as user_crud
-from ...schemas.report import ReportCreate, ReportUpdate, ReportOut
+from ...schemas.report import ReportCreate, ReportUpdate, ReportOut, ReportJobOut
 from ...models.user import User, UserRole
 from ...models.report import ReportType, ReportStatus
+from ...models.report_job import ReportJobStatus
 from ...api.deps import get_current_active_user, require_min_role
-from ...services.report import ReportService
+from ...services.report_queue import report_queue
+from ...utils.file_download import file_download_response
 
 router = APIRouter()
 
 
+def _check_queue_capacity(db: Session, user_id: int) -> None:
+    """Refuse new report work once the user has REPORT_MAX_QUEUED_PER_USER reports pending"""
+    if report_queue.active_jobs(db, user_id) >= settings.REPORT_MAX_QUEUED_PER_USER:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many reports are already being generated; try again when some have finished"
+        )
+
+
 @router.get("/", response_model=List[ReportOut])
 def read_reports(
     skip: int = 0,
@@ -113,7 +126,6 @@ def read_report(
 @router.post("/", response_model=ReportOut)
 def create_report(
     report_data: ReportCreate,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -122,10 +134,11 @@ def create_report(
     if report_data.type in [ReportType.AUDIT_REPORT] and current_user.role not in [UserRole.ADMIN, UserRole.SUPER_ADMIN]:
         raise HTTPException(status_code=403, detail="Not enough permissions for this report type")
     
+    _check_queue_capacity(db, current_user.id)
     report = report_crud.create(db, obj_in=report_data, created_by_id=current_user.id)
     
-    # Add background task to generate report
-    background_tasks.add_task(ReportService.generate_report, report.id)
+    # Generated by the report queue workers
+    report_queue.enqueue(db, report)
     
     return report
 
@@ -174,13 +187,8 @@ def delete_report(
     return {"message": "Report deleted successfully"}
 
 
-@router.post("/{report_id}/download")
-def download_report(
-    report_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
-):
-    """Download report file and increment download count"""
+def _get_downloadable_report(db: Session, report_id: int, current_user: User):
+    """Completed report the user may download (404/403/400 otherwise)"""
     report = report_crud.get(db, id=report_id)
     if report is None:
         raise HTTPException(status_code=404, detail="Report not found")
@@ -202,16 +210,54 @@ def download_report(
     if not report.file_url:
         raise HTTPException(status_code=400, detail="Report file not available")
     
-    # Increment download count
-    report_crud.increment_download(db, report_id)
+    return report
+
+
+def _download_filename(report) -> str:
+    extension = os.path.splitext(report.file_url)[1] or ".json"
+    return f"{report.title}_{report.id}{extension}"
+
+
+@router.post("/{report_id}/download")
+def download_report(
+    report_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get the download link of a report file (the download itself is counted by GET /{report_id}/file)"""
+    report = _get_downloadable_report(db, report_id, current_user)
     
     return {
-        "download_url": report.file_url,
+        "download_url": f"/api/v1/reports/{report.id}/file",
         "file_size": report.file_size,
-        "filename": f"{report.title}_{report.id}.pdf"
+        "filename": _download_filename(report)
     }
 
 
+@router.get("/{report_id}/file")
+def get_report_file(
+    report_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream the report file. Supports ``Range`` requests, ``If-None-Match`` (ETag is the
+    content hash) and a pre-compressed gzip variant for clients sending ``Accept-Encoding: gzip``.
+    """
+    report = _get_downloadable_report(db, report_id, current_user)
+    if not os.path.isfile(report.file_url):
+        raise HTTPException(status_code=404, detail="Report file not found")
+    
+    response = file_download_response(request, report.file_url, _download_filename(report), "application/json")
+    
+    # Count full downloads (and the first chunk of ranged ones), not revalidations
+    if response.status_code == 200 or (response.status_code == 206 and response.headers["content-range"].startswith("bytes 0-")):
+        report_crud.increment_download(db, report_id)
+    
+    return response
+
+
 @router.get("/types/available")
 def get_available_report_types(
     current_user: User = Depends(get_current_active_user)
@@ -240,7 +286,6 @@ def get_available_report_types(
 @router.post("/{report_id}/regenerate")
 def regenerate_report(
     report_id: int,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -257,8 +302,50 @@ def regenerate_report(
     if report.status == ReportStatus.GENERATING:
         raise HTTPException(status_code=400, detail="Report is already being generated")
     
+    _check_queue_capacity(db, report.created_by_id)
+    
     # Reset status and regenerate
     report_crud.update(db, db_obj=report, obj_in=ReportUpdate(status=ReportStatus.GENERATING))
-    background_tasks.add_task(ReportService.generate_report, report.id)
+    report_queue.enqueue(db, report)
     
     return {"message": "Report regeneration started"}
+
+
+@router.get("/{report_id}/progress", response_model=ReportJobOut)
+def get_report_progress(
+    report_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get the generation progress of a report"""
+    # Same visibility rules as reading the report
+    read_report(report_id, current_user, db)
+    
+    job = report_queue.get_job(db, report_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Report has no generation job")
+    return job
+
+
+@router.post("/{report_id}/cancel", response_model=ReportJobOut)
+def cancel_report(
+    report_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Cancel a queued or running report"""
+    report = report_crud.get(db, id=report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+    
+    # Check permissions
+    if current_user.role not in [UserRole.ADMIN, UserRole.SUPER_ADMIN]:
+        if report.created_by_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    job = report_queue.cancel(db, report_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Report has no generation job")
+    if job.status in (ReportJobStatus.COMPLETED.value, ReportJobStatus.FAILED.value):
+        raise HTTPException(status_code=400, detail=f"Report generation already {job.status}")
+    return job
@@ -22,12 +22,13 @@ from ...crud.sale import sale as sale_crud
 from ...crud.inventory import inventory as inventory_crud
 from ...schemas.sale import (
     SaleCreate, SaleOut, SalePostRequest, JournalEntryOut, 
-    SalesSummaryOut, ReceiptOut
+    SalesSummaryOut, ReceiptOut, SaleBatchPostRequest, SaleBatchPostResult
 )
 from ...utils.audit import AuditLogger, AuditAction
 from ...api.v1.auth import get_client_info
 from ...services.ml_auto_learn import record_new_data, trigger_auto_learn_background
 from ...services.invoice_service import invoice_service
+from ...services.currency import currency_service
 
 router = APIRouter()
 
@@ -317,6 +318,70 @@ def get_sale(
         )
 
 
+def _sale_posting_scope(db: Session, current_user: User) -> Optional[List[int]]:
+    """
+    Seller ids whose sales the user may post (None = all sellers).
+    Raises 403 for roles that cannot post sales at all.
+    """
+    # Admin and Super Admin can approve all sales
+    if current_user.role in [UserRole.ADMIN, UserRole.SUPER_ADMIN]:
+        return None
+    # Finance Admin/Manager can approve their own sales and their subordinates' sales
+    if current_user.role in [UserRole.FINANCE_ADMIN, UserRole.MANAGER]:
+        from ...crud.user import user as user_crud
+        try:
+            # Get all subordinates (accountants and employees)
+            subordinates = user_crud.get_hierarchy(db, current_user.id)
+            subordinate_ids = [sub.id for sub in subordinates]
+        except Exception as e:
+            logger.error(f"Error fetching subordinates for user {current_user.id}: {str(e)}", exc_info=True)
+            subordinate_ids = []
+        subordinate_ids.append(current_user.id)  # Include themselves
+        return subordinate_ids
+    # Accountant can approve sales from Finance Admin, Manager, and Employee for revenue posting
+    if current_user.role == UserRole.ACCOUNTANT:
+        # Narrow down allowed sales to only their manager and manager's other subordinates (employees)
+        # This prevents accountants from seeing/approving sales from unrelated Finance Admins
+        manager_id = current_user.manager_id
+        if not manager_id:
+            raise HTTPException(
+                status_code=403,
+                detail="Accountants must have a manager assigned to approve sales."
+            )
+        
+        # Use user_crud.get_hierarchy to find eligible subordinates of the same manager
+        try:
+            from ...crud.user import user as user_crud
+            subordinates = user_crud.get_hierarchy(db, manager_id)
+            employee_ids = [sub.id for sub in subordinates if sub.role == UserRole.EMPLOYEE]
+            return [manager_id] + employee_ids
+        except Exception as e:
+            logger.error(f"Error fetching hierarchy for Accountant's manager: {str(e)}")
+            return [manager_id]
+    # Other roles cannot approve sales
+    raise HTTPException(
+        status_code=403,
+        detail="Only accountants, finance admins, managers, or admins can post sales to ledger"
+    )
+
+
+def _sale_posting_denial(current_user: User, sold_by_id: int, scope: Optional[List[int]]) -> Optional[str]:
+    """Reason the user may not post a sale by ``sold_by_id`` (None if allowed)"""
+    if scope is None:
+        return None
+    if current_user.role == UserRole.ACCOUNTANT:
+        # Accountant cannot approve their own sales
+        if sold_by_id == current_user.id:
+            return "Accountants cannot approve their own sales. Only sales from their Finance Admin and departmental Employees can be approved."
+        # Check if sale was made by an allowed user (manager or manager's employee)
+        if sold_by_id not in scope:
+            return "You can only approve sales made by your manager (Finance Admin) or departmental employees. Access to other Finance Admins' sales is restricted."
+        return None
+    if sold_by_id not in scope:
+        return "You can only approve sales made by yourself or your subordinates (accountants and employees)"
+    return None
+
+
 @router.post("/{sale_id}/post", response_model=SaleOut)
 def post_sale(
     sale_id: int,
@@ -347,66 +412,10 @@ def post_sale(
         
         sold_by_id = sale.sold_by_id
         
-        # Admin and Super Admin can approve all sales
-        if current_user.role in [UserRole.ADMIN, UserRole.SUPER_ADMIN]:
-            pass  # Allow all sales
-        # Finance Admin/Manager can approve their own sales and their subordinates' sales
-        elif current_user.role in [UserRole.FINANCE_ADMIN, UserRole.MANAGER]:
-            from ...crud.user import user as user_crud
-            try:
-                # Get all subordinates (accountants and employees)
-                subordinates = user_crud.get_hierarchy(db, current_user.id)
-                subordinate_ids = [sub.id for sub in subordinates]
-            except Exception as e:
-                logger.error(f"Error fetching subordinates for user {current_user.id}: {str(e)}", exc_info=True)
-                subordinate_ids = []
-            subordinate_ids.append(current_user.id)  # Include themselves
-            
-            if sold_by_id not in subordinate_ids:
-                raise HTTPException(
-                    status_code=403,
-                    detail="You can only approve sales made by yourself or your subordinates (accountants and employees)"
-                )
-        # Accountant can approve sales from Finance Admin, Manager, and Employee for revenue posting
-        elif current_user.role == UserRole.ACCOUNTANT:
-            # Narrow down allowed sales to only their manager and manager's other subordinates (employees)
-            # This prevents accountants from seeing/approving sales from unrelated Finance Admins
-            manager_id = current_user.manager_id
-            if not manager_id:
-                raise HTTPException(
-                    status_code=403,
-                    detail="Accountants must have a manager assigned to approve sales."
-                )
-            
-            # Use user_crud.get_hierarchy to find eligible subordinates of the same manager
-            try:
-                from ...crud.user import user as user_crud
-                subordinates = user_crud.get_hierarchy(db, manager_id)
-                employee_ids = [sub.id for sub in subordinates if sub.role == UserRole.EMPLOYEE]
-                allowed_user_ids = [manager_id] + employee_ids
-            except Exception as e:
-                logger.error(f"Error fetching hierarchy for Accountant's manager: {str(e)}")
-                allowed_user_ids = [manager_id]
-            
-            # Accountant cannot approve their own sales
-            if sold_by_id == current_user.id:
-                raise HTTPException(
-                    status_code=403,
-                    detail="Accountants cannot approve their own sales. Only sales from their Finance Admin and departmental Employees can be approved."
-                )
-            
-            # Check if sale was made by an allowed user (manager or manager's employee)
-            if sold_by_id not in allowed_user_ids:
-                raise HTTPException(
-                    status_code=403,
-                    detail="You can only approve sales made by your manager (Finance Admin) or departmental employees. Access to other Finance Admins' sales is restricted."
-                )
-        else:
-            # Other roles cannot approve sales
-            raise HTTPException(
-                status_code=403,
-                detail="Only accountants, finance admins, managers, or admins can post sales to ledger"
-            )
+        scope = _sale_posting_scope(db, current_user)
+        denial = _sale_posting_denial(current_user, sold_by_id, scope)
+        if denial:
+            raise HTTPException(status_code=403, detail=denial)
         
         sale = sale_crud.post_sale(db, sale_id, post_data, current_user.id)
         
@@ -461,6 +470,118 @@ def post_sale(
         )
 
 
+@router.post("/post-batch", response_model=SaleBatchPostResult)
+def post_sales_batch(
+    batch: SaleBatchPostRequest,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Post many sales to ledger in one transaction (month-end posting)
+    
+    Takes explicit sale_ids, or selects up to `limit` PENDING sales matching the filters
+    that the user is allowed to post. The same role rules as single-sale posting apply;
+    each sale is reported as posted, skipped (missing/already posted/cancelled), forbidden or failed.
+    """
+    scope = _sale_posting_scope(db, current_user)
+    
+    if batch.sale_ids:
+        sale_ids = list(dict.fromkeys(batch.sale_ids))
+    else:
+        query = db.query(Sale.id).filter(Sale.status == SaleStatus.PENDING)
+        if batch.start_date:
+            query = query.filter(Sale.created_at >= batch.start_date)
+        if batch.end_date:
+            query = query.filter(Sale.created_at <= batch.end_date)
+        if batch.sold_by_id:
+            query = query.filter(Sale.sold_by_id == batch.sold_by_id)
+        if scope is not None:
+            query = query.filter(Sale.sold_by_id.in_(scope))
+        if current_user.role == UserRole.ACCOUNTANT:
+            query = query.filter(Sale.sold_by_id != current_user.id)
+        sale_ids = [sale_id for (sale_id,) in query.order_by(Sale.created_at, Sale.id).limit(batch.limit).all()]
+    
+    sellers = dict(db.query(Sale.id, Sale.sold_by_id).filter(Sale.id.in_(sale_ids)).all()) if sale_ids else {}
+    outcomes = {}
+    allowed_ids = []
+    for sale_id in sale_ids:
+        if sale_id not in sellers:
+            outcomes[sale_id] = {"status": "skipped", "detail": "Sale not found", "journal_entry_id": None}
+            continue
+        denial = _sale_posting_denial(current_user, sellers[sale_id], scope)
+        if denial:
+            outcomes[sale_id] = {"status": "forbidden", "detail": denial, "journal_entry_id": None}
+        else:
+            allowed_ids.append(sale_id)
+    
+    if allowed_ids:
+        try:
+            outcomes.update(sale_crud.post_sales(db, allowed_ids, batch, current_user.id))
+        except Exception as e:
+            # One transaction: nothing in the batch was posted
+            db.rollback()
+            logger.error(f"Batch sale posting failed: {str(e)}", exc_info=True)
+            for sale_id in allowed_ids:
+                outcomes[sale_id] = {"status": "failed", "detail": str(e), "journal_entry_id": None}
+    
+    results = [{"sale_id": sale_id, **outcomes[sale_id]} for sale_id in sale_ids]
+    posted = [r for r in results if r["status"] == "posted"]
+    
+    if posted:
+        posted_ids = [r["sale_id"] for r in posted]
+        
+        # One notification per seller instead of one per sale
+        try:
+            from ...services.notification_service import NotificationService
+            from ...models.notification import NotificationType, NotificationPriority
+            totals = {}
+            for sold_by_id, total_sale in db.query(Sale.sold_by_id, Sale.total_sale).filter(Sale.id.in_(posted_ids)).all():
+                count, amount = totals.get(sold_by_id, (0, 0.0))
+                totals[sold_by_id] = (count + 1, amount + float(total_sale))
+            for sold_by_id, (count, amount) in totals.items():
+                NotificationService.create_notification(
+                    db=db,
+                    user_id=sold_by_id,
+                    title="Sales Posted to Ledger",
+                    message=f"{count} of your sales (${amount:,.2f}) have been posted to the accounting ledger.",
+                    notification_type=NotificationType.SALE_POSTED,
+                    priority=NotificationPriority.MEDIUM,
+                    action_url="/sales/accounting",
+                    background_tasks=background_tasks
+                )
+        except Exception as e:
+            logger.warning(f"Notification failed for batch sale posting: {str(e)}")
+        
+        # Log batch posting
+        try:
+            AuditLogger.log_action(
+                db=db,
+                user_id=current_user.id,
+                action=AuditAction.APPROVE,
+                resource_type="sale_batch",
+                new_values={"sale_ids": posted_ids}
+            )
+        except Exception as audit_err:
+            logger.warning(f"Audit logging failed for batch sale posting: {str(audit_err)}")
+        
+        # Trigger auto-learning for inventory on sale posting
+        try:
+            record_new_data("inventory", count=len(posted_ids))
+            background_tasks.add_task(trigger_auto_learn_background, "inventory")
+        except Exception as e:
+            logger.warning(f"Auto-learning trigger failed for batch sale posting: {str(e)}")
+    
+    return {
+        "requested": len(sale_ids),
+        "posted": len(posted),
+        "skipped": sum(1 for r in results if r["status"] == "skipped"),
+        "forbidden": sum(1 for r in results if r["status"] == "forbidden"),
+        "failed": sum(1 for r in results if r["status"] == "failed"),
+        "results": results,
+    }
+
+
 @router.post("/{sale_id}/cancel", response_model=SaleOut)
 def cancel_sale(
     sale_id: int,
@@ -693,8 +814,8 @@ def get_sale_einvoice(
 
     if format == "xml":
         from fastapi.responses import Response
-        xml_content = invoice_service.generate_ubl_xml(sale)
+        xml_content = invoice_service.generate_ubl_xml(sale, currency_service.base_currency_code(db))
         return Response(content=xml_content, media_type="application/xml")
     else:
-        return invoice_service.generate_json_einvoice(sale)
+        return invoice_service.generate_json_einvoice(sale, currency_service.base_currency_code(db))
 
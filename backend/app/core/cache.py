@@ -0,0 +1,112 @@
+"""
+Process-wide caches of values loaded from the database.
+
+A ``CommitInvalidatedCache`` holds one value (an index, a chart of accounts, ...)
+built by ``loader(db)``, and watches the models it is built from:
+
+* Mapper events only record that a session wrote a watched model. The cache is
+  invalidated when that session's transaction commits (or rolls back), never at
+  flush time, so uncommitted changes are never shared with other sessions.
+* A session with unflushed or uncommitted writes to a watched model gets a value
+  loaded through itself (so it sees its own writes) that is not stored in the
+  cache.
+* A value whose load overlapped an invalidation is not stored.
+* ``ttl_seconds`` bounds how long writes committed by other processes can go
+  unnoticed.
+"""
+from typing import Callable, Generic, Iterable, List, Optional, Tuple, TypeVar
+import threading
+import time
+
+from sqlalchemy import event, inspect # type: ignore[import-untyped]
+from sqlalchemy.orm import Session, object_session # type: ignore[import-untyped]
+
+T = TypeVar("T")
+
+# Session.info key: caches whose models the session wrote in its current transaction
+_WRITTEN_CACHES = "written_caches"
+
+
+class CommitInvalidatedCache(Generic[T]):
+    def __init__(self, loader: Callable[[Session], T], ttl_seconds: float):
+        self.loader = loader
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.RLock()
+        self._value: Optional[T] = None
+        self._built_at = 0.0
+        self._version = 0
+        self._models: List[type] = []
+
+    def watch(self, model: type, fields: Optional[Iterable[str]] = None) -> "CommitInvalidatedCache[T]":
+        """Invalidate on committed inserts/deletes of ``model``, and updates (of ``fields`` only, if given)"""
+        fields = tuple(fields) if fields is not None else None
+        self._models.append(model)
+
+        def on_insert_or_delete(mapper, connection, target):
+            self._mark_written(target)
+
+        def on_update(mapper, connection, target):
+            if fields is not None:
+                state = inspect(target)
+                if not any(state.attrs[field].history.has_changes() for field in fields):
+                    return
+            self._mark_written(target)
+
+        event.listen(model, "after_insert", on_insert_or_delete)
+        event.listen(model, "after_delete", on_insert_or_delete)
+        event.listen(model, "after_update", on_update)
+        return self
+
+    def _mark_written(self, target) -> None:
+        session = object_session(target)
+        if session is None:
+            # Written outside a session: nothing to wait for
+            self.invalidate()
+        else:
+            session.info.setdefault(_WRITTEN_CACHES, set()).add(self)
+
+    def _has_pending_writes(self, db: Session) -> bool:
+        if self in db.info.get(_WRITTEN_CACHES, ()):
+            return True
+        models = tuple(self._models)
+        return any(isinstance(obj, models) for obj in (*db.new, *db.dirty, *db.deleted))
+
+    def get(self, db: Session) -> T:
+        """The cached value, (re)loaded through ``db`` when missing, invalidated or older than the TTL"""
+        if self._has_pending_writes(db):
+            return self.loader(db)
+        with self._lock:
+            if self._value is not None and time.monotonic() - self._built_at <= self.ttl_seconds:
+                return self._value
+            version = self._version
+        value = self.loader(db)
+        with self._lock:
+            if version == self._version:
+                self._value = value
+                self._built_at = time.monotonic()
+        return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._value = None
+
+
+def _take_written_caches(session: Session) -> Tuple[CommitInvalidatedCache, ...]:
+    return tuple(session.info.pop(_WRITTEN_CACHES, ()))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    for cache in _take_written_caches(session):
+        cache.invalidate()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _invalidate_after_rollback(session, previous_transaction):
+    # After a savepoint rollback the outer transaction may still hold earlier flushed writes
+    if previous_transaction.nested:
+        return
+    # The rolled-back writes were never cached; invalidating anyway costs one reload
+    for cache in _take_written_caches(session):
+        cache.invalidate()
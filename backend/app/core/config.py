@@ -43,6 +43,7 @@ class Settings(BaseSettings):
     AWS_SECRET_ACCESS_KEY: str = ""  # Set via AWS_SECRET_ACCESS_KEY environment variable
     AWS_BUCKET_NAME: str = ""  # Set via AWS_BUCKET_NAME environment variable
     AWS_REGION: str = "us-east-1"  # Set via AWS_REGION environment variable (default: us-east-1)
+    BACKUP_S3_ENDPOINT_URL: str = ""  # S3-compatible server for backups (e.g. MinIO: http://minio:9000); empty = AWS
     
     # Application
     APP_NAME: str = "Finance Management System"
@@ -56,6 +57,10 @@ class Settings(BaseSettings):
     # Logging
     LOG_LEVEL: str = "INFO"
     LOG_FILE: Optional[str] = "logs/app.log"
+    LOG_FORMAT: str = "text"  # Console format: "text" or "json" (the file sink is always JSON)
+    LOG_MAX_BYTES: int = 10485760  # Rotate the log file at this size
+    LOG_BACKUP_COUNT: int = 5
+    LOG_REQUEST_SAMPLE_RATE: float = 1.0  # Fraction of successful (< 400) requests logged; errors are always logged
     
     # Celery
     CELERY_BROKER_URL: Optional[str] = None
@@ -65,16 +70,45 @@ class Settings(BaseSettings):
     RATE_LIMIT_PER_MINUTE: int = 60
     MAX_FILE_SIZE: int = 10485760
     REPORT_RETENTION_DAYS: int = 30
+    REPORT_QUEUE_ENABLED: bool = True  # Run report workers in this process (disable when a separate worker runs the queue)
+    REPORT_WORKERS: int = 2
+    REPORT_MAX_CONCURRENT_PER_USER: int = 1  # Reports generated at once for one user
+    REPORT_MAX_QUEUED_PER_USER: int = 10  # Queued + running reports per user before new requests get 429
+    REPORT_QUEUE_POLL_SECONDS: float = 2.0
+    REPORT_JOB_HEARTBEAT_SECONDS: float = 15.0
+    REPORT_JOB_STALE_SECONDS: float = 120.0  # Running jobs without a heartbeat this long are requeued
+    REPORT_JOB_MAX_ATTEMPTS: int = 3
+    REPORT_CACHE_ENABLED: bool = True  # Reuse results of identical reports (same type, period and data)
+    REPORT_CACHE_MAX_ENTRIES: int = 200
+    REPORT_SCHEDULER_ENABLED: bool = True
+    REPORT_SCHEDULE_POLL_SECONDS: float = 60.0
+    REPORT_SCHEDULE_OFF_PEAK_HOURS: str = "0-6"  # UTC hours [start-end) when due schedules run; empty = any time
+    REPORT_SCHEDULE_RUN_HOUR: int = 1  # UTC hour for daily/weekly/monthly schedules
+    REPORT_DOWNLOAD_BASE_URL: str = ""  # Prefix of download links in report emails, e.g. https://api.example.com
     BACKUP_RETENTION_DAYS: int = 90
     AUTO_BACKUP_ENABLED: bool = True
     AUTO_BACKUP_SCHEDULE: str = "0 2 * * *"
     HEALTH_CHECK_ENABLED: bool = True
     METRICS_ENABLED: bool = False
+    PROFILING_ENABLED: bool = False  # Admins may profile a request with "X-Profile: 1" or "?profile=1"
+    PROFILES_DIR: str = "profiles"
+    PROFILE_MAX_STORED: int = 50
+    PROFILE_SAMPLE_INTERVAL_MS: float = 5.0
     UPLOAD_DIR: str = "uploads"
     REPORTS_DIR: str = "reports"
     BACKUP_DIR: str = "backups"
+    BACKUP_REMOTE_DIR: str = ""  # Directory used as the backup object store when S3 is not configured (e.g. a NAS mount)
+    BACKUP_COMPRESSION_THREADS: int = 0  # 0 = one per CPU
+    BACKUP_COMPRESSION_LEVEL: int = 6
+    BACKUP_MULTIPART_CHUNK_MB: int = 16  # Part size of streaming S3 uploads (minimum 5)
+    BACKUP_RESTORE_JOBS: int = 0  # Parallel pg_restore jobs and file copy threads; 0 = one per CPU
 
     # AI Configuration
     GEMINI_API_KEY: Optional[str] = None  # Set via GEMINI_API_KEY environment variable
+    OCR_PROVIDER: str = "gemini"  # "gemini" or "stub" (deterministic fake results for local testing)
+    OCR_MAX_CONCURRENCY: int = 4  # Concurrent inference calls per worker process
+    OCR_MAX_IMAGE_SIDE: int = 2048  # Longest image side (px) sent to the model
+    OCR_CACHE_SIZE: int = 512  # Results kept by content hash
+    OCR_MAX_BATCH_FILES: int = 50
 
 settings = Settings()
\ No newline at end of file
@@ -0,0 +1,198 @@
+"""
+Queued, structured logging.
+
+Application threads (including the event loop) only put records on an
+in-memory queue through a ``QueueHandler``. A ``QueueListener`` thread owns
+the real sinks: the console and a size-rotated JSON file. A slow disk
+therefore delays the listener, never a request.
+
+Every record carries a ``request_id``, taken from ``request_id_var``. The
+request middleware sets it per request, and it is ``-`` outside requests.
+JSON lines are rendered by structlog's ``ProcessorFormatter`` when structlog
+is installed, with a plain ``json`` fallback otherwise.
+"""
+from typing import Any, Dict, List, Optional
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import SimpleQueue
+import atexit
+import copy
+import json
+import logging
+from datetime import datetime, timezone
+
+try:
+    import structlog # type: ignore[import-untyped]
+    STRUCTLOG_AVAILABLE = True
+except ImportError:
+    structlog = None
+    STRUCTLOG_AVAILABLE = False
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+
+# Extra attributes copied into JSON lines when a log call passes them (``extra={...}``)
+JSON_EXTRA_FIELDS = ("method", "path", "status_code", "duration_ms", "client")
+
+_listener: Optional[QueueListener] = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp the current request id on each record (runs in the caller's context, before queueing)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Merge message arguments and pre-render tracebacks before enqueueing, but leave
+    formatting to the sinks (the stock ``prepare`` bakes the traceback into the message).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        # structlog events arrive as dicts for ProcessorFormatter; leave those intact
+        if not isinstance(record.msg, dict):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        # Kept separately: ProcessorFormatter clears exc_text on the records it formats
+        record.exception_text = record.exc_text
+        return record
+
+
+def _record_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    fields: Dict[str, Any] = {"request_id": getattr(record, "request_id", "-")}
+    for name in JSON_EXTRA_FIELDS:
+        if hasattr(record, name):
+            fields[name] = getattr(record, name)
+    exception_text = getattr(record, "exception_text", None) or record.exc_text
+    if exception_text:
+        fields["exception"] = exception_text
+    return fields
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line (used when structlog is not installed)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        entry.update(_record_fields(record))
+        return json.dumps(entry, default=str)
+
+
+def _add_record_fields(logger, method_name, event_dict):
+    record = event_dict.get("_record")
+    if record is not None:
+        event_dict.update(_record_fields(record))
+    return event_dict
+
+
+def _add_request_id(logger, method_name, event_dict):
+    event_dict.setdefault("request_id", request_id_var.get())
+    return event_dict
+
+
+def _json_formatter() -> logging.Formatter:
+    if not STRUCTLOG_AVAILABLE:
+        return JsonFormatter()
+    return structlog.stdlib.ProcessorFormatter(
+        foreign_pre_chain=[
+            structlog.processors.TimeStamper(fmt="iso", utc=True),
+            structlog.stdlib.add_log_level,
+            structlog.stdlib.add_logger_name,
+            _add_record_fields,
+        ],
+        processors=[
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+            structlog.processors.JSONRenderer(default=str),
+        ],
+    )
+
+
+def _configure_structlog() -> None:
+    """Route ``structlog.get_logger()`` calls through the same stdlib queue"""
+    structlog.configure(
+        processors=[
+            structlog.contextvars.merge_contextvars,
+            structlog.stdlib.filter_by_level,
+            structlog.processors.TimeStamper(fmt="iso", utc=True),
+            structlog.stdlib.add_log_level,
+            structlog.stdlib.add_logger_name,
+            _add_request_id,
+            structlog.stdlib.PositionalArgumentsFormatter(),
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+        ],
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.stdlib.BoundLogger,
+        cache_logger_on_first_use=True,
+    )
+
+
+def configure_logging(settings) -> QueueListener:
+    """
+    Install the queue handler on the root and ``app`` loggers and start the listener.
+    Safe to call again (the previous listener is stopped first).
+    """
+    global _listener
+    stop_logging()
+
+    sinks: List[logging.Handler] = []
+    console = logging.StreamHandler()
+    console.setLevel(logging.DEBUG if settings.DEBUG else logging.INFO)
+    console.setFormatter(_json_formatter() if settings.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+    sinks.append(console)
+
+    if settings.LOG_FILE:
+        file_sink = RotatingFileHandler(
+            settings.LOG_FILE,
+            maxBytes=settings.LOG_MAX_BYTES,
+            backupCount=settings.LOG_BACKUP_COUNT,
+            encoding="utf-8",
+            delay=True,
+        )
+        file_sink.setLevel(logging.INFO)
+        file_sink.setFormatter(_json_formatter())
+        sinks.append(file_sink)
+
+    queue: SimpleQueue = SimpleQueue()
+    queue_handler = _DeferredQueueHandler(queue)
+    queue_handler.addFilter(RequestIdFilter())
+
+    for name in (None, "app"):
+        target = logging.getLogger(name)
+        for handler in list(target.handlers):
+            target.removeHandler(handler)
+        target.addHandler(queue_handler)
+        target.setLevel(settings.LOG_LEVEL)
+    logging.getLogger("app").propagate = False
+
+    if STRUCTLOG_AVAILABLE:
+        _configure_structlog()
+
+    _listener = QueueListener(queue, *sinks, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    """Flush queued records to the sinks and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
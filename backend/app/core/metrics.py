@@ -0,0 +1,295 @@
+"""
+In-process metrics in the Prometheus text exposition format (version 0.0.4).
+
+A small thread-safe registry of counters, gauges and histograms, so the
+application exposes ``/metrics`` without an extra client library. Values are
+per worker process. Scrape each worker, or run a single worker, as the app
+already does for its in-memory caches.
+
+Request metrics are recorded by ``RequestContextMiddleware`` and database
+metrics by the engine hooks in ``instrument_engine``. Both are installed only
+when ``METRICS_ENABLED`` is set. Background-queue and ML-training metrics are
+always recorded (a few operations per task) and exposed with the rest.
+"""
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+import threading
+import time
+
+from sqlalchemy import event # type: ignore[import-untyped]
+from sqlalchemy.engine import Engine # type: ignore[import-untyped]
+
+# Starlette appends "; charset=utf-8" to text media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+TRAINING_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        ...
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += self._samples()
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._functions: Dict[LabelValues, Callable[[], float]] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], float], **labels: str) -> None:
+        """Read the value from ``function`` at scrape time (e.g. the length of a queue)"""
+        with self._lock:
+            self._functions[self._key(labels)] = function
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            try:
+                values[key] = float(function())
+            except Exception:
+                continue
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (last is +Inf)], sum, count
+        self._series: Dict[LabelValues, List] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, ([*s[0]], s[1], s[2])) for k, s in self._series.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+
+def render_metrics() -> str:
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# ------------------------------------------------------------------
+# Application metrics
+# ------------------------------------------------------------------
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route template and status code", ("method", "route", "status")
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time until the response body was sent", ("method", "route")
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being processed")
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per request", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+HTTP_REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds", "Time spent in SQL statements per request", ("method", "route")
+)
+
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed", ("statement",))
+DB_QUERY_DURATION = Histogram("db_query_duration_seconds", "SQL statement execution time", ("statement",))
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", (), POOL_WAIT_BUCKETS
+)
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out_connections", "Connections currently checked out of the pool")
+
+BACKGROUND_QUEUE_DEPTH = Gauge("background_queue_depth", "Jobs waiting or running in in-process background queues", ("queue",))
+BACKGROUND_TASKS_IN_PROGRESS = Gauge("background_tasks_in_progress", "Background tasks currently running", ("task",))
+
+REPORT_CACHE_LOOKUPS = Counter("report_cache_lookups_total", "Report result cache lookups", ("report_type", "result"))
+
+ML_TRAINING_DURATION = Histogram(
+    "ml_training_duration_seconds", "ML model training time", ("metric", "model_type", "status"), TRAINING_BUCKETS
+)
+
+
+# ------------------------------------------------------------------
+# Per-request database statistics
+# ------------------------------------------------------------------
+
+# [statement count, seconds] for the request being served; shared with threadpool
+# workers because they run in a copy of the request's context
+_request_db_stats: ContextVar[Optional[List[float]]] = ContextVar("request_db_stats", default=None)
+
+
+def start_request_stats():
+    """Begin counting SQL for the current request; returns a token for ``finish_request_stats``"""
+    return _request_db_stats.set([0, 0.0])
+
+
+def finish_request_stats(token) -> Tuple[int, float]:
+    stats = _request_db_stats.get() or [0, 0.0]
+    _request_db_stats.reset(token)
+    return int(stats[0]), stats[1]
+
+
+def _statement_kind(statement: str) -> str:
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword if keyword in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+
+def _instrument_pool(engine: Engine) -> None:
+    pool = engine.pool
+    if getattr(pool, "_metrics_instrumented", False):
+        return
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+    pool.connect = timed_connect
+    pool._metrics_instrumented = True
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Record statement counts/durations (globally and per request) and pool checkout waits"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_query_start"].pop()
+        kind = _statement_kind(statement)
+        DB_QUERIES.inc(statement=kind)
+        DB_QUERY_DURATION.observe(elapsed, statement=kind)
+        stats = _request_db_stats.get()
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context):
+        starts = context.connection.info.get("metrics_query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    @event.listens_for(engine, "engine_disposed")
+    def _engine_disposed(engine):
+        # dispose() replaces the pool
+        _instrument_pool(engine)
+
+    _instrument_pool(engine)
+    DB_POOL_CHECKED_OUT.set_function(lambda: engine.pool.checkedout() if hasattr(engine.pool, "checkedout") else 0)
+
+
+def track_background_task(task: str):
+    """Decorator counting running instances of a background task in ``background_tasks_in_progress``"""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            BACKGROUND_TASKS_IN_PROGRESS.inc(task=task)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                BACKGROUND_TASKS_IN_PROGRESS.dec(task=task)
+        return wrapper
+    return decorator
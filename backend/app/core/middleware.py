@@ -0,0 +1,161 @@
+"""
+Pure-ASGI request middleware.
+
+One layer handles request timing (``X-Process-Time``), the fallback CORS
+headers, request ids (``X-Request-ID``) and request logging. It replaces the stacked
+``@app.middleware("http")`` functions, each of which ran as a
+``BaseHTTPMiddleware``. Each of those layers spawned a task per request and
+re-streamed the response body. This layer passes messages straight through
+and only edits the ``http.response.start`` headers.
+
+With ``collect_metrics`` it also records the request metrics in ``app.core.metrics``.
+"""
+from typing import Iterable, Optional
+import logging
+import random
+import re
+import time
+import uuid
+
+from starlette.datastructures import MutableHeaders # type: ignore
+from starlette.types import ASGIApp, Message, Receive, Scope, Send # type: ignore
+
+from . import metrics
+from .logging_config import request_id_var
+
+logger = logging.getLogger(__name__)
+
+PREFLIGHT_ALLOW_METHODS = "GET, POST, PUT, DELETE, PATCH, OPTIONS"
+PREFLIGHT_ALLOW_HEADERS = "Content-Type, Authorization, X-Requested-With"
+PREFLIGHT_MAX_AGE = "3600"
+
+REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+
+def _header(scope: Scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _request_id(scope: Scope) -> str:
+    """The caller's ``X-Request-ID`` when it is a plausible id, otherwise a new one"""
+    incoming = _header(scope, b"x-request-id")
+    if incoming and REQUEST_ID_PATTERN.fullmatch(incoming):
+        return incoming
+    return uuid.uuid4().hex
+
+
+def _route_label(scope: Scope) -> str:
+    """Route template (``/api/v1/inventory/{item_id}``) so metric labels stay bounded"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class RequestContextMiddleware:
+    """Timing, CORS fallback headers, request ids, request logging and (optionally) metrics in a single ASGI layer"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        allowed_origins: Iterable[str],
+        collect_metrics: bool = False,
+        log_sample_rate: float = 1.0
+    ):
+        self.app = app
+        self.allowed_origins = frozenset(allowed_origins)
+        self.collect_metrics = collect_metrics
+        self.log_sample_rate = log_sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        method = scope["method"]
+        request_id = _request_id(scope)
+        request_id_token = request_id_var.set(request_id)
+
+        origin = _header(scope, b"origin")
+        allowed_origin = origin if origin and origin in self.allowed_origins else None
+
+        # Preflight requests are answered here without entering the application
+        if method == "OPTIONS":
+            headers = [
+                (b"content-type", b"application/json"),
+                (b"content-length", b"2"),
+                (b"access-control-allow-methods", PREFLIGHT_ALLOW_METHODS.encode()),
+                (b"access-control-allow-headers", PREFLIGHT_ALLOW_HEADERS.encode()),
+                (b"access-control-max-age", PREFLIGHT_MAX_AGE.encode()),
+                (b"x-request-id", request_id.encode()),
+            ]
+            if allowed_origin:
+                headers += [
+                    (b"access-control-allow-origin", allowed_origin.encode("latin-1")),
+                    (b"access-control-allow-credentials", b"true"),
+                ]
+            try:
+                await send({"type": "http.response.start", "status": 200, "headers": headers})
+                await send({"type": "http.response.body", "body": b"{}"})
+                self._log_request(scope, method, 200, time.perf_counter() - start_time)
+            finally:
+                request_id_var.reset(request_id_token)
+            return
+
+        status_code = 500
+        # Set once the last body chunk is sent; background tasks run after that
+        finished_at = None
+        if self.collect_metrics:
+            metrics.HTTP_IN_FLIGHT.inc()
+            stats_token = metrics.start_request_stats()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, finished_at
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers["X-Process-Time"] = str(time.perf_counter() - start_time)
+                headers["X-Request-ID"] = request_id
+                if allowed_origin:
+                    headers["Access-Control-Allow-Origin"] = allowed_origin
+                    headers["Access-Control-Allow-Credentials"] = "true"
+                    headers["Access-Control-Expose-Headers"] = "*"
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                finished_at = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = (finished_at or time.perf_counter()) - start_time
+            self._log_request(scope, method, status_code, elapsed)
+            if self.collect_metrics:
+                self._record(scope, method, status_code, elapsed, stats_token)
+            request_id_var.reset(request_id_token)
+
+    def _log_request(self, scope: Scope, method: str, status_code: int, elapsed: float) -> None:
+        """One line per request; successful requests are sampled at ``log_sample_rate``"""
+        if status_code < 400 and self.log_sample_rate < 1.0 and random.random() >= self.log_sample_rate:
+            return
+        path = scope.get("path", "")
+        client = scope.get("client")
+        level = logging.ERROR if status_code >= 500 else logging.WARNING if status_code >= 400 else logging.INFO
+        logger.log(level, f"{method} {path} {status_code} in {elapsed:.4f}s", extra={
+            "method": method,
+            "path": path,
+            "status_code": status_code,
+            "duration_ms": round(elapsed * 1000, 2),
+            "client": client[0] if client else None,
+        })
+
+    @staticmethod
+    def _record(scope: Scope, method: str, status_code: int, elapsed: float, stats_token) -> None:
+        route = _route_label(scope)
+        query_count, query_seconds = metrics.finish_request_stats(stats_token)
+        metrics.HTTP_IN_FLIGHT.dec()
+        metrics.HTTP_REQUESTS.inc(method=method, route=route, status=str(status_code))
+        metrics.HTTP_REQUEST_DURATION.observe(elapsed, method=method, route=route)
+        metrics.HTTP_REQUEST_DB_QUERIES.observe(query_count, method=method, route=route)
+        metrics.HTTP_REQUEST_DB_DURATION.observe(query_seconds, method=method, route=route)
@@ -0,0 +1,360 @@
+"""
+Opt-in per-request profiling for administrators.
+
+An admin adds ``X-Profile: 1`` (or ``?profile=1``) to a request. The request
+then runs under a stack-sampling profiler, and every SQL statement it executes
+is recorded with its duration. Sampling suits this app because most endpoints
+are sync ``def`` functions that run in threadpool workers, where a
+per-thread deterministic profiler would not see them.
+
+The sampled threads are the event loop thread plus any worker thread that runs
+SQL for the request. Worker threads are registered from the engine hooks,
+through a context variable that the threadpool copies. Concurrent requests on
+the event loop thread can appear in its samples.
+
+Profiles are written as JSON to ``PROFILES_DIR``; the newest
+``PROFILE_MAX_STORED`` are kept and served from ``/admin/profiles``. The
+response carries the profile id in ``X-Profile-Id``.
+"""
+from typing import Any, Dict, List, Optional, Set, Tuple
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from datetime import datetime
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+
+from sqlalchemy import event # type: ignore[import-untyped]
+from sqlalchemy.engine import Engine # type: ignore[import-untyped]
+from starlette.datastructures import MutableHeaders # type: ignore
+from starlette.types import ASGIApp, Message, Receive, Scope, Send # type: ignore
+
+from .config import settings
+from .logging_config import request_id_var
+
+logger = logging.getLogger(__name__)
+
+# Identical SELECT shapes run at least this many times in one request are reported as N+1 candidates
+N_PLUS_ONE_THRESHOLD = 5
+
+# Statements kept verbatim in a stored profile (all are still counted)
+MAX_RECORDED_STATEMENTS = 500
+
+PROFILE_ID_PATTERN = re.compile(r"[0-9]{14}-[A-Za-z0-9._-]{1,32}")
+
+_FLAG_VALUES = {"1", "true", "yes"}
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = r"(?:\?|%\(\w+\)s|%s|:\w+)"
+_IN_LIST = re.compile(r"\(\s*" + _PLACEHOLDER + r"(?:\s*,\s*" + _PLACEHOLDER + r")*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+_active_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("active_profile", default=None)
+
+
+def normalize_statement(statement: str) -> str:
+    """SQL shape with literals and placeholder lists collapsed, for grouping repeated queries"""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _LITERALS.sub("?", shape)
+    return _IN_LIST.sub("(...)", shape)
+
+
+def detect_n_plus_one(statements: List[Tuple[str, float]], threshold: int = N_PLUS_ONE_THRESHOLD) -> List[Dict[str, Any]]:
+    """SELECT shapes executed ``threshold`` or more times, most frequent first"""
+    groups: Dict[str, List[float]] = defaultdict(list)
+    for statement, seconds in statements:
+        shape = normalize_statement(statement)
+        if shape.upper().startswith(("SELECT", "WITH")):
+            groups[shape].append(seconds)
+    findings = [
+        {"statement": shape, "count": len(durations), "total_ms": round(sum(durations) * 1000, 3)}
+        for shape, durations in groups.items() if len(durations) >= threshold
+    ]
+    return sorted(findings, key=lambda f: (-f["count"], -f["total_ms"]))
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame) -> str:
+    """Root-to-leaf stack in the collapsed (flamegraph) format: ``outer;inner;leaf``"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class RequestProfile:
+    """Stack samples and SQL statements for one profiled request"""
+
+    def __init__(self, request_id: str, method: str, path: str, user_id: int, interval: float):
+        self.started_at = datetime.utcnow()
+        suffix = request_id[:32] if request_id and request_id != "-" else uuid.uuid4().hex[:12]
+        self.id = f"{self.started_at:%Y%m%d%H%M%S}-{suffix}"
+        self.method = method
+        self.path = path
+        self.user_id = user_id
+        self.interval = interval
+        self.status_code: Optional[int] = None
+        self.duration = 0.0
+        self.threads: Set[int] = {threading.get_ident()}
+        self.statements: List[Tuple[str, float]] = []
+        self.samples: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name=f"profiler-{self.id}", daemon=True)
+        self._start_time = 0.0
+
+    def start(self) -> None:
+        self._start_time = time.perf_counter()
+        self._sampler.start()
+
+    def stop(self, status_code: int) -> None:
+        self.duration = time.perf_counter() - self._start_time
+        self.status_code = status_code
+        self._stop.set()
+        self._sampler.join()
+
+    def add_statement(self, statement: str, seconds: float) -> None:
+        with self._lock:
+            self.threads.add(threading.get_ident())
+            self.statements.append((statement, seconds))
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                threads = list(self.threads)
+            for ident in threads:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.samples[_collapse(frame)] += 1
+
+    def collapsed_stacks(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+    def to_dict(self, top: int = 30) -> Dict[str, Any]:
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self.samples.items():
+            frames = stack.split(";")
+            self_counts[frames[-1]] += count
+            for label in set(frames):
+                total_counts[label] += count
+        sample_total = sum(self.samples.values()) or 1
+
+        sql_seconds = sum(seconds for _, seconds in self.statements)
+        slowest = sorted(self.statements, key=lambda s: -s[1])[:10]
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "user_id": self.user_id,
+            "status_code": self.status_code,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration * 1000, 3),
+            "sample_interval_ms": round(self.interval * 1000, 3),
+            "samples": sum(self.samples.values()),
+            "top_self": [
+                {"function": label, "samples": count, "percent": round(100 * count / sample_total, 1)}
+                for label, count in self_counts.most_common(top)
+            ],
+            "top_cumulative": [
+                {"function": label, "samples": count, "percent": round(100 * count / sample_total, 1)}
+                for label, count in total_counts.most_common(top)
+            ],
+            "sql": {
+                "count": len(self.statements),
+                "total_ms": round(sql_seconds * 1000, 3),
+                "slowest": [{"statement": s, "ms": round(d * 1000, 3)} for s, d in slowest],
+                "statements": [{"statement": s, "ms": round(d * 1000, 3)} for s, d in self.statements[:MAX_RECORDED_STATEMENTS]],
+            },
+            "n_plus_one": detect_n_plus_one(self.statements),
+            "collapsed_stacks": self.collapsed_stacks(),
+        }
+
+
+# ------------------------------------------------------------------
+# Storage
+# ------------------------------------------------------------------
+
+def _profile_path(profile_id: str) -> Optional[str]:
+    if not PROFILE_ID_PATTERN.fullmatch(profile_id):
+        return None
+    return os.path.join(settings.PROFILES_DIR, f"{profile_id}.json")
+
+
+def save_profile(profile: RequestProfile) -> str:
+    os.makedirs(settings.PROFILES_DIR, exist_ok=True)
+    path = _profile_path(profile.id)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(profile.to_dict(), f)
+    os.replace(tmp_path, path)
+
+    stored = sorted(
+        (os.path.join(settings.PROFILES_DIR, name) for name in os.listdir(settings.PROFILES_DIR) if name.endswith(".json")),
+        key=os.path.getmtime,
+        reverse=True
+    )
+    for old in stored[settings.PROFILE_MAX_STORED:]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+    return path
+
+
+def load_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    path = _profile_path(profile_id)
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Summaries of stored profiles, newest first"""
+    if not os.path.isdir(settings.PROFILES_DIR):
+        return []
+    summaries = []
+    for name in sorted(os.listdir(settings.PROFILES_DIR), reverse=True):
+        if not name.endswith(".json"):
+            continue
+        profile = load_profile(name[:-5])
+        if profile:
+            summary = {
+                key: profile[key] for key in ("id", "method", "path", "user_id", "status_code", "started_at", "duration_ms", "samples")
+            }
+            summary["sql_count"] = profile["sql"]["count"]
+            summary["sql_total_ms"] = profile["sql"]["total_ms"]
+            summary["n_plus_one"] = len(profile["n_plus_one"])
+            summaries.append(summary)
+    return summaries
+
+
+def delete_profile(profile_id: str) -> bool:
+    path = _profile_path(profile_id)
+    if not path or not os.path.exists(path):
+        return False
+    os.remove(path)
+    return True
+
+
+# ------------------------------------------------------------------
+# SQL capture
+# ------------------------------------------------------------------
+
+def instrument_engine_for_profiling(engine: Engine) -> None:
+    """Record statements (and register the executing thread) for the profiled request, if any"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _active_profile.get() is not None:
+            conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = _active_profile.get()
+        starts = conn.info.get("profile_query_start")
+        if profile is not None and starts:
+            profile.add_statement(statement, time.perf_counter() - starts.pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context):
+        starts = context.connection.info.get("profile_query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+# ------------------------------------------------------------------
+# Middleware
+# ------------------------------------------------------------------
+
+def _profile_requested(scope: Scope) -> bool:
+    for key, value in scope.get("headers", ()):
+        if key == b"x-profile":
+            return value.decode("latin-1").strip().lower() in _FLAG_VALUES
+    query = scope.get("query_string", b"").decode("latin-1")
+    return any(part.lower() in ("profile=1", "profile=true") for part in query.split("&"))
+
+
+def _bearer_token(scope: Scope) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            return token.strip() if scheme.lower() == "bearer" and token.strip() else None
+    return None
+
+
+def _admin_user_id(token: str) -> Optional[int]:
+    """Id of the token's user if it is an active ADMIN/SUPER_ADMIN (blocking: DB lookup)"""
+    from .security import verify_token
+    from .database import SessionLocal
+    from ..models.user import User, UserRole
+
+    try:
+        user_id = int(verify_token(token).get("sub"))
+    except Exception:
+        return None
+    db = SessionLocal()
+    try:
+        row = db.query(User.role, User.is_active).filter(User.id == user_id).first()
+    finally:
+        db.close()
+    if row and row.is_active and row.role in (UserRole.ADMIN, UserRole.SUPER_ADMIN):
+        return user_id
+    return None
+
+
+class ProfilingMiddleware:
+    """Profile requests that ask for it, when the caller is an administrator; other requests pass straight through"""
+
+    def __init__(self, app: ASGIApp, interval: float = 0.005):
+        self.app = app
+        self.interval = interval
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not _profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        token = _bearer_token(scope)
+        user_id = await asyncio.to_thread(_admin_user_id, token) if token else None
+        if user_id is None:
+            # Not allowed to profile: serve the request normally
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(request_id_var.get(), scope["method"], scope.get("path", ""), user_id, self.interval)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message)["X-Profile-Id"] = profile.id
+            await send(message)
+
+        profile_token = _active_profile.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.stop(status_code)
+            _active_profile.reset(profile_token)
+            try:
+                await asyncio.to_thread(save_profile, profile)
+                logger.info(
+                    f"Profiled {profile.method} {profile.path}: {profile.duration * 1000:.1f}ms, "
+                    f"{len(profile.statements)} SQL statements, profile {profile.id}"
+                )
+            except Exception as e:
+                logger.error(f"Failed to store request profile {profile.id}: {e}")
@@ -1,13 +1,33 @@
 # app/crud/inventory.py
 from sqlalchemy.orm import Session # type: ignore[import-untyped]
-from sqlalchemy import and_, or_, func # type: ignore[import-untyped]
-from typing import Optional, List
+from sqlalchemy import and_, or_, func, select, text, column # type: ignore[import-untyped]
+from typing import Optional, List, Tuple
 from datetime import datetime, timezone
 from decimal import Decimal
+import base64
 
 from ..models.inventory import InventoryItem
 from ..models.inventory_audit import InventoryAuditLog, InventoryChangeType
 from ..schemas.inventory import InventoryItemCreate, InventoryItemUpdate
+from ..utils.inventory_search import (
+    inventory_search_backend, fts_phrase, FTS_TABLE, FTS_MIN_TERM_LENGTH, SEARCH_FTS5
+)
+
+
+def encode_cursor(item: InventoryItem) -> str:
+    """Opaque keyset cursor pointing just after ``item`` in newest-first order"""
+    created_at = item.created_at.isoformat() if item.created_at is not None else ""
+    raw = f"{created_at}|{item.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """Inverse of ``encode_cursor``; raises ValueError on a malformed cursor"""
+    try:
+        created_at, item_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return (datetime.fromisoformat(created_at) if created_at else None), int(item_id)
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
 
 
 class CRUDInventory:
@@ -22,11 +42,25 @@ class CRUDInventory:
         limit: int = 100,
         category: Optional[str] = None,
         is_active: Optional[bool] = None,
-        search: Optional[str] = None
+        search: Optional[str] = None,
+        created_by_ids: Optional[List[int]] = None,
+        cursor: Optional[str] = None
     ) -> List[InventoryItem]:
-        """Get multiple inventory items with filters"""
+        """
+        Get multiple inventory items with filters, newest first.
+
+        Items without ``created_at`` (rows older than its default) come first, newest id first,
+        as PostgreSQL orders NULLs for ``DESC`` and the keyset index stores them.
+
+        ``created_by_ids`` restricts results to items created by those users (None = no restriction).
+        When ``cursor`` (from ``encode_cursor`` on the last item of the previous page) is given,
+        the page starts after that item and ``skip`` is ignored.
+        """
         query = db.query(InventoryItem)
 
+        if created_by_ids is not None:
+            query = query.filter(InventoryItem.created_by_id.in_(created_by_ids))
+
         if is_active is not None:
             query = query.filter(InventoryItem.is_active == is_active)
 
@@ -34,16 +68,48 @@ class CRUDInventory:
             query = query.filter(InventoryItem.category == category)
 
         if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                or_(
-                    InventoryItem.item_name.ilike(search_term),
-                    InventoryItem.description.ilike(search_term),
-                    InventoryItem.sku.ilike(search_term)
+            query = query.filter(self._search_filter(db, search))
+
+        if cursor:
+            created_at, last_id = decode_cursor(cursor)
+            if created_at is None:
+                # Still among the undated items: the rest of them, then every dated item
+                query = query.filter(
+                    or_(
+                        and_(InventoryItem.created_at.is_(None), InventoryItem.id < last_id),
+                        InventoryItem.created_at.isnot(None)
+                    )
                 )
-            )
+            else:
+                # Undated items sort first, so they are already behind the cursor
+                query = query.filter(
+                    or_(
+                        InventoryItem.created_at < created_at,
+                        and_(InventoryItem.created_at == created_at, InventoryItem.id < last_id)
+                    )
+                )
+            skip = 0
 
-        return query.order_by(InventoryItem.created_at.desc()).offset(skip).limit(limit).all()
+        return query.order_by(
+            InventoryItem.created_at.desc().nulls_first(), InventoryItem.id.desc()
+        ).offset(skip).limit(limit).all()
+
+    def _search_filter(self, db: Session, search: str):
+        """Substring match on name, SKU and description, answered from the catalog search index when available"""
+        term = search.strip()
+        if inventory_search_backend(db) == SEARCH_FTS5 and len(term) >= FTS_MIN_TERM_LENGTH:
+            matches = text(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :q"
+            ).bindparams(q=fts_phrase(term)).columns(column("rowid"))
+            return InventoryItem.id.in_(select(matches.subquery().c.rowid))
+
+        # PostgreSQL serves these from the pg_trgm GIN indexes
+        search_term = f"%{term}%"
+        return or_(
+            InventoryItem.item_name.ilike(search_term),
+            InventoryItem.description.ilike(search_term),
+            InventoryItem.sku.ilike(search_term)
+        )
 
     def create(
         self,
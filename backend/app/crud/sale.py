@@ -1,7 +1,7 @@
 # app/crud/sale.py
-from sqlalchemy.orm import Session # type: ignore[import-untyped]
-from sqlalchemy import and_, func, desc # type: ignore[import-untyped]
-from typing import Optional, List
+from sqlalchemy.orm import Session, joinedload # type: ignore[import-untyped]
+from sqlalchemy import and_, func, desc, insert, update # type: ignore[import-untyped]
+from typing import Optional, List, Dict, Any
 from datetime import datetime, timezone
 from decimal import Decimal
 import uuid
@@ -11,6 +11,10 @@ from ..models.inventory import InventoryItem
 from ..schemas.sale import SaleCreate, SalePostRequest
 
 
+def _revenue_category(sale: Sale) -> str:
+    return sale.item.category.lower() if sale.item and sale.item.category else "sales"
+
+
 class CRUDSale:
     def get(self, db: Session, id: int) -> Optional[Sale]:
         """Get sale by ID"""
@@ -185,6 +189,124 @@ class CRUDSale:
 
         return sale
 
+    def post_sales(
+        self,
+        db: Session,
+        sale_ids: List[int],
+        obj_in: SalePostRequest,
+        posted_by_id: int
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Post many sales to ledger in one transaction (Accountant month-end action).
+
+        Sales are first claimed with one ``UPDATE ... WHERE status = 'pending'``, so a sale
+        posted or cancelled by a concurrent batch after it was read is skipped rather than
+        posted twice. Accounts are resolved once per revenue category before the claim, and
+        journal headers/lines and legacy journal entries are bulk-inserted for the claimed sales.
+        Returns ``{sale_id: {"status": "posted" | "skipped", "detail", "journal_entry_id"}}``;
+        sales that are missing, already posted or cancelled are skipped, not failed.
+        """
+        from ..services.accounting_service import accounting_service
+        from ..models.account import AccountType
+        from ..models.journal_entry import ReferenceType
+
+        outcomes: Dict[int, Dict[str, Any]] = {}
+        query = db.query(Sale).options(joinedload(Sale.item)).filter(Sale.id.in_(sale_ids))
+        if db.get_bind().dialect.name == "postgresql":
+            # Concurrent batches must not post the same sale twice
+            query = query.with_for_update(of=Sale)
+        sales = {s.id: s for s in query.all()}
+
+        to_post: List[Sale] = []
+        for sale_id in sale_ids:
+            sale = sales.get(sale_id)
+            if not sale:
+                outcomes[sale_id] = {"status": "skipped", "detail": "Sale not found", "journal_entry_id": None}
+            elif sale.status == SaleStatus.POSTED:
+                outcomes[sale_id] = {"status": "skipped", "detail": "Sale has already been posted", "journal_entry_id": None}
+            elif sale.status == SaleStatus.CANCELLED:
+                outcomes[sale_id] = {"status": "skipped", "detail": "Cannot post a cancelled sale", "journal_entry_id": None}
+            elif sale_id not in outcomes:
+                to_post.append(sale)
+                outcomes[sale_id] = None
+        if not to_post:
+            return outcomes
+
+        # Same accounts as post_sale, resolved once for the whole batch. Resolving may create
+        # and commit a missing account, so it happens before the claim below: a commit after
+        # the claim would leave sales POSTED without journal entries if a later step failed.
+        debit_account = accounting_service.get_account_for_category(
+            db, "banking", "default", "1010", "Cash at Bank", AccountType.ASSET
+        )
+        cogs_account = accounting_service.get_account_for_category(
+            db, "expense", "cogs", "5100", "Cost of Goods Sold", AccountType.EXPENSE
+        )
+        inventory_asset = accounting_service.get_account_for_category(
+            db, "inventory", "asset", "1200", "Inventory Asset", AccountType.ASSET
+        )
+        revenue_accounts = {
+            category: accounting_service.get_account_for_category(
+                db, "revenue", category, "4100", "Sales Revenue", AccountType.REVENUE
+            )
+            for category in sorted({_revenue_category(sale) for sale in to_post})
+        }
+
+        now = datetime.now(timezone.utc)
+        claimed = set(db.execute(
+            update(Sale)
+            .where(Sale.id.in_([sale.id for sale in to_post]), Sale.status == SaleStatus.PENDING)
+            .values(status=SaleStatus.POSTED, posted_by_id=posted_by_id, posted_at=now, updated_at=now)
+            .returning(Sale.id)
+            .execution_options(synchronize_session=False)
+        ).scalars())
+        for sale in to_post:
+            if sale.id not in claimed:
+                outcomes[sale.id] = {"status": "skipped", "detail": "Sale is no longer pending", "journal_entry_id": None}
+        to_post = [sale for sale in to_post if sale.id in claimed]
+        if not to_post:
+            db.rollback()
+            return outcomes
+
+        entries = []
+        for sale in to_post:
+            category = _revenue_category(sale)
+            total_cost = (sale.item.buying_price if sale.item else 0.0) * sale.quantity_sold
+            item_name = sale.item.item_name if sale.item else f"Item #{sale.item_id}"
+            entries.append({
+                "description": f"Sales Posting - Receipt {sale.receipt_number}",
+                "reference_type": ReferenceType.SALE,
+                "reference_id": sale.id,
+                "lines": [
+                    {"account_id": debit_account.id, "debit": float(sale.total_sale), "credit": 0.0, "description": f"Sale Payment Recv - {sale.receipt_number}"},
+                    {"account_id": revenue_accounts[category].id, "debit": 0.0, "credit": float(sale.total_sale), "description": "Revenue Recognition"},
+                    {"account_id": cogs_account.id, "debit": float(total_cost), "credit": 0.0, "description": f"COGS for {item_name}"},
+                    {"account_id": inventory_asset.id, "debit": 0.0, "credit": float(total_cost), "description": "Inventory Reduction"},
+                ],
+            })
+
+        entry_ids = accounting_service.create_journal_entries(db, entries, posted_by_id, commit=False)
+
+        db.execute(insert(JournalEntry), [
+            {
+                "sale_id": sale.id,
+                "entry_date": now,
+                "description": f"Sale of {sale.quantity_sold} units of item #{sale.item_id}",
+                "debit_account": obj_in.debit_account,
+                "debit_amount": float(sale.total_sale),
+                "credit_account": obj_in.credit_account,
+                "credit_amount": float(sale.total_sale),
+                "reference_number": obj_in.reference_number or sale.receipt_number,
+                "notes": obj_in.notes,
+                "posted_by_id": posted_by_id,
+            }
+            for sale in to_post
+        ])
+        db.commit()
+
+        for sale, entry_id in zip(to_post, entry_ids):
+            outcomes[sale.id] = {"status": "posted", "detail": None, "journal_entry_id": entry_id}
+        return outcomes
+
     def cancel_sale(
         self,
         db: Session,
@@ -2,19 +2,21 @@
 from fastapi import FastAPI, Request, HTTPException, status  # type: ignore
 from fastapi.middleware.cors import CORSMiddleware  # type: ignore
 from fastapi.middleware.trustedhost import TrustedHostMiddleware  # type: ignore
-from fastapi.responses import JSONResponse  # type: ignore
+from fastapi.responses import JSONResponse, Response  # type: ignore
 from fastapi.security import HTTPBearer  # type: ignore
 from sqlalchemy import inspect, text # type: ignore
 from fastapi.staticfiles import StaticFiles # type: ignore
 from contextlib import asynccontextmanager
 import logging
-import logging.config
-import time
 import os
 from datetime import datetime, timezone
 
 from .core.config import settings
 from .core.database import engine, Base, get_db, SessionLocal
+from .core.middleware import RequestContextMiddleware
+from .core.logging_config import configure_logging
+from .core.profiling import ProfilingMiddleware, instrument_engine_for_profiling
+from .core.metrics import instrument_engine, render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
 from .api.v1 import (
     auth, users, revenue, expenses, dashboard,
     reports, approvals, notifications, admin,
@@ -51,53 +53,19 @@ from .models import (  # noqa: F401
     FraudFlag,
     EmployeeProfile, PayrollPeriod, Payslip
 )
+from .models.account_balance import AccountPeriodBalance  # noqa: F401
+from .models.journal_number_counter import JournalNumberCounter  # noqa: F401
+from .models.report_job import ReportJob  # noqa: F401
+from .models.report_schedule_run import ReportScheduleRun  # noqa: F401
 
 # Create required directories early (prevents FileNotFoundError during config or mount)
 for directory in ("uploads", "reports", "backups", "logs"):
     os.makedirs(directory, exist_ok=True)
     print(f"Directory ensured: {directory}")
 
-# Now safe to configure logging
-LOGGING_CONFIG = {
-    "version": 1,
-    "disable_existing_loggers": False,
-    "formatters": {
-        "default": {
-            "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        },
-    },
-    "handlers": {
-        "console": {  # Always include console
-            "class": "logging.StreamHandler",
-            "formatter": "default",
-            "level": "DEBUG" if settings.DEBUG else "INFO",
-        },
-    },
-    "root": {
-        "level": settings.LOG_LEVEL,
-        "handlers": ["console"],
-    },
-    "loggers": {
-        "app": {
-            "level": settings.LOG_LEVEL,
-            "handlers": ["console"],
-            "propagate": False,
-        },
-    },
-}
-
-# Conditionally add file handler AFTER directory creation
-if settings.LOG_FILE:
-    LOGGING_CONFIG["handlers"]["file"] = {
-        "class": "logging.FileHandler",
-        "filename": settings.LOG_FILE,
-        "formatter": "default",
-        "level": "INFO",
-    }
-    LOGGING_CONFIG["root"]["handlers"].append("file")
-    LOGGING_CONFIG["loggers"]["app"]["handlers"].append("file")
-
-logging.config.dictConfig(LOGGING_CONFIG)
+# Now safe to configure logging: records are queued and written by a listener
+# thread (console + rotating JSON file), so handlers never block the event loop
+configure_logging(settings)
 logger = logging.getLogger(__name__)
 
 # Security
@@ -190,6 +158,10 @@ def ensure_database_schema_sync(engine):
     except Exception as e:
         logger.error(f"Failed to perform self-healing migration: {e}")
 
+    # Inventory keyset/search indexes (pg_trgm on PostgreSQL, FTS5 shadow table on SQLite)
+    from .utils.inventory_search import ensure_inventory_search_index
+    ensure_inventory_search_index(engine)
+
 # Lifespan (startup + shutdown)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -223,6 +195,22 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Failed to start ML training scheduler: {e}")
 
+    # 5. Report job workers (also requeue reports interrupted by the last shutdown)
+    if settings.REPORT_QUEUE_ENABLED:
+        try:
+            from .services.report_queue import report_queue
+            report_queue.start()
+        except Exception as e:
+            logger.warning(f"Failed to start report queue: {e}")
+
+    # 6. Scheduled reports (claims are per schedule, so every process may run this)
+    if settings.REPORT_SCHEDULER_ENABLED:
+        try:
+            from .services.report_scheduler import report_scheduler
+            report_scheduler.start()
+        except Exception as e:
+            logger.warning(f"Failed to start report scheduler: {e}")
+
     yield
 
     # -------------------- SHUTDOWN --------------------
@@ -235,6 +223,20 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Failed to stop ML training scheduler: {e}")
 
+    # Stop scheduling reports before stopping the workers
+    try:
+        from .services.report_scheduler import report_scheduler
+        report_scheduler.stop()
+    except Exception as e:
+        logger.warning(f"Failed to stop report scheduler: {e}")
+
+    # Stop report workers (reports still running are requeued on the next start)
+    try:
+        from .services.report_queue import report_queue
+        report_queue.stop()
+    except Exception as e:
+        logger.warning(f"Failed to stop report queue: {e}")
+
 
 # ------------------------------------------------------------------
 # FastAPI app
@@ -432,71 +434,22 @@ if not settings.DEBUG:
         allowed_hosts=allowed_hosts
     )
 
-# CORS headers middleware (backup - ensures CORS headers are always present)
-@app.middleware("http")
-async def add_cors_headers(request: Request, call_next):
-    """Ensure CORS headers are always present"""
-    # Get origin from request
-    origin = request.headers.get("Origin")
-    
-    # Default allowed origins
-    allowed_origins = [
-        "http://localhost:3000",
-        "http://localhost:3001",
-        "http://localhost:8081",  # Expo web dev server
-        "http://127.0.0.1:3000",
-        "http://127.0.0.1:3001",
-        "http://127.0.0.1:8081",  # Expo web dev server
-    ]
-    
-    # Handle OPTIONS preflight requests
-    if request.method == "OPTIONS":
-        response = JSONResponse(content={}, status_code=200)
-        if origin and origin in allowed_origins:
-            response.headers["Access-Control-Allow-Origin"] = origin
-            response.headers["Access-Control-Allow-Credentials"] = "true"
-        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, PATCH, OPTIONS"
-        response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, X-Requested-With"
-        response.headers["Access-Control-Max-Age"] = "3600"
-        return response
-    
-    # Process the actual request
-    response = await call_next(request)
-    
-    # Add CORS headers to response
-    if origin and origin in allowed_origins:
-        response.headers["Access-Control-Allow-Origin"] = origin
-        response.headers["Access-Control-Allow-Credentials"] = "true"
-        response.headers["Access-Control-Expose-Headers"] = "*"
-    
-    return response
-
-# Request timing middleware
-@app.middleware("http")
-async def add_process_time_header(request: Request, call_next):
-    """Add processing time header to responses"""
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
-    return response
-
-# Request logging middleware
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """Log all requests"""
-    start_time = time.time()
-    
-    # Log request
-    logger.info(f"Request: {request.method} {request.url}")
-    
-    response = await call_next(request)
-    
-    # Log response
-    process_time = time.time() - start_time
-    logger.info(f"Response: {response.status_code} in {process_time:.4f}s")
-    
-    return response
+# Admin-only on-demand request profiling (inside the request-id layer below)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, interval=settings.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+    instrument_engine_for_profiling(engine)
+
+# Timing, CORS fallback headers, request logging and metrics (outermost layer, pure ASGI)
+app.add_middleware(
+    RequestContextMiddleware,
+    allowed_origins=all_origins,
+    collect_metrics=settings.METRICS_ENABLED,
+    log_sample_rate=settings.LOG_REQUEST_SAMPLE_RATE,
+)
+
+if settings.METRICS_ENABLED:
+    # SQL statement counts/durations and pool checkout waits for /metrics
+    instrument_engine(engine)
 
 # Exception handlers
 @app.exception_handler(HTTPException)
@@ -608,6 +561,13 @@ async def health_check():
         "environment": "development" if settings.DEBUG else "production"
     }
 
+# Prometheus metrics endpoint (only when METRICS_ENABLED)
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Request, database, background queue and ML training metrics in Prometheus text format"""
+        return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, Float, Date, DateTime, ForeignKey, UniqueConstraint # type: ignore[import-untyped]
+from sqlalchemy.orm import relationship # type: ignore[import-untyped]
+from sqlalchemy.sql import func # type: ignore[import-untyped]
+
+from ..core.database import Base
+
+
+class AccountPeriodBalance(Base):
+    """Running debit/credit totals of posted journal lines per account and calendar month"""
+    __tablename__ = "account_period_balances"
+    __table_args__ = (
+        UniqueConstraint("account_id", "period", name="uq_account_period_balances_account_period"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False, index=True)
+    period = Column(Date, nullable=False, index=True)  # First day of the month
+    debit_total = Column(Float, nullable=False, default=0.0)
+    credit_total = Column(Float, nullable=False, default=0.0)
+    line_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    account = relationship("Account")
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, DateTime # type: ignore[import-untyped]
+from sqlalchemy.sql import func # type: ignore[import-untyped]
+
+from ..core.database import Base
+
+
+class JournalNumberCounter(Base):
+    """Last number issued per numbering key (e.g. ``AUTO-20260115``), incremented in the posting transaction on every database"""
+    __tablename__ = "journal_number_counters"
+
+    key = Column(String(64), primary_key=True)
+    last_value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,39 @@
+import enum
+
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Index # type: ignore[import-untyped]
+
+from ..core.database import Base
+
+
+class ReportJobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class ReportJob(Base):
+    """Queue entry for generating one report (one row per report, reused on regeneration)"""
+    __tablename__ = "report_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    report_id = Column(Integer, ForeignKey("reports.id", ondelete="CASCADE"), nullable=False, unique=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Plain strings (ReportJobStatus values) so new states need no enum type migration
+    status = Column(String(20), nullable=False, default=ReportJobStatus.QUEUED.value)
+    progress = Column(Integer, nullable=False, default=0)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String(100), nullable=True)
+    error = Column(Text, nullable=True)
+    queued_at = Column(DateTime(timezone=True), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Claim order and per-user running counts
+        Index("ix_report_jobs_status_queued_at", "status", "queued_at"),
+        Index("ix_report_jobs_user_status", "user_id", "status"),
+    )
@@ -0,0 +1,34 @@
+import enum
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index # type: ignore[import-untyped]
+from sqlalchemy.sql import func # type: ignore[import-untyped]
+
+from ..core.database import Base
+
+
+class ReportScheduleRunStatus(str, enum.Enum):
+    PENDING = "pending"
+    DELIVERING = "delivering"  # Claimed by one process (see ReportScheduler.deliver_finished_runs)
+    DELIVERED = "delivered"
+    FAILED = "failed"
+
+
+class ReportScheduleRun(Base):
+    """One execution of a report schedule: the report it produced and its delivery state"""
+    __tablename__ = "report_schedule_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    schedule_id = Column(Integer, ForeignKey("report_schedules.id", ondelete="CASCADE"), nullable=False, index=True)
+    report_id = Column(Integer, ForeignKey("reports.id", ondelete="CASCADE"), nullable=False)
+    # Report actually generated; differs from report_id when the run was coalesced with identical schedules
+    source_report_id = Column(Integer, ForeignKey("reports.id", ondelete="CASCADE"), nullable=False)
+    coalesce_key = Column(String(64), nullable=False)
+    scheduled_for = Column(DateTime(timezone=True), nullable=False)
+    status = Column(String(20), nullable=False, default=ReportScheduleRunStatus.PENDING.value)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    delivered_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_report_schedule_runs_status", "status"),
+    )
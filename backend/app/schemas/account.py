@@ -1,6 +1,6 @@
 from typing import Optional, List
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import datetime, date
 from ..models.account import AccountType
 
 class AccountBase(BaseModel):
@@ -32,3 +32,43 @@ class Account(AccountBase):
 
     class Config:
         from_attributes = True
+
+
+# --- Ledger / trial balance ---
+
+class TrialBalanceLine(BaseModel):
+    account_id: int
+    code: str
+    name: str
+    account_type: AccountType
+    debit: float
+    credit: float
+
+class TrialBalance(BaseModel):
+    as_of: date
+    lines: List[TrialBalanceLine]
+    total_debit: float
+    total_credit: float
+
+class LedgerLine(BaseModel):
+    line_id: int
+    journal_entry_id: int
+    entry_number: str
+    entry_date: datetime
+    description: Optional[str] = None
+    debit: float
+    credit: float
+    balance: float
+
+class AccountLedger(BaseModel):
+    account_id: int
+    code: str
+    name: str
+    account_type: AccountType
+    start_date: date
+    end_date: date
+    opening_balance: float
+    period_debit: float
+    period_credit: float
+    closing_balance: float
+    lines: List[LedgerLine]
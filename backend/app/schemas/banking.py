@@ -1,5 +1,5 @@
 from typing import Optional, List
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from ..models.banking import TransactionStatus
 
@@ -28,6 +28,40 @@ class BankTransaction(BankTransactionBase):
     class Config:
         from_attributes = True
 
+class StatementImportError(BaseModel):
+    row: int
+    error: str
+
+class StatementImportResult(BaseModel):
+    bank_account_id: int
+    total_rows: int
+    imported: int
+    duplicates: int
+    failed: int
+    errors: List[StatementImportError] = []
+    errors_truncated: bool = False
+
+# --- Reconciliation Schemas ---
+
+class ReconciliationRequest(BaseModel):
+    start_date: datetime
+    end_date: datetime
+    bank_account_id: Optional[int] = None
+    amount_tolerance: float = Field(0.01, ge=0)
+    date_tolerance_days: int = Field(3, ge=0, le=31)
+
+class ReconciliationMatch(BaseModel):
+    transaction_id: int
+    journal_entry_id: int
+
+class ReconciliationResult(BaseModel):
+    start_date: datetime
+    end_date: datetime
+    pending: int
+    matched: int
+    unmatched: int
+    matches: List[ReconciliationMatch] = []
+
 # --- Bank Account Schemas ---
 
 class BankAccountBase(BaseModel):
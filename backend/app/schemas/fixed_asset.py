@@ -1,5 +1,5 @@
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, date
 from pydantic import BaseModel, Field
 from ..models.fixed_asset import DepreciationMethod, FixedAssetStatus
 
@@ -59,3 +59,15 @@ class FixedAsset(FixedAssetBase):
 
     class Config:
         from_attributes = True
+
+class DepreciationRunRequest(BaseModel):
+    period: date = Field(default_factory=date.today, description="Any date within the month to depreciate")
+
+class DepreciationRunResult(BaseModel):
+    period_start: datetime
+    period_end: datetime
+    assets_depreciated: int
+    assets_skipped: int
+    fully_depreciated: int
+    total_amount: float
+    journal_entry_ids: List[int] = []
@@ -28,3 +28,19 @@ class AnalyzedDocument(BaseModel):
     document_type: str  # "receipt", "invoice", "other"
     extracted_data: ReceiptData
     raw_text: Optional[str] = None
+    content_hash: Optional[str] = None  # SHA-256 of the uploaded bytes
+
+class OCRBatchAccepted(BaseModel):
+    job_id: str
+    status: str
+    total: int
+
+class OCRJobStatus(BaseModel):
+    job_id: str
+    status: str  # "queued", "running", "completed"
+    total: int
+    completed: int
+    failed: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    results: List[Optional[AnalyzedDocument]] = []
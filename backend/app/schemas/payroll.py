@@ -78,3 +78,13 @@ class Payslip(PayslipBase):
 
     class Config:
         from_attributes = True
+
+# Payroll Run Schemas
+class PayslipAdjustment(BaseModel):
+    allowances: Dict[str, float] = {}
+    overtime_amount: float = 0.0
+    deductions: Dict[str, float] = {}
+
+class PayrollRunRequest(BaseModel):
+    tax_table: str = "default"
+    adjustments: Dict[int, PayslipAdjustment] = Field(default_factory=dict, description="Keyed by employee profile id")
@@ -40,6 +40,21 @@ class ReportOut(ReportBase):
         from_attributes = True
 
 
+class ReportJobOut(BaseModel):
+    report_id: int
+    status: str
+    progress: int
+    cancel_requested: bool
+    attempts: int
+    error: Optional[str] = None
+    queued_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 class ReportSchedule(BaseModel):
     report_id: int
     frequency: str  # daily, weekly, monthly
@@ -1,6 +1,6 @@
 # app/schemas/sale.py
-from pydantic import BaseModel, field_validator # type: ignore[import-untyped]
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator, model_validator # type: ignore[import-untyped]
+from typing import Optional, List
 from datetime import datetime
 from decimal import Decimal
 from ..models.sale import SaleStatus
@@ -68,6 +68,36 @@ class SalePostRequest(BaseModel):
             raise ValueError('Credit account must be at least 2 characters')
         return v.strip()
 
+class SaleBatchPostRequest(SalePostRequest):
+    """Schema for posting many sales at once: explicit sale ids, or pending sales matching filters"""
+    sale_ids: Optional[List[int]] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    sold_by_id: Optional[int] = None
+    limit: int = Field(500, ge=1, le=1000)
+
+    @model_validator(mode='after')
+    def validate_selection(self):
+        if self.sale_ids is not None and len(self.sale_ids) > 1000:
+            raise ValueError('At most 1000 sales can be posted per batch')
+        if not self.sale_ids and not (self.start_date or self.end_date or self.sold_by_id):
+            raise ValueError('Provide sale_ids or at least one filter (start_date, end_date, sold_by_id)')
+        return self
+
+class SaleBatchPostOutcome(BaseModel):
+    sale_id: int
+    status: str  # posted, skipped, forbidden or failed
+    detail: Optional[str] = None
+    journal_entry_id: Optional[int] = None
+
+class SaleBatchPostResult(BaseModel):
+    requested: int
+    posted: int
+    skipped: int
+    forbidden: int
+    failed: int
+    results: List[SaleBatchPostOutcome]
+
 class JournalEntryOut(BaseModel):
     """Schema for journal entry output"""
     id: int
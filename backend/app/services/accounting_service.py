@@ -1,27 +1,81 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import insert
+from collections import defaultdict
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Dict, Tuple, NamedTuple, Any
 
+from ..core.cache import CommitInvalidatedCache
 from ..models import Account, AccountType, AccountMapping
 from ..models.journal_entry import AccountingJournalEntry, JournalEntryLine, JournalEntryStatus, ReferenceType
+from .ledger import LedgerService, period_start
+from .numbering import NumberingService
+
+
+ACCOUNT_CACHE_TTL_SECONDS = 300
+
+
+class CachedAccount(NamedTuple):
+    """Immutable snapshot of an account row, safe to share across sessions and threads"""
+    id: int
+    code: str
+    name: str
+    account_type: AccountType
+    is_active: bool
+
+
+class ChartOfAccounts:
+    """Accounts by id and code plus (module, category) -> account id mappings, loaded in two queries"""
+
+    def __init__(self, accounts: List[CachedAccount], mappings: Dict[Tuple[str, str], int]):
+        self.by_id: Dict[int, CachedAccount] = {a.id: a for a in accounts}
+        self.by_code: Dict[str, CachedAccount] = {a.code: a for a in accounts}
+        self.mappings = mappings
+
+    @classmethod
+    def load(cls, db: Session) -> "ChartOfAccounts":
+        accounts = [
+            CachedAccount(row.id, row.code, row.name, row.account_type, row.is_active)
+            for row in db.query(Account.id, Account.code, Account.name, Account.account_type, Account.is_active)
+        ]
+        mappings = {
+            (row.module, row.category): row.account_id
+            for row in db.query(AccountMapping.module, AccountMapping.category, AccountMapping.account_id)
+        }
+        return cls(accounts, mappings)
+
+    def for_category(self, module: str, category: str) -> Optional[CachedAccount]:
+        account_id = self.mappings.get((module, category))
+        return self.by_id.get(account_id) if account_id is not None else None
+
+
+_chart_cache = CommitInvalidatedCache(ChartOfAccounts.load, ACCOUNT_CACHE_TTL_SECONDS)
+_chart_cache.watch(Account).watch(AccountMapping)
+
+
+def get_chart_of_accounts(db: Session) -> ChartOfAccounts:
+    """Cached chart of accounts, reloaded when stale or after a committed account/mapping write"""
+    return _chart_cache.get(db)
+
+
+def invalidate_chart_of_accounts() -> None:
+    _chart_cache.invalidate()
+
 
 class AccountingService:
     @staticmethod
-    def get_account_for_category(db: Session, module: str, category: str, default_code: str, default_name: str, account_type: AccountType) -> Account:
+    def get_account_for_category(db: Session, module: str, category: str, default_code: str, default_name: str, account_type: AccountType) -> CachedAccount:
         """
         Get the account mapped to a specific module and category.
-        If no mapping exists, falls back to get_or_create_account with defaults.
+        If no mapping exists, falls back to the default account code, creating it if needed.
+        Served from the chart-of-accounts cache, so repeat lookups issue no queries.
         """
-        mapping = db.query(AccountMapping).filter(
-            AccountMapping.module == module,
-            AccountMapping.category == category
-        ).first()
-        
-        if mapping:
-            return mapping.account
-            
-        return AccountingService.get_or_create_account(db, default_code, default_name, account_type)
+        chart = get_chart_of_accounts(db)
+        account = chart.for_category(module, category) or chart.by_code.get(default_code)
+        if account:
+            return account
+
+        created = AccountingService.get_or_create_account(db, default_code, default_name, account_type)
+        return CachedAccount(created.id, created.code, created.name, created.account_type, created.is_active)
 
     @staticmethod
     def get_or_create_account(db: Session, code: str, name: str, account_type: AccountType) -> Account:
@@ -61,9 +115,7 @@ class AccountingService:
             entry_date = datetime.now()
 
         # Generate Entry Number
-        today_str = entry_date.strftime("%Y%m%d")
-        count = db.query(func.count(AccountingJournalEntry.id)).scalar() or 0
-        entry_number = f"AUTO-{today_str}-{count + 1:04d}"
+        entry_number = NumberingService.next_entry_number(db, "AUTO", entry_date)
 
         # 1. Create Header
         db_entry = AccountingJournalEntry(
@@ -104,8 +156,96 @@ class AccountingService:
             db.rollback()
             raise ValueError(f"Journal entry is not balanced: Dr {total_debit} != Cr {total_credit}")
 
+        # Keep account balance snapshots in step with the ledger (same transaction)
+        if status == JournalEntryStatus.POSTED:
+            LedgerService.apply_lines(
+                db, entry_date,
+                [(line['account_id'], line.get('debit', 0.0), line.get('credit', 0.0)) for line in lines]
+            )
+
         db.commit()
         db.refresh(db_entry)
         return db_entry
 
+    @staticmethod
+    def create_journal_entries(
+        db: Session,
+        entries: List[dict],
+        created_by_id: int,
+        prefix: str = "AUTO",
+        commit: bool = True
+    ) -> List[int]:
+        """
+        Post many balanced journal entries at once.
+        entries: List of {'description', 'reference_type', 'reference_id', 'lines', 'entry_date' (optional)},
+        with lines shaped as for create_journal_entry.
+
+        Entry numbers are preallocated per day, headers and lines are bulk-inserted and account
+        balances updated once per period. Returns the new entry ids in input order.
+        Raises ValueError (before writing anything) if any entry is unbalanced.
+        """
+        if not entries:
+            return []
+
+        now = datetime.now()
+        for index, entry in enumerate(entries):
+            total_debit = sum(float(line.get('debit', 0.0)) for line in entry['lines'])
+            total_credit = sum(float(line.get('credit', 0.0)) for line in entry['lines'])
+            if abs(total_debit - total_credit) > 0.001:
+                raise ValueError(f"Journal entry {index} is not balanced: Dr {total_debit} != Cr {total_credit}")
+
+        # One numbering round trip per entry day
+        by_day: Dict[str, List[int]] = defaultdict(list)
+        for index, entry in enumerate(entries):
+            by_day[(entry.get('entry_date') or now).strftime("%Y%m%d")].append(index)
+        numbers: List[Optional[str]] = [None] * len(entries)
+        for indexes in by_day.values():
+            day = entries[indexes[0]].get('entry_date') or now
+            for index, number in zip(indexes, NumberingService.entry_numbers(db, prefix, day, len(indexes))):
+                numbers[index] = number
+
+        # RETURNING in parameter order maps ids to input entries without a second lookup
+        entry_ids = db.execute(
+            insert(AccountingJournalEntry).returning(AccountingJournalEntry.id, sort_by_parameter_order=True),
+            [
+                {
+                    "entry_number": numbers[index],
+                    "entry_date": entry.get('entry_date') or now,
+                    "description": entry['description'],
+                    "reference_type": entry['reference_type'],
+                    "reference_id": entry.get('reference_id'),
+                    "status": JournalEntryStatus.POSTED,
+                    "created_by_id": created_by_id,
+                    "posted_at": now,
+                    "posted_by_id": created_by_id,
+                }
+                for index, entry in enumerate(entries)
+            ]
+        ).scalars().all()
+
+        line_rows = []
+        period_lines: Dict[Any, List[Tuple[int, float, float]]] = defaultdict(list)
+        for entry_id, entry in zip(entry_ids, entries):
+            entry_date = entry.get('entry_date') or now
+            for line in entry['lines']:
+                debit = float(line.get('debit', 0.0))
+                credit = float(line.get('credit', 0.0))
+                line_rows.append({
+                    "journal_entry_id": entry_id,
+                    "account_id": line['account_id'],
+                    "debit_amount": debit,
+                    "credit_amount": credit,
+                    "description": line.get('description', entry['description']),
+                })
+                period_lines[period_start(entry_date)].append((line['account_id'], debit, credit))
+        if line_rows:
+            db.execute(insert(JournalEntryLine), line_rows)
+
+        for period, lines in period_lines.items():
+            LedgerService.apply_lines(db, period, lines)
+
+        if commit:
+            db.commit()
+        return entry_ids
+
 accounting_service = AccountingService()
@@ -1,5 +1,6 @@
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
+from sqlalchemy import func, case, and_, select, extract # type: ignore[import-untyped]
 from sqlalchemy.orm import Session # type: ignore[import-untyped]
 
 from ..crud.approval import approval as approval_crud
@@ -184,35 +185,62 @@ class ApprovalService:
         except Exception as e:
             print(f"Failed to send decision notification: {str(e)}")
     
+    @staticmethod
+    def _decision_seconds(db: Session):
+        """SQL expression for approved_at - created_at in seconds on the current dialect"""
+        if db.bind.dialect.name == "sqlite":
+            return (func.julianday(ApprovalWorkflow.approved_at) - func.julianday(ApprovalWorkflow.created_at)) * 86400.0
+        return extract("epoch", ApprovalWorkflow.approved_at - ApprovalWorkflow.created_at)
+    
+    @staticmethod
+    def _status_breakdown(db: Session, start_date: datetime, *filters) -> List[Any]:
+        """Grouped counts per (type, status) with summed decision time of approved rows"""
+        timed = and_(ApprovalWorkflow.status == ApprovalStatus.APPROVED, ApprovalWorkflow.approved_at.isnot(None))
+        return db.query(
+            ApprovalWorkflow.type,
+            ApprovalWorkflow.status,
+            func.count(ApprovalWorkflow.id).label("count"),
+            func.count(case((timed, ApprovalWorkflow.id))).label("timed_count"),
+            func.sum(case((timed, ApprovalService._decision_seconds(db)), else_=0.0)).label("timed_seconds")
+        ).filter(
+            ApprovalWorkflow.created_at >= start_date,
+            *filters
+        ).group_by(ApprovalWorkflow.type, ApprovalWorkflow.status).all()
+    
     @staticmethod
     def get_approval_statistics(db: Session, days: int = 30) -> Dict[str, Any]:
         """Get approval statistics for the specified period"""
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        # Get all approvals in the period
-        all_approvals = approval_crud.get_multi(db, skip=0, limit=10000)
-        period_approvals = [a for a in all_approvals if a.created_at >= start_date]
-        
-        # Calculate statistics
-        total = len(period_approvals)
-        approved = len([a for a in period_approvals if a.status == ApprovalStatus.APPROVED])
-        rejected = len([a for a in period_approvals if a.status == ApprovalStatus.REJECTED])
-        pending = len([a for a in period_approvals if a.status == ApprovalStatus.PENDING])
+        by_type = {
+            approval_type: {"total": 0, "approved": 0, "rejected": 0, "pending": 0}
+            for approval_type in (ApprovalType.REVENUE, ApprovalType.EXPENSE)
+        }
+        total = approved = rejected = pending = 0
+        timed_count = 0
+        timed_seconds = 0.0
         
-        # Calculate average approval time
-        approved_approvals = [a for a in period_approvals if a.status == ApprovalStatus.APPROVED and a.approved_at]
-        if approved_approvals:
-            avg_approval_time = sum(
-                (a.approved_at - a.created_at).total_seconds() 
-                for a in approved_approvals
-            ) / len(approved_approvals)
-            avg_approval_hours = avg_approval_time / 3600
-        else:
-            avg_approval_hours = 0
+        for row in ApprovalService._status_breakdown(db, start_date):
+            total += row.count
+            timed_count += row.timed_count or 0
+            timed_seconds += float(row.timed_seconds or 0.0)
+            bucket = by_type.get(row.type)
+            if bucket is not None:
+                bucket["total"] += row.count
+            if row.status == ApprovalStatus.APPROVED:
+                approved += row.count
+                if bucket is not None:
+                    bucket["approved"] += row.count
+            elif row.status == ApprovalStatus.REJECTED:
+                rejected += row.count
+                if bucket is not None:
+                    bucket["rejected"] += row.count
+            elif row.status == ApprovalStatus.PENDING:
+                pending += row.count
+                if bucket is not None:
+                    bucket["pending"] += row.count
         
-        # By type
-        revenue_approvals = [a for a in period_approvals if a.type == ApprovalType.REVENUE]
-        expense_approvals = [a for a in period_approvals if a.type == ApprovalType.EXPENSE]
+        avg_approval_hours = (timed_seconds / timed_count / 3600) if timed_count else 0
         
         return {
             "period_days": days,
@@ -224,23 +252,13 @@ class ApprovalService:
             "rejection_rate": (rejected / total * 100) if total > 0 else 0,
             "average_approval_hours": round(avg_approval_hours, 2),
             "by_type": {
-                "revenue": {
-                    "total": len(revenue_approvals),
-                    "approved": len([a for a in revenue_approvals if a.status == ApprovalStatus.APPROVED]),
-                    "rejected": len([a for a in revenue_approvals if a.status == ApprovalStatus.REJECTED]),
-                    "pending": len([a for a in revenue_approvals if a.status == ApprovalStatus.PENDING])
-                },
-                "expense": {
-                    "total": len(expense_approvals),
-                    "approved": len([a for a in expense_approvals if a.status == ApprovalStatus.APPROVED]),
-                    "rejected": len([a for a in expense_approvals if a.status == ApprovalStatus.REJECTED]),
-                    "pending": len([a for a in expense_approvals if a.status == ApprovalStatus.PENDING])
-                }
+                "revenue": by_type[ApprovalType.REVENUE],
+                "expense": by_type[ApprovalType.EXPENSE]
             }
         }
     
     @staticmethod
-    def get_pending_approvals_for_user(db: Session, user_id: int) -> List[ApprovalWorkflow]:
+    def get_pending_approvals_for_user(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[ApprovalWorkflow]:
         """Get pending approvals that a user needs to approve"""
         user = user_crud.get(db, user_id)
         if not user:
@@ -248,13 +266,18 @@ class ApprovalService:
         
         # Admins and super admins see all pending approvals
         if user.role in [UserRole.ADMIN, UserRole.SUPER_ADMIN]:
-            return approval_crud.get_pending(db, user_id)
+            return approval_crud.get_pending(db, user_id, skip=skip, limit=limit)
         
-        # Managers see pending approvals from their subordinates
+        # Managers see pending approvals from their subordinates (resolved with a recursive CTE)
         if user.role == UserRole.MANAGER:
-            all_pending = approval_crud.get_pending(db)
-            subordinate_ids = [sub.id for sub in user_crud.get_hierarchy(db, user_id)]
-            return [a for a in all_pending if a.requester_id in subordinate_ids]
+            subordinates = select(User.id).where(User.manager_id == user_id).cte("subordinates", recursive=True)
+            subordinates = subordinates.union(
+                select(User.id).where(User.manager_id == subordinates.c.id)
+            )
+            return db.query(ApprovalWorkflow).filter(
+                ApprovalWorkflow.status == ApprovalStatus.PENDING,
+                ApprovalWorkflow.requester_id.in_(select(subordinates.c.id))
+            ).order_by(ApprovalWorkflow.created_at.desc()).offset(skip).limit(limit).all()
         
         # Other roles don't have approval permissions
         return []
@@ -276,26 +299,23 @@ class ApprovalService:
         """Get workload statistics for an approver"""
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        # Get approvals assigned to this user
-        user_approvals = approval_crud.get_by_approver(db, approver_id, 0, 10000)
-        period_approvals = [a for a in user_approvals if a.created_at >= start_date]
+        # Grouped counts for approvals assigned to this user
+        total_assigned = approved = rejected = still_pending = 0
+        timed_count = 0
+        timed_seconds = 0.0
+        for row in ApprovalService._status_breakdown(db, start_date, ApprovalWorkflow.approver_id == approver_id):
+            total_assigned += row.count
+            timed_count += row.timed_count or 0
+            timed_seconds += float(row.timed_seconds or 0.0)
+            if row.status == ApprovalStatus.APPROVED:
+                approved += row.count
+            elif row.status == ApprovalStatus.REJECTED:
+                rejected += row.count
+            elif row.status == ApprovalStatus.PENDING:
+                still_pending += row.count
         
-        # Calculate workload
-        total_assigned = len(period_approvals)
-        approved = len([a for a in period_approvals if a.status == ApprovalStatus.APPROVED])
-        rejected = len([a for a in period_approvals if a.status == ApprovalStatus.REJECTED])
-        still_pending = len([a for a in period_approvals if a.status == ApprovalStatus.PENDING])
-        
-        # Calculate average response time
-        processed_approvals = [a for a in period_approvals if a.status in [ApprovalStatus.APPROVED, ApprovalStatus.REJECTED] and a.approved_at]
-        if processed_approvals:
-            avg_response_time = sum(
-                (a.approved_at - a.created_at).total_seconds() 
-                for a in processed_approvals
-            ) / len(processed_approvals)
-            avg_response_hours = avg_response_time / 3600
-        else:
-            avg_response_hours = 0
+        # Average response time (rejections carry no decision timestamp)
+        avg_response_hours = (timed_seconds / timed_count / 3600) if timed_count else 0
         
         return {
             "approver_id": approver_id,
@@ -1,20 +1,54 @@
 import os
 import json
+import gzip
+import hashlib
 import zipfile
 import shutil
 import subprocess
 import platform
-import boto3 # type: ignore[import-untyped]
+import re
+import sqlite3
+import tempfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, BinaryIO
 import logging
 from sqlalchemy import create_engine, text # type: ignore[import-untyped]
 
 from ..core.config import settings
 from ..core.database import get_db
+from ..utils.parallel_gzip import ParallelGzipWriter
+from .backup_storage import BackupMirror, remote_store
 
 logger = logging.getLogger(__name__)
 
+# Backups are directories: <BACKUP_DIR>/<backup_name>/{manifest.json, database.*.gz}.
+# Uploaded files live once in <BACKUP_DIR>/blobs/<sha256[:2]>/<sha256>, shared by
+# every backup that references them. The remote store mirrors the same layout.
+MANIFEST_FORMAT = 2
+MANIFEST_FILE = "manifest.json"
+BLOBS_DIR = "blobs"
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Unreferenced blobs younger than this are kept: a running backup may be about to reference them
+BLOB_GC_GRACE = timedelta(hours=6)
+
+DATABASE_FILES = {
+    "pg_custom": "database.dump.gz",
+    "sqlite": "database.db.gz",
+    "sql": "database.sql.gz",
+}
+
+# Table data entries of `pg_restore --list`, e.g. "3345; 0 16386 TABLE DATA public users postgres"
+TABLE_DATA_PATTERN = re.compile(r"^\d+; \d+ \d+ TABLE DATA (?P<schema>\S+) (?P<table>\S+) ")
+
+
+class BackupVerificationError(Exception):
+    """A backup file does not match the checksum recorded in its manifest"""
+
 
 def _find_pg_tool(tool_name: str) -> str:
     """
@@ -54,53 +88,145 @@ def _find_pg_tool(tool_name: str) -> str:
     )
 
 
+def _pg_connection() -> Tuple[List[str], Dict[str, str]]:
+    """Connection arguments and environment for pg_dump/pg_restore/psql from DATABASE_URL"""
+    import urllib.parse
+    parsed = urllib.parse.urlparse(settings.DATABASE_URL)
+    
+    env = os.environ.copy()
+    env["PGPASSWORD"] = parsed.password or ""
+    
+    args = [
+        f"-h{parsed.hostname}",
+        f"-p{parsed.port or 5432}",
+        f"-U{parsed.username}",
+        f"-d{parsed.path[1:]}",  # Remove leading slash
+    ]
+    return args, env
+
+
+def _backup_dir(backup_name: str) -> str:
+    # Backup names come from API requests and are used to build paths that get deleted
+    if not backup_name or os.path.basename(backup_name) != backup_name or backup_name.startswith("."):
+        raise ValueError(f"Invalid backup name: {backup_name}")
+    return os.path.join(settings.BACKUP_DIR, backup_name)
+
+
+def _blob_key(digest: str) -> str:
+    return f"{BLOBS_DIR}/{digest[:2]}/{digest}"
+
+
+def _blob_path(digest: str) -> str:
+    return os.path.join(settings.BACKUP_DIR, BLOBS_DIR, digest[:2], digest)
+
+
+def _read_manifest(backup_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(backup_dir, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _read_remote_manifest(store, backup_name: str) -> Optional[Dict[str, Any]]:
+    try:
+        with closing(store.open_reader(f"{backup_name}/{MANIFEST_FILE}")) as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def _open_backup_file(local_path: str, key: str, store) -> BinaryIO:
+    """The local copy of a backup file, or a stream from the remote store when it is not here"""
+    if os.path.exists(local_path):
+        return open(local_path, "rb")
+    if store is not None:
+        return store.open_reader(key)
+    raise FileNotFoundError(f"Backup file not found: {local_path}")
+
+
+class _HashingReader:
+    """Read-through wrapper that hashes and counts everything read"""
+    
+    def __init__(self, raw: BinaryIO):
+        self.raw = raw
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+    
+    def read(self, size: int = -1) -> bytes:
+        data = self.raw.read(size)
+        self.sha256.update(data)
+        self.size += len(data)
+        return data
+
+
+def _manifests() -> List[Dict[str, Any]]:
+    """Manifests of all complete local backups, newest first"""
+    manifests = []
+    if not os.path.exists(settings.BACKUP_DIR):
+        return manifests
+    for entry in os.scandir(settings.BACKUP_DIR):
+        if entry.is_dir() and entry.name != BLOBS_DIR:
+            manifest = _read_manifest(entry.path)
+            if manifest is not None:
+                manifests.append(manifest)
+    manifests.sort(key=lambda manifest: manifest["created_at"], reverse=True)
+    return manifests
+
+
 class BackupService:
     """Service for creating and managing system backups"""
     
     @staticmethod
     def create_backup(include_files: bool = False) -> str:
-        """Create a complete system backup"""
+        """
+        Create a system backup in one streaming pass.
+        
+        The database dump is piped through a multi-threaded gzip compressor to
+        disk and, when configured, to object storage at the same time. With
+        ``include_files``, only uploads not already stored by an earlier backup
+        are copied (as content-addressed blobs). The manifest is written last.
+        """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_name = f"backup_{timestamp}"
-        backup_dir = f"backups/{backup_name}"
+        backup_dir = _backup_dir(backup_name)
+        mirror = BackupMirror(remote_store())
         
         try:
             # Create backup directory
             os.makedirs(backup_dir, exist_ok=True)
             
             # Backup database
-            db_backup_file = BackupService._backup_database(backup_dir, backup_name)
+            database = BackupService._backup_database(backup_dir, backup_name, mirror)
             
             # Backup files if requested
-            if include_files:
-                BackupService._backup_files(backup_dir)
+            files = BackupService._backup_files(mirror) if include_files else []
             
-            # Create backup metadata
-            metadata = {
+            manifest = {
+                "format": MANIFEST_FORMAT,
                 "backup_name": backup_name,
                 "created_at": datetime.utcnow().isoformat(),
                 "include_files": include_files,
-                "database_backup": db_backup_file,
-                "version": settings.VERSION
+                "version": settings.VERSION,
+                "database": database,
+                "files": files,
+                "remote": mirror.active,
             }
             
-            with open(f"{backup_dir}/metadata.json", "w") as f:
-                json.dump(metadata, f, indent=2)
-            
-            # Create zip file
-            zip_file = f"backups/{backup_name}.zip"
-            BackupService._create_zip(backup_dir, zip_file)
-            
-            # Upload to S3 if configured
-            if settings.AWS_ACCESS_KEY_ID and settings.AWS_BUCKET_NAME:
-                BackupService._upload_to_s3(zip_file, backup_name)
-            
-            # Clean up temporary directory
-            BackupService._cleanup_directory(backup_dir)
-            
-            logger.info(f"Backup created successfully: {backup_name}")
+            # Written last: a backup directory with a manifest is complete
+            manifest_path = os.path.join(backup_dir, MANIFEST_FILE)
+            with open(f"{manifest_path}.tmp", "w") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(f"{manifest_path}.tmp", manifest_path)
+            mirror.upload_file(manifest_path, f"{backup_name}/{MANIFEST_FILE}")
+            
+            logger.info(
+                f"Backup created successfully: {backup_name} "
+                f"(database {database['raw_size']} -> {database['size']} bytes, {len(files)} files"
+                f"{', mirrored' if mirror.active else ''})"
+            )
             return backup_name
-            
+        
         except Exception as e:
             logger.error(f"Failed to create backup: {str(e)}")
             # Clean up on failure
@@ -109,123 +235,180 @@ class BackupService:
             raise
     
     @staticmethod
-    def _backup_database(backup_dir: str, backup_name: str) -> str:
-        """Backup database to SQL file"""
+    def _backup_database(backup_dir: str, backup_name: str, mirror: BackupMirror) -> Dict[str, Any]:
+        """Stream a database dump through the parallel compressor to disk and the mirror"""
         db_url = settings.DATABASE_URL
-        
         if "postgresql" in db_url:
-            # PostgreSQL backup - find pg_dump tool
-            pg_dump_path = _find_pg_tool("pg_dump")
-            
-            # Parse connection details
-            import urllib.parse
-            parsed = urllib.parse.urlparse(db_url)
-            
-            host = parsed.hostname
-            port = parsed.port or 5432
-            database = parsed.path[1:]  # Remove leading slash
-            username = parsed.username
-            password = parsed.password
-            
-            # Create pg_dump command
-            backup_file = f"{backup_dir}/database_{backup_name}.sql"
-            
-            env = os.environ.copy()
-            env["PGPASSWORD"] = password
-            
-            cmd = [
-                pg_dump_path,
-                f"-h{host}",
-                f"-p{port}",
-                f"-U{username}",
-                f"-d{database}",
-                "--no-password",
-                "--clean",
-                "--no-acl",
-                "--no-owner",
-                "-f", backup_file
-            ]
-            
-            logger.info(f"Running pg_dump: {' '.join(cmd[:5])}...")
-            result = subprocess.run(cmd, env=env, capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                raise Exception(f"Database backup failed: {result.stderr}")
-            
-            logger.info(f"Database backup created: {backup_file}")
-            return backup_file
-            
+            dump_format = "pg_custom"
         elif "sqlite" in db_url:
-            # SQLite backup - just copy the file
-            import shutil
-            
-            db_file = db_url.replace("sqlite:///", "")
-            backup_file = f"{backup_dir}/database_{backup_name}.db"
-            shutil.copy2(db_file, backup_file)
-            
-            return backup_file
-            
+            dump_format = "sqlite"
         else:
-            # Generic backup using SQLAlchemy
-            backup_file = f"{backup_dir}/database_{backup_name}.sql"
-            
-            engine = create_engine(db_url)
-            
-            with engine.connect() as conn:
-                result = conn.execute(text("SELECT table_name FROM information_schema.tables WHERE table_schema = 'public'"))
-                tables = [row[0] for row in result]
-                
-                with open(backup_file, "w") as f:
-                    for table in tables:
-                        f.write(f"-- Table: {table}\n")
-                        result = conn.execute(text(f"SELECT * FROM {table}"))
-                        # Write INSERT statements (simplified)
-                        f.write(f"-- {result.rowcount} rows\n\n")
-            
-            return backup_file
+            dump_format = "sql"
+        file_name = DATABASE_FILES[dump_format]
+        
+        with open(os.path.join(backup_dir, file_name), "wb") as local, \
+                mirror.tee(local, f"{backup_name}/{file_name}") as sink:
+            with ParallelGzipWriter(
+                sink,
+                level=settings.BACKUP_COMPRESSION_LEVEL,
+                threads=settings.BACKUP_COMPRESSION_THREADS or None
+            ) as compressor:
+                if dump_format == "pg_custom":
+                    BackupService._dump_postgresql(compressor)
+                elif dump_format == "sqlite":
+                    # SQLite backup - stream the database file
+                    with open(db_url.replace("sqlite:///", ""), "rb") as f:
+                        shutil.copyfileobj(f, compressor, COPY_CHUNK_SIZE)
+                else:
+                    BackupService._dump_generic(compressor)
+        
+        logger.info(f"Database backup created: {backup_dir}/{file_name}")
+        return {
+            "file": file_name,
+            "format": dump_format,
+            "compression": "gzip",
+            "size": compressor.size,
+            "sha256": compressor.sha256,
+            "raw_size": compressor.raw_size,
+        }
     
     @staticmethod
-    def _backup_files(backup_dir: str):
-        """Backup uploaded files and attachments"""
-        files_dir = "uploads"
-        if os.path.exists(files_dir):
-            import shutil
-            shutil.copytree(files_dir, f"{backup_dir}/uploads")
+    def _dump_postgresql(out: BinaryIO):
+        """Pipe pg_dump's custom-format output into ``out``"""
+        pg_dump_path = _find_pg_tool("pg_dump")
+        args, env = _pg_connection()
+        
+        # Custom format so pg_restore can restore in parallel and per table. pg_dump's
+        # own (single-threaded) compression is off: the parallel compressor does it.
+        cmd = [
+            pg_dump_path,
+            *args,
+            "--no-password",
+            "--format=custom",
+            "--compress=0",
+            "--no-acl",
+            "--no-owner",
+        ]
+        
+        logger.info(f"Running pg_dump: {' '.join(cmd[:5])}...")
+        # stderr goes to a file so a chatty pg_dump cannot fill the pipe and stall
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, stderr=stderr)
+            try:
+                shutil.copyfileobj(process.stdout, out, COPY_CHUNK_SIZE)
+            except BaseException:
+                process.kill()
+                raise
+            finally:
+                process.stdout.close()
+                returncode = process.wait()
+            
+            if returncode != 0:
+                stderr.seek(0)
+                raise Exception(f"Database backup failed: {stderr.read().decode(errors='replace')}")
+    
+    @staticmethod
+    def _dump_generic(out: BinaryIO):
+        """Generic backup using SQLAlchemy"""
+        engine = create_engine(settings.DATABASE_URL)
+        
+        with engine.connect() as conn:
+            result = conn.execute(text("SELECT table_name FROM information_schema.tables WHERE table_schema = 'public'"))
+            tables = [row[0] for row in result]
+            
+            for table in tables:
+                out.write(f"-- Table: {table}\n".encode())
+                result = conn.execute(text(f"SELECT * FROM {table}"))
+                # Write INSERT statements (simplified)
+                out.write(f"-- {result.rowcount} rows\n\n".encode())
     
     @staticmethod
-    def _create_zip(source_dir: str, zip_file: str):
-        """Create zip file from directory"""
-        with zipfile.ZipFile(zip_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(source_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, source_dir)
-                    zipf.write(file_path, arcname)
+    def _backup_files(mirror: BackupMirror) -> List[Dict[str, Any]]:
+        """
+        Store uploaded files as content-addressed blobs and return their manifest entries.
+        
+        Files whose size and mtime match the previous backup reuse its hash without
+        being read. Other files are hashed while being copied, and the copy is
+        dropped when a blob with that content already exists.
+        """
+        uploads_dir = settings.UPLOAD_DIR
+        if not os.path.exists(uploads_dir):
+            return []
+        
+        previous = next((manifest for manifest in _manifests() if manifest.get("include_files")), None)
+        known = {entry["path"]: entry for entry in previous["files"]} if previous else {}
+        known_remote = bool(previous and previous.get("remote"))
+        
+        files = []
+        stored = 0
+        for root, dirs, names in os.walk(uploads_dir):
+            dirs.sort()
+            for name in sorted(names):
+                path = os.path.join(root, name)
+                relative_path = os.path.relpath(path, uploads_dir).replace(os.sep, "/")
+                stat_result = os.stat(path)
+                entry = known.get(relative_path)
+                
+                if (
+                    entry is not None
+                    and entry["size"] == stat_result.st_size
+                    and entry["mtime_ns"] == stat_result.st_mtime_ns
+                    and os.path.exists(_blob_path(entry["sha256"]))
+                ):
+                    digest = entry["sha256"]
+                    # Fresh mtime protects the blob from garbage collection until the manifest exists
+                    os.utime(_blob_path(digest))
+                    on_remote = known_remote
+                else:
+                    digest, created = BackupService._store_blob(path)
+                    stored += created
+                    on_remote = False
+                
+                if not on_remote:
+                    mirror.upload_file(_blob_path(digest), _blob_key(digest), skip_existing=True)
+                
+                files.append({
+                    "path": relative_path,
+                    "sha256": digest,
+                    "size": stat_result.st_size,
+                    "mtime_ns": stat_result.st_mtime_ns,
+                })
+        
+        logger.info(f"Backed up {len(files)} files, {stored} new blobs")
+        return files
     
     @staticmethod
-    def _upload_to_s3(zip_file: str, backup_name: str):
-        """Upload backup to S3"""
+    def _store_blob(path: str) -> Tuple[str, bool]:
+        """Copy ``path`` into the blob store. Returns its SHA-256 and whether a new blob was stored."""
+        blobs_dir = os.path.join(settings.BACKUP_DIR, BLOBS_DIR)
+        os.makedirs(blobs_dir, exist_ok=True)
+        sha256 = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=blobs_dir, suffix=".tmp")
         try:
-            s3_client = boto3.client(
-                's3',
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=settings.AWS_REGION
-            )
-            
-            s3_key = f"backups/{backup_name}.zip"
-            s3_client.upload_file(zip_file, settings.AWS_BUCKET_NAME, s3_key)
-            
-            logger.info(f"Backup uploaded to S3: {s3_key}")
-            
-        except Exception as e:
-            logger.error(f"Failed to upload backup to S3: {str(e)}")
-            # Don't raise - backup is still created locally
+            with open(path, "rb") as source, os.fdopen(fd, "wb") as target:
+                while True:
+                    chunk = source.read(COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    sha256.update(chunk)
+                    target.write(chunk)
+            digest = sha256.hexdigest()
+            blob_path = _blob_path(digest)
+            if os.path.exists(blob_path):
+                os.remove(tmp_path)
+                os.utime(blob_path)
+                return digest, False
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            os.replace(tmp_path, blob_path)
+            return digest, True
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
     
     @staticmethod
     def _cleanup_directory(directory: str):
         """Remove directory and all its contents"""
-        import shutil
         if os.path.exists(directory):
             shutil.rmtree(directory)
     
@@ -233,14 +416,33 @@ class BackupService:
     def list_backups() -> List[Dict[str, Any]]:
         """List available backups"""
         backups = []
-        backups_dir = "backups"
+        backups_dir = settings.BACKUP_DIR
         
         if not os.path.exists(backups_dir):
             return backups
         
         for file in os.listdir(backups_dir):
-            if file.endswith(".zip"):
-                file_path = os.path.join(backups_dir, file)
+            file_path = os.path.join(backups_dir, file)
+            if os.path.isdir(file_path):
+                # Backups without a manifest are still being written (or failed)
+                manifest = _read_manifest(file_path) if file != BLOBS_DIR else None
+                if manifest is None:
+                    continue
+                stat = os.stat(os.path.join(file_path, MANIFEST_FILE))
+                metadata = {key: value for key, value in manifest.items() if key != "files"}
+                metadata["file_count"] = len(manifest.get("files", []))
+                
+                backups.append({
+                    "name": file,
+                    "file": file,
+                    # The database dump; uploaded files are shared blobs
+                    "size": manifest["database"]["size"],
+                    "files_size": sum(entry["size"] for entry in manifest.get("files", [])),
+                    "created_at": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                    "metadata": metadata
+                })
+            
+            elif file.endswith(".zip"):
                 stat = os.stat(file_path)
                 
                 # Try to read metadata
@@ -267,9 +469,26 @@ class BackupService:
         return backups
     
     @staticmethod
-    def restore_backup(backup_name: str) -> bool:
-        """Restore from backup"""
-        backup_file = f"backups/{backup_name}.zip"
+    def restore_backup(backup_name: str, tables: Optional[List[str]] = None, verify_only: bool = False) -> bool:
+        """
+        Restore from backup.
+        
+        ``tables`` reloads only those tables' data as of the backup and leaves the rest
+        of the database (and the uploads) alone. ``verify_only`` checks the backup
+        against its manifest without changing anything. Both need a manifest backup.
+        """
+        backup_dir = _backup_dir(backup_name)
+        store = remote_store()
+        manifest = _read_manifest(backup_dir)
+        if manifest is None and store is not None and not os.path.exists(f"{backup_dir}.zip"):
+            # Not on this machine (e.g. a restore drill on a fresh host): stream it from the remote store
+            manifest = _read_remote_manifest(store, backup_name)
+        if manifest is not None:
+            return BackupService._restore_manifest_backup(backup_dir, manifest, store, tables, verify_only)
+        if tables or verify_only:
+            raise ValueError("Table restores and verification need a backup with a manifest")
+        
+        backup_file = f"{backup_dir}.zip"
         
         if not os.path.exists(backup_file):
             raise FileNotFoundError(f"Backup file not found: {backup_file}")
@@ -304,7 +523,7 @@ class BackupService:
             
             logger.info(f"Backup restored successfully: {backup_name}")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Failed to restore backup: {str(e)}")
             # Clean up on failure
@@ -313,33 +532,163 @@ class BackupService:
             raise
     
     @staticmethod
-    def _restore_database(backup_file: str):
-        """Restore database from backup file"""
+    def _restore_manifest_backup(
+        backup_dir: str,
+        manifest: Dict[str, Any],
+        store,
+        tables: Optional[List[str]] = None,
+        verify_only: bool = False
+    ) -> bool:
+        """
+        Restore a manifest backup.
+        
+        The dump and the uploads are streamed from the local copy, or from the remote
+        store when there is none. They are checked against the manifest's SHA-256 sums
+        while being written to a temporary dump file and a staging directory. Nothing
+        live changes until every check passed. Then the database is restored with
+        ``pg_restore --jobs`` (or only ``tables`` are reloaded), and the staged uploads
+        are swapped in.
+        """
+        backup_name = manifest["backup_name"]
+        jobs = settings.BACKUP_RESTORE_JOBS or os.cpu_count() or 1
+        restore_files = bool(manifest.get("include_files")) and not tables and not verify_only
+        check_files = bool(manifest.get("include_files")) and (restore_files or verify_only)
+        staging_dir = f"{settings.UPLOAD_DIR}.restore" if restore_files else None
+        started = time.monotonic()
+        
+        os.makedirs(settings.BACKUP_DIR, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(dir=settings.BACKUP_DIR, prefix="restore_")
+        try:
+            db_backup_file = BackupService._fetch_database(backup_dir, manifest, temp_dir, store)
+            if check_files:
+                BackupService._stage_files(manifest["files"], staging_dir, store, jobs)
+            
+            if verify_only:
+                logger.info(f"Backup verified: {backup_name} ({time.monotonic() - started:.1f}s)")
+                return True
+            
+            if tables:
+                BackupService._restore_tables(db_backup_file, tables)
+            else:
+                BackupService._restore_database(db_backup_file, jobs)
+            
+            if restore_files:
+                BackupService._cleanup_directory(settings.UPLOAD_DIR)
+                os.replace(staging_dir, settings.UPLOAD_DIR)
+            
+            restored = f"tables {', '.join(tables)} of " if tables else ""
+            logger.info(f"Backup restored successfully: {restored}{backup_name} ({time.monotonic() - started:.1f}s)")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Failed to restore backup: {str(e)}")
+            raise
+        finally:
+            BackupService._cleanup_directory(temp_dir)
+            if staging_dir:
+                BackupService._cleanup_directory(staging_dir)
+    
+    @staticmethod
+    def _fetch_database(backup_dir: str, manifest: Dict[str, Any], temp_dir: str, store) -> str:
+        """Stream-decompress the database dump into ``temp_dir``, verifying it against the manifest"""
+        database = manifest["database"]
+        db_backup_file = os.path.join(temp_dir, database["file"].removesuffix(".gz"))
+        source = _open_backup_file(
+            os.path.join(backup_dir, database["file"]),
+            f"{manifest['backup_name']}/{database['file']}",
+            store
+        )
+        with closing(source), open(db_backup_file, "wb") as target:
+            reader = _HashingReader(source)
+            try:
+                with gzip.GzipFile(fileobj=reader, mode="rb") as decompressed:
+                    shutil.copyfileobj(decompressed, target, COPY_CHUNK_SIZE)
+            except (gzip.BadGzipFile, EOFError, zlib.error) as e:
+                raise BackupVerificationError(f"Database backup {database['file']} is corrupt: {str(e)}")
+            # Whatever follows the last gzip member still counts for the checksum
+            while reader.read(COPY_CHUNK_SIZE):
+                pass
+        
+        if reader.sha256.hexdigest() != database["sha256"] or reader.size != database["size"]:
+            raise BackupVerificationError(f"Database backup {database['file']} does not match its manifest checksum")
+        if os.path.getsize(db_backup_file) != database["raw_size"]:
+            raise BackupVerificationError(f"Database backup {database['file']} decompressed to an unexpected size")
+        return db_backup_file
+    
+    @staticmethod
+    def _stage_files(files: List[Dict[str, Any]], staging_dir: Optional[str], store, jobs: int):
+        """
+        Copy uploads from their blobs into ``staging_dir`` on ``jobs`` threads, checking
+        every copy against the manifest. With no ``staging_dir`` the blobs are only checked.
+        """
+        if staging_dir is None:
+            # Verification only: each distinct blob once
+            files = list({entry["sha256"]: entry for entry in files}.values())
+        else:
+            BackupService._cleanup_directory(staging_dir)
+            os.makedirs(staging_dir)
+            for directory in {os.path.dirname(entry["path"]) for entry in files}:
+                os.makedirs(os.path.join(staging_dir, *directory.split("/")), exist_ok=True)
+        
+        def stage(entry: Dict[str, Any]):
+            digest = entry["sha256"]
+            target = os.path.join(staging_dir, *entry["path"].split("/")) if staging_dir else None
+            with closing(_open_backup_file(_blob_path(digest), _blob_key(digest), store)) as source:
+                reader = _HashingReader(source)
+                if target is None:
+                    while reader.read(COPY_CHUNK_SIZE):
+                        pass
+                else:
+                    with open(target, "wb") as f:
+                        shutil.copyfileobj(reader, f, COPY_CHUNK_SIZE)
+            if reader.sha256.hexdigest() != digest or reader.size != entry["size"]:
+                raise BackupVerificationError(f"Uploaded file {entry['path']} does not match its manifest checksum")
+            if target is not None:
+                # The original mtime lets the next backup reuse the stored hash
+                os.utime(target, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+        
+        with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="restore") as executor:
+            for _ in executor.map(stage, files):
+                pass
+    
+    @staticmethod
+    def _restore_database(backup_file: str, jobs: int = 1):
+        """Restore database from backup file (custom-format dumps on ``jobs`` parallel connections)"""
         db_url = settings.DATABASE_URL
         
-        if "postgresql" in db_url and backup_file.endswith(".sql"):
-            # PostgreSQL restore - find psql tool
-            psql_path = _find_pg_tool("psql")
+        if "postgresql" in db_url and backup_file.endswith(".dump"):
+            # Custom-format dump - restore with pg_restore
+            pg_restore_path = _find_pg_tool("pg_restore")
+            args, env = _pg_connection()
             
-            # Parse connection details
-            import urllib.parse
-            parsed = urllib.parse.urlparse(db_url)
+            cmd = [
+                pg_restore_path,
+                *args,
+                "--no-password",
+                "--clean",
+                "--if-exists",
+                "--no-acl",
+                "--no-owner",
+                f"--jobs={jobs}",
+                backup_file
+            ]
             
-            host = parsed.hostname
-            port = parsed.port or 5432
-            database = parsed.path[1:]
-            username = parsed.username
-            password = parsed.password
+            logger.info(f"Running pg_restore: {' '.join(cmd[:5])}...")
+            result = subprocess.run(cmd, env=env, capture_output=True, text=True)
             
-            env = os.environ.copy()
-            env["PGPASSWORD"] = password
+            if result.returncode != 0:
+                raise Exception(f"Database restore failed: {result.stderr}")
+            
+            logger.info(f"Database restored from: {backup_file}")
+        
+        elif "postgresql" in db_url and backup_file.endswith(".sql"):
+            # PostgreSQL restore - find psql tool
+            psql_path = _find_pg_tool("psql")
+            args, env = _pg_connection()
             
             cmd = [
                 psql_path,
-                f"-h{host}",
-                f"-p{port}",
-                f"-U{username}",
-                f"-d{database}",
+                *args,
                 "--no-password",
                 "-f", backup_file
             ]
@@ -361,52 +710,158 @@ class BackupService:
         else:
             raise Exception("Unsupported database backup format")
     
+    @staticmethod
+    def _restore_tables(backup_file: str, tables: List[str]):
+        """
+        Reload only ``tables`` from a dump: in one transaction they are emptied and refilled
+        with the backup's rows, so any error leaves them as they were. Tables referencing
+        a selected table by foreign key must be selected too.
+        """
+        db_url = settings.DATABASE_URL
+        
+        if "postgresql" in db_url and backup_file.endswith(".dump"):
+            pg_restore_path = _find_pg_tool("pg_restore")
+            psql_path = _find_pg_tool("psql")
+            args, env = _pg_connection()
+            
+            listing = subprocess.run([pg_restore_path, "--list", backup_file], capture_output=True, text=True)
+            if listing.returncode != 0:
+                raise Exception(f"Could not read database backup: {listing.stderr}")
+            schemas = {}
+            for line in listing.stdout.splitlines():
+                match = TABLE_DATA_PATTERN.match(line)
+                if match:
+                    schemas[match.group("table")] = match.group("schema")
+            unknown = sorted(set(tables) - set(schemas))
+            if unknown:
+                raise ValueError(f"Tables not in backup: {', '.join(unknown)}")
+            
+            # The selected data goes to a file first: psql must not commit a dump that stopped halfway
+            data_file = f"{backup_file}.tables.sql"
+            cmd = [
+                pg_restore_path,
+                "--data-only",
+                "--no-acl",
+                "--no-owner",
+                *(f"--table={table}" for table in tables),
+                "-f", data_file,
+                backup_file
+            ]
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise Exception(f"Database restore failed: {result.stderr}")
+            
+            quoted = ", ".join(
+                '"{}"."{}"'.format(schemas[table].replace('"', '""'), table.replace('"', '""')) for table in tables
+            )
+            cmd = [
+                psql_path,
+                *args,
+                "--no-password",
+                "--single-transaction",
+                "-v", "ON_ERROR_STOP=1",
+                "-c", f"TRUNCATE TABLE {quoted}",
+                "-f", data_file
+            ]
+            
+            logger.info(f"Running psql table restore: {' '.join(cmd[:5])}...")
+            result = subprocess.run(cmd, env=env, capture_output=True, text=True)
+            
+            if result.returncode != 0:
+                raise Exception(f"Database restore failed: {result.stderr}")
+        
+        elif "sqlite" in db_url and backup_file.endswith(".db"):
+            conn = sqlite3.connect(db_url.replace("sqlite:///", ""))
+            try:
+                conn.execute("ATTACH DATABASE ? AS backup", (backup_file,))
+                available = {row[0] for row in conn.execute("SELECT name FROM backup.sqlite_master WHERE type = 'table'")}
+                unknown = sorted(set(tables) - available)
+                if unknown:
+                    raise ValueError(f"Tables not in backup: {', '.join(unknown)}")
+                with conn:
+                    for table in tables:
+                        quoted = table.replace('"', '""')
+                        conn.execute(f'DELETE FROM main."{quoted}"')
+                        conn.execute(f'INSERT INTO main."{quoted}" SELECT * FROM backup."{quoted}"')
+            finally:
+                conn.close()
+        
+        else:
+            raise Exception("Unsupported database backup format")
+    
     @staticmethod
     def _restore_files(uploads_backup_dir: str):
         """Restore uploaded files"""
-        uploads_dir = "uploads"
+        uploads_dir = settings.UPLOAD_DIR
         
         # Remove existing uploads directory
         if os.path.exists(uploads_dir):
-            import shutil
             shutil.rmtree(uploads_dir)
         
         # Copy backup
-        import shutil
         shutil.copytree(uploads_backup_dir, uploads_dir)
     
     @staticmethod
-    def delete_backup(backup_name: str) -> bool:
-        """Delete a backup"""
-        backup_file = f"backups/{backup_name}.zip"
-        
+    def delete_backup(backup_name: str, collect_garbage: bool = True) -> bool:
+        """Delete a backup (and, unless ``collect_garbage`` is False, blobs no backup references anymore)"""
         try:
+            backup_dir = _backup_dir(backup_name)
+            backup_file = f"{backup_dir}.zip"
+            
             if os.path.exists(backup_file):
                 os.remove(backup_file)
+            BackupService._cleanup_directory(backup_dir)
             
-            # Also delete from S3 if configured
-            if settings.AWS_ACCESS_KEY_ID and settings.AWS_BUCKET_NAME:
+            # Also delete from the remote store if configured
+            store = remote_store()
+            if store is not None:
                 try:
-                    s3_client = boto3.client(
-                        's3',
-                        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                        region_name=settings.AWS_REGION
-                    )
-                    
-                    s3_key = f"backups/{backup_name}.zip"
-                    s3_client.delete_object(Bucket=settings.AWS_BUCKET_NAME, Key=s3_key)
-                    
+                    # The manifest first: without it the remote backup is no longer complete
+                    keys = sorted(store.list_keys(f"{backup_name}/"), key=lambda key: not key.endswith(MANIFEST_FILE))
+                    for key in [f"{backup_name}.zip", *keys]:
+                        store.delete(key)
+                
                 except Exception as e:
                     logger.warning(f"Failed to delete backup from S3: {str(e)}")
             
+            if collect_garbage:
+                BackupService.collect_garbage()
+            
             logger.info(f"Backup deleted successfully: {backup_name}")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Failed to delete backup: {str(e)}")
             return False
     
+    @staticmethod
+    def collect_garbage() -> int:
+        """Delete blobs that no backup references anymore (locally and from the remote store)"""
+        blobs_dir = os.path.join(settings.BACKUP_DIR, BLOBS_DIR)
+        if not os.path.exists(blobs_dir):
+            return 0
+        
+        referenced = {entry["sha256"] for manifest in _manifests() for entry in manifest.get("files", [])}
+        cutoff = (datetime.now() - BLOB_GC_GRACE).timestamp()
+        store = remote_store()
+        deleted_count = 0
+        
+        for root, _, names in os.walk(blobs_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                if name in referenced or os.path.getmtime(path) > cutoff:
+                    continue
+                os.remove(path)
+                deleted_count += 1
+                if store is not None and not name.endswith(".tmp"):
+                    try:
+                        store.delete(_blob_key(name))
+                    except Exception as e:
+                        logger.warning(f"Failed to delete blob {name} from S3: {str(e)}")
+        
+        logger.info(f"Deleted {deleted_count} unreferenced backup blobs")
+        return deleted_count
+    
     @staticmethod
     def cleanup_old_backups(days_to_keep: int = 30) -> int:
         """Delete backups older than specified days"""
@@ -417,8 +872,11 @@ class BackupService:
         for backup in backups:
             created_at = datetime.fromisoformat(backup["created_at"])
             if created_at < cutoff_date:
-                if BackupService.delete_backup(backup["name"]):
+                if BackupService.delete_backup(backup["name"], collect_garbage=False):
                     deleted_count += 1
         
+        if deleted_count:
+            BackupService.collect_garbage()
+        
         logger.info(f"Cleaned up {deleted_count} old backups")
         return deleted_count
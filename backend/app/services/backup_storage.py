@@ -0,0 +1,303 @@
+"""
+Object storage for backups.
+
+``remote_store()`` returns the configured backup target:
+
+* ``S3ObjectStore``: AWS S3 or any S3-compatible server (MinIO via
+  ``BACKUP_S3_ENDPOINT_URL``) when ``AWS_ACCESS_KEY_ID`` and
+  ``AWS_BUCKET_NAME`` are set.
+* ``LocalObjectStore``: a directory (``BACKUP_REMOTE_DIR``) with the same
+  interface. It stands in for S3 in tests and works for a mounted NAS.
+* None: backups are kept in ``BACKUP_DIR`` only.
+
+Writers stream: ``S3ObjectStore`` uploads a part as soon as
+``BACKUP_MULTIPART_CHUNK_MB`` bytes are buffered, so an object never needs to
+exist as a whole on disk or in memory before it is uploaded.
+"""
+from typing import BinaryIO, Iterator, Optional
+import logging
+import os
+import shutil
+import tempfile
+
+import boto3 # type: ignore[import-untyped]
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "backups/"
+
+
+class LocalObjectStore:
+    """Directory-backed object store with the ``S3ObjectStore`` interface"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def open_writer(self, key: str) -> "LocalObjectWriter":
+        return LocalObjectWriter(self._path(key))
+
+    def upload_file(self, path: str, key: str) -> None:
+        with open(path, "rb") as source, self.open_writer(key) as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+
+    def open_reader(self, key: str) -> BinaryIO:
+        return open(self._path(key), "rb")
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def delete(self, key: str) -> None:
+        path = self._path(key)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        # Like S3 "directories", parent directories disappear with their last object
+        parent = os.path.dirname(path)
+        while parent != os.path.normpath(self.root):
+            try:
+                os.rmdir(parent)
+            except OSError:
+                break
+            parent = os.path.dirname(parent)
+
+    def list_keys(self, prefix: str = "") -> Iterator[str]:
+        for root, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                key = os.path.relpath(os.path.join(root, name), self.root).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    yield key
+
+
+class LocalObjectWriter:
+    """Writes to a temporary file that replaces the target on ``close()`` (never a partial object)"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        fd, self._tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, data) -> int:
+        return self._file.write(data)
+
+    def close(self) -> None:
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self) -> None:
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class S3ObjectStore:
+    def __init__(self, client, bucket: str, prefix: str = KEY_PREFIX, part_size: Optional[int] = None):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        # S3 parts must be at least 5 MiB (except the last)
+        self.part_size = max(part_size or settings.BACKUP_MULTIPART_CHUNK_MB * 1024 * 1024, 5 * 1024 * 1024)
+
+    def open_writer(self, key: str) -> "S3MultipartWriter":
+        return S3MultipartWriter(self.client, self.bucket, self.prefix + key, self.part_size)
+
+    def upload_file(self, path: str, key: str) -> None:
+        with open(path, "rb") as source, self.open_writer(key) as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+
+    def open_reader(self, key: str) -> BinaryIO:
+        return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)["Body"]
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+            return True
+        except self.client.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+    def list_keys(self, prefix: str = "") -> Iterator[str]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix + prefix):
+            for item in page.get("Contents", []):
+                yield item["Key"][len(self.prefix):]
+
+
+class S3MultipartWriter:
+    """
+    Streams an object to S3 as a multipart upload, one part per ``part_size`` bytes.
+    Objects smaller than one part are sent with a single ``put_object``.
+    """
+
+    def __init__(self, client, bucket: str, key: str, part_size: int):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self._buffer = bytearray()
+        self._upload_id: Optional[str] = None
+        self._parts: list = []
+
+    def write(self, data) -> int:
+        self._buffer += data
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._upload_part(part)
+        return len(data)
+
+    def _upload_part(self, body: bytes) -> None:
+        if self._upload_id is None:
+            self._upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=self.key)["UploadId"]
+        number = len(self._parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id, PartNumber=number, Body=body
+        )
+        self._parts.append({"PartNumber": number, "ETag": response["ETag"]})
+
+    def close(self) -> None:
+        if self._upload_id is None:
+            self.client.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer))
+            self._buffer.clear()
+            return
+        if self._buffer:
+            self._upload_part(bytes(self._buffer))
+            self._buffer.clear()
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id, MultipartUpload={"Parts": self._parts}
+        )
+
+    def abort(self) -> None:
+        self._buffer.clear()
+        if self._upload_id is not None:
+            try:
+                self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+            except Exception as e:
+                logger.warning(f"Failed to abort multipart upload of {self.key}: {str(e)}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def remote_store():
+    """The configured backup object store, or None when backups are local only"""
+    if settings.AWS_ACCESS_KEY_ID and settings.AWS_BUCKET_NAME:
+        client = boto3.client(
+            's3',
+            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            region_name=settings.AWS_REGION,
+            endpoint_url=settings.BACKUP_S3_ENDPOINT_URL or None
+        )
+        return S3ObjectStore(client, settings.AWS_BUCKET_NAME)
+    if settings.BACKUP_REMOTE_DIR:
+        return LocalObjectStore(settings.BACKUP_REMOTE_DIR)
+    return None
+
+
+class BackupMirror:
+    """
+    Best-effort copy of a backup to the remote store.
+
+    A local backup must not fail because the remote is down, so the first remote
+    error is logged and disables the mirror for the rest of the backup. ``active``
+    then stays False, and the backup's manifest is not uploaded, so the remote
+    never holds a manifest that points at missing objects.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.failed = False
+
+    @property
+    def active(self) -> bool:
+        return self.store is not None and not self.failed
+
+    def fail(self, action: str, error: Exception) -> None:
+        logger.error(f"Failed to {action} on backup storage, continuing with the local backup only: {str(error)}")
+        self.failed = True
+
+    def upload_file(self, path: str, key: str, skip_existing: bool = False) -> None:
+        if not self.active:
+            return
+        try:
+            if skip_existing and self.store.exists(key):
+                return
+            self.store.upload_file(path, key)
+        except Exception as e:
+            self.fail(f"upload {key}", e)
+
+    def tee(self, local: BinaryIO, key: str) -> "MirrorWriter":
+        return MirrorWriter(local, self, key)
+
+
+class MirrorWriter:
+    """Writes to a local file and, while the mirror is healthy, streams the same bytes to the remote store"""
+
+    def __init__(self, local: BinaryIO, mirror: BackupMirror, key: str):
+        self.local = local
+        self.mirror = mirror
+        self.key = key
+        self._remote = None
+        if mirror.active:
+            try:
+                self._remote = mirror.store.open_writer(key)
+            except Exception as e:
+                mirror.fail(f"start upload of {key}", e)
+
+    def write(self, data) -> int:
+        self.local.write(data)
+        if self._remote is not None:
+            try:
+                self._remote.write(data)
+            except Exception as e:
+                self._drop_remote(f"upload {self.key}", e)
+        return len(data)
+
+    def _drop_remote(self, action: str, error: Exception) -> None:
+        remote, self._remote = self._remote, None
+        remote.abort()
+        self.mirror.fail(action, error)
+
+    def __enter__(self) -> "MirrorWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if self._remote is None:
+            return
+        if exc_type is not None:
+            self._remote.abort()
+            return
+        try:
+            self._remote.close()
+        except Exception as e:
+            self._drop_remote(f"complete upload of {self.key}", e)
@@ -1,14 +1,56 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, func, insert, update
 from datetime import datetime, timedelta
+from bisect import bisect_left, bisect_right
 import csv
 import io
-from typing import List
+import logging
+from typing import List, Dict, Any, BinaryIO, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
 
 from ..models.banking import BankAccount, BankTransaction, TransactionStatus
 from ..models.journal_entry import AccountingJournalEntry, JournalEntryLine, JournalEntryStatus
 from ..models.account import Account
 
+logger = logging.getLogger(__name__)
+
+# Accepted header spellings for each statement column (first match wins)
+STATEMENT_COLUMNS = {
+    "date": ("Date", "date", "Transaction Date", "Posted Date"),
+    "description": ("Description", "description", "Memo", "memo", "Payee"),
+    "amount": ("Amount", "amount"),
+}
+
+# Rows per parsing / insert batch when streaming a statement
+IMPORT_CHUNK_SIZE = 5000
+
+# Maximum number of row-level errors returned to the caller
+MAX_IMPORT_ERRORS = 500
+
+# Default reconciliation tolerances (same as the single-transaction matcher)
+RECONCILE_AMOUNT_TOLERANCE = 0.01
+RECONCILE_DATE_TOLERANCE_DAYS = 3
+
+Fingerprint = Tuple[datetime, int, str]
+
+
+def _fingerprint(date: datetime, amount: float, description: str) -> Fingerprint:
+    """Identity of a statement line within a bank account (amount in cents)."""
+    return (date.replace(tzinfo=None), int(round(amount * 100)), (description or "").strip().lower())
+
+
+def _resolve_columns(columns) -> Dict[str, str]:
+    resolved = {}
+    for field, candidates in STATEMENT_COLUMNS.items():
+        for candidate in candidates:
+            if candidate in columns:
+                resolved[field] = candidate
+                break
+    return resolved
+
+
 class BankingService:
     @staticmethod
     def match_transaction(db: Session, transaction_id: int) -> bool:
@@ -31,8 +73,13 @@ class BankingService:
         from ..models.account import AccountType
         
         # Search window: +/- 3 days
-        start_date = transaction.date - timedelta(days=3)
-        end_date = transaction.date + timedelta(days=3)
+        start_date = transaction.date - timedelta(days=RECONCILE_DATE_TOLERANCE_DAYS)
+        end_date = transaction.date + timedelta(days=RECONCILE_DATE_TOLERANCE_DAYS)
+
+        # Journal entries already reconciled against another bank transaction
+        linked_entries = db.query(BankTransaction.journal_entry_id).filter(
+            BankTransaction.journal_entry_id.isnot(None)
+        )
 
         match = (
             db.query(AccountingJournalEntry)
@@ -41,12 +88,13 @@ class BankingService:
             .filter(
                 Account.account_type == AccountType.ASSET,
                 AccountingJournalEntry.entry_date.between(start_date, end_date),
-                AccountingJournalEntry.status == JournalEntryStatus.POSTED
+                AccountingJournalEntry.status == JournalEntryStatus.POSTED,
+                ~AccountingJournalEntry.id.in_(linked_entries)
             )
             .filter(
                 or_(
-                    and_(is_deposit, JournalEntryLine.debit_amount >= target_amount - 0.01, JournalEntryLine.debit_amount <= target_amount + 0.01),
-                    and_(not is_deposit, JournalEntryLine.credit_amount >= target_amount - 0.01, JournalEntryLine.credit_amount <= target_amount + 0.01)
+                    and_(is_deposit, JournalEntryLine.debit_amount >= target_amount - RECONCILE_AMOUNT_TOLERANCE, JournalEntryLine.debit_amount <= target_amount + RECONCILE_AMOUNT_TOLERANCE),
+                    and_(not is_deposit, JournalEntryLine.credit_amount >= target_amount - RECONCILE_AMOUNT_TOLERANCE, JournalEntryLine.credit_amount <= target_amount + RECONCILE_AMOUNT_TOLERANCE)
                 )
             )
             .first()
@@ -60,6 +108,129 @@ class BankingService:
 
         return False
 
+    @staticmethod
+    def reconcile_batch(
+        db: Session,
+        start_date: datetime,
+        end_date: datetime,
+        bank_account_id: Optional[int] = None,
+        amount_tolerance: float = RECONCILE_AMOUNT_TOLERANCE,
+        date_tolerance_days: int = RECONCILE_DATE_TOLERANCE_DAYS
+    ) -> Dict[str, Any]:
+        """
+        Reconcile all pending bank transactions dated within [start_date, end_date].
+
+        Pending transactions and candidate journal lines (posted entries on asset
+        accounts, or on the bank account's GL account when one is configured)
+        are loaded once. Lines are indexed by side (debit for deposits, credit for
+        withdrawals) in amount order; each transaction takes the unused entry whose
+        amount is within ``amount_tolerance`` and whose date is closest, within
+        ``date_tolerance_days``. A journal entry is matched to at most one
+        transaction. Links are written with a single bulk update.
+        """
+        from ..models.account import AccountType
+
+        tx_query = db.query(BankTransaction).filter(
+            BankTransaction.status == TransactionStatus.PENDING,
+            BankTransaction.journal_entry_id.is_(None),
+            BankTransaction.date >= start_date,
+            BankTransaction.date <= end_date
+        )
+        gl_account_ids = None
+        if bank_account_id is not None:
+            tx_query = tx_query.filter(BankTransaction.bank_account_id == bank_account_id)
+            bank_account = db.query(BankAccount).filter(BankAccount.id == bank_account_id).first()
+            if bank_account and bank_account.gl_account_id:
+                gl_account_ids = [bank_account.gl_account_id]
+        transactions = tx_query.all()
+
+        result = {
+            "start_date": start_date,
+            "end_date": end_date,
+            "pending": len(transactions),
+            "matched": 0,
+            "unmatched": len(transactions),
+            "matches": [],
+        }
+        if not transactions:
+            return result
+
+        window = timedelta(days=date_tolerance_days)
+        linked_entries = db.query(BankTransaction.journal_entry_id).filter(
+            BankTransaction.journal_entry_id.isnot(None)
+        )
+        line_query = (
+            db.query(
+                JournalEntryLine.journal_entry_id,
+                JournalEntryLine.debit_amount,
+                JournalEntryLine.credit_amount,
+                AccountingJournalEntry.entry_date
+            )
+            .join(AccountingJournalEntry, JournalEntryLine.journal_entry_id == AccountingJournalEntry.id)
+            .join(Account, JournalEntryLine.account_id == Account.id)
+            .filter(
+                AccountingJournalEntry.status == JournalEntryStatus.POSTED,
+                AccountingJournalEntry.entry_date >= start_date - window,
+                AccountingJournalEntry.entry_date <= end_date + window,
+                ~AccountingJournalEntry.id.in_(linked_entries)
+            )
+        )
+        if gl_account_ids:
+            line_query = line_query.filter(JournalEntryLine.account_id.in_(gl_account_ids))
+        else:
+            line_query = line_query.filter(Account.account_type == AccountType.ASSET)
+
+        # Per side: (amount in cents, entry date, entry id) sorted by amount, plus the bare amount keys for bisect
+        sides = {"debit": [], "credit": []}
+        for entry_id, debit, credit, entry_date in line_query.all():
+            if debit and debit > 0:
+                sides["debit"].append((int(round(debit * 100)), entry_date.replace(tzinfo=None), entry_id))
+            if credit and credit > 0:
+                sides["credit"].append((int(round(credit * 100)), entry_date.replace(tzinfo=None), entry_id))
+        index = {}
+        for side, candidates in sides.items():
+            candidates.sort()
+            index[side] = ([c[0] for c in candidates], candidates)
+
+        tolerance_cents = int(round(amount_tolerance * 100))
+        used_entries: Set[int] = set()
+        updates = []
+        # Process in amount/date order so the assignment is deterministic
+        for tx in sorted(transactions, key=lambda t: (abs(t.amount), t.date, t.id)):
+            amounts, candidates = index["debit" if tx.amount > 0 else "credit"]
+            target = int(round(abs(tx.amount) * 100))
+            tx_date = tx.date.replace(tzinfo=None)
+            lo = bisect_left(amounts, target - tolerance_cents)
+            hi = bisect_right(amounts, target + tolerance_cents)
+
+            best = None
+            best_key = None
+            for amount_cents, entry_date, entry_id in candidates[lo:hi]:
+                if entry_id in used_entries:
+                    continue
+                gap = abs(entry_date - tx_date)
+                if gap > window:
+                    continue
+                key = (gap, abs(amount_cents - target), entry_id)
+                if best_key is None or key < best_key:
+                    best, best_key = entry_id, key
+            if best is None:
+                continue
+
+            used_entries.add(best)
+            updates.append({"id": tx.id, "journal_entry_id": best, "status": TransactionStatus.COMPLETED})
+
+        if updates:
+            db.execute(update(BankTransaction), updates)
+            db.commit()
+
+        result["matched"] = len(updates)
+        result["unmatched"] = len(transactions) - len(updates)
+        result["matches"] = [
+            {"transaction_id": u["id"], "journal_entry_id": u["journal_entry_id"]} for u in updates
+        ]
+        return result
+
     @staticmethod
     def process_csv_upload(db: Session, bank_account_id: int, file_content: bytes):
         """
@@ -94,10 +265,164 @@ class BankingService:
                     db.add(tx)
                     transactions.append(tx)
                 except Exception as e:
-                    print(f"Skipping row {row}: {e}")
+                    logger.warning(f"Skipping row {row}: {e}")
                     continue
         
         db.commit()
         return transactions
 
+    @staticmethod
+    def _load_fingerprints(
+        db: Session, bank_account_id: int, start: datetime, end: datetime, up_to_id: Optional[int]
+    ) -> Set[Fingerprint]:
+        """Fingerprints of the account's transactions within [start, end] with ids up to ``up_to_id``."""
+        if up_to_id is None:
+            return set()
+        rows = db.query(
+            BankTransaction.date, BankTransaction.amount, BankTransaction.description
+        ).filter(
+            BankTransaction.bank_account_id == bank_account_id,
+            BankTransaction.id <= up_to_id,
+            BankTransaction.date >= start,
+            BankTransaction.date <= end
+        ).all()
+        return {_fingerprint(r.date, r.amount, r.description) for r in rows}
+
+    @staticmethod
+    def import_statement(
+        db: Session,
+        bank_account_id: int,
+        stream: BinaryIO,
+        chunk_size: int = IMPORT_CHUNK_SIZE
+    ) -> Dict[str, Any]:
+        """
+        Stream a CSV bank statement into BankTransaction rows.
+
+        The upload is read in chunks of ``chunk_size`` lines; dates and amounts
+        are parsed column-wise per chunk, lines already present for the account
+        (same date, amount and description) are skipped using an in-memory hash
+        index, and new rows are bulk-inserted. Only transactions stored before the
+        import count as duplicates: identical lines within the file (e.g. two equal
+        card purchases on one day) are separate transactions and are all imported. Everything is committed in one
+        transaction at the end.
+        Returns counts plus a row-level error report (1-based CSV line numbers).
+        """
+        bank_account = db.query(BankAccount).filter(BankAccount.id == bank_account_id).first()
+        if not bank_account:
+            raise ValueError(f"Bank account {bank_account_id} not found")
+
+        existing: Set[Fingerprint] = set()
+        # Rows this import inserts get higher ids and are never loaded as existing
+        last_existing_id = db.query(func.max(BankTransaction.id)).filter(
+            BankTransaction.bank_account_id == bank_account_id
+        ).scalar()
+        loaded_window: Optional[Tuple[datetime, datetime]] = None
+        errors: List[Dict[str, Any]] = []
+        total_rows = 0
+        inserted = 0
+        duplicates = 0
+        failed = 0
+
+        def report(line_numbers, message):
+            for line in line_numbers:
+                if len(errors) < MAX_IMPORT_ERRORS:
+                    errors.append({"row": int(line), "error": message})
+
+        reader = pd.read_csv(
+            stream,
+            dtype=str,
+            chunksize=chunk_size,
+            encoding="utf-8-sig",
+            skipinitialspace=True,
+            keep_default_na=False,
+        )
+        columns = None
+        for chunk in reader:
+            if columns is None:
+                columns = _resolve_columns(chunk.columns)
+                missing = {"date", "amount"} - columns.keys()
+                if missing:
+                    raise ValueError(f"Missing required column(s): {', '.join(sorted(missing))}")
+
+            # Header is line 1, so the first data row is line 2
+            line_numbers = chunk.index.to_numpy() + 2
+            total_rows += len(chunk)
+
+            raw_dates = chunk[columns["date"]].str.strip()
+            dates = pd.to_datetime(raw_dates, format="%Y-%m-%d", errors="coerce")
+            retry = dates.isna() & (raw_dates != "")
+            if retry.any():
+                dates[retry] = pd.to_datetime(raw_dates[retry], format="mixed", errors="coerce")
+
+            raw_amounts = chunk[columns["amount"]].str.strip()
+            # Accept "1,234.50", "$12", and accounting-style "(45.00)" negatives
+            negative = raw_amounts.str.startswith("(") & raw_amounts.str.endswith(")")
+            amounts = pd.to_numeric(raw_amounts.str.replace(r"[,$()\s]", "", regex=True), errors="coerce")
+            amounts = amounts.where(~negative, -amounts)
+
+            if "description" in columns:
+                descriptions = chunk[columns["description"]].str.strip()
+                descriptions = descriptions.where(descriptions != "", "Imported Transaction")
+            else:
+                descriptions = pd.Series("Imported Transaction", index=chunk.index)
+
+            bad_date = dates.isna().to_numpy()
+            bad_amount = amounts.isna().to_numpy() | ~np.isfinite(amounts.fillna(0).to_numpy())
+            report(line_numbers[bad_date], "Invalid or missing date")
+            report(line_numbers[~bad_date & bad_amount], "Invalid or missing amount")
+            valid = ~(bad_date | bad_amount)
+            failed += int((~valid).sum())
+            if not valid.any():
+                continue
+
+            dates = dates[valid]
+            amounts = amounts[valid].round(2)
+            descriptions = descriptions[valid]
+
+            # Extend the hash index to cover this chunk's date range (one query per chunk at most)
+            start = dates.min().to_pydatetime()
+            end = dates.max().to_pydatetime()
+            if loaded_window is None:
+                existing |= BankingService._load_fingerprints(db, bank_account_id, start, end, last_existing_id)
+                loaded_window = (start, end)
+            else:
+                if start < loaded_window[0]:
+                    existing |= BankingService._load_fingerprints(db, bank_account_id, start, loaded_window[0], last_existing_id)
+                if end > loaded_window[1]:
+                    existing |= BankingService._load_fingerprints(db, bank_account_id, loaded_window[1], end, last_existing_id)
+                loaded_window = (min(start, loaded_window[0]), max(end, loaded_window[1]))
+
+            mappings = []
+            for dt, amount, desc in zip(dates.dt.to_pydatetime(), amounts.tolist(), descriptions.tolist()):
+                if _fingerprint(dt, amount, desc) in existing:
+                    duplicates += 1
+                    continue
+                mappings.append({
+                    "bank_account_id": bank_account_id,
+                    "date": dt,
+                    "description": desc,
+                    "amount": amount,
+                    "status": TransactionStatus.PENDING,
+                })
+
+            if mappings:
+                db.execute(insert(BankTransaction), mappings)
+                inserted += len(mappings)
+
+        bank_account.last_synced_at = datetime.now()
+        db.commit()
+
+        if failed:
+            logger.warning(f"Statement import for bank account {bank_account_id}: {failed} row(s) rejected")
+
+        return {
+            "bank_account_id": bank_account_id,
+            "total_rows": total_rows,
+            "imported": inserted,
+            "duplicates": duplicates,
+            "failed": failed,
+            "errors": errors,
+            "errors_truncated": failed > len(errors),
+        }
+
 banking_service = BankingService()
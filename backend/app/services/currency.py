@@ -0,0 +1,229 @@
+from typing import List, Dict, Any, Optional, Tuple, NamedTuple, Sequence
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, datetime
+import numpy as np
+from sqlalchemy import and_ # type: ignore[import-untyped]
+from sqlalchemy.orm import Session # type: ignore[import-untyped]
+
+from ..core.cache import CommitInvalidatedCache
+from ..models import Currency, ExchangeRate
+
+
+RATE_CACHE_TTL_SECONDS = 300
+
+DEFAULT_BASE_CURRENCY = "USD"
+
+
+class CachedCurrency(NamedTuple):
+    id: int
+    code: str
+    symbol: str
+    decimal_places: int
+    is_base_currency: bool
+
+
+class ExchangeRateIndex:
+    """
+    Exchange rates per (from, to) currency pair, sorted by effective date.
+
+    The rate in force on a day is the latest one with ``effective_date <= day``; missing
+    pairs fall back to the inverse pair, then to a cross rate through the base currency.
+    """
+
+    def __init__(self, currencies: List[CachedCurrency], rates):
+        self.by_id: Dict[int, CachedCurrency] = {c.id: c for c in currencies}
+        self.by_code: Dict[str, CachedCurrency] = {c.code: c for c in currencies}
+        base = next((c for c in currencies if c.is_base_currency), None) or self.by_code.get(DEFAULT_BASE_CURRENCY)
+        self.base: Optional[CachedCurrency] = base
+
+        series: Dict[Tuple[int, int], List[Tuple[date, float]]] = defaultdict(list)
+        for row in rates:
+            series[(row.from_currency_id, row.to_currency_id)].append((row.effective_date, row.rate))
+        self.dates: Dict[Tuple[int, int], List[date]] = {}
+        self.rates: Dict[Tuple[int, int], List[float]] = {}
+        self.np_dates: Dict[Tuple[int, int], np.ndarray] = {}
+        self.np_rates: Dict[Tuple[int, int], np.ndarray] = {}
+        for pair, points in series.items():
+            # Same-day duplicates: the last one loaded (highest id) wins
+            by_day = dict(sorted(points, key=lambda p: p[0]))
+            days = sorted(by_day)
+            self.dates[pair] = days
+            self.rates[pair] = [by_day[d] for d in days]
+            self.np_dates[pair] = np.array(days, dtype="datetime64[D]")
+            self.np_rates[pair] = np.array(self.rates[pair], dtype=np.float64)
+
+    @classmethod
+    def load(cls, db: Session) -> "ExchangeRateIndex":
+        currencies = [
+            CachedCurrency(row.id, row.code, row.symbol, row.decimal_places, row.is_base_currency)
+            for row in db.query(
+                Currency.id, Currency.code, Currency.symbol, Currency.decimal_places, Currency.is_base_currency
+            )
+        ]
+        rates = db.query(
+            ExchangeRate.from_currency_id, ExchangeRate.to_currency_id, ExchangeRate.rate, ExchangeRate.effective_date
+        ).order_by(ExchangeRate.id).all()
+        return cls(currencies, rates)
+
+    def _direct(self, from_id: int, to_id: int, day: date) -> Optional[float]:
+        days = self.dates.get((from_id, to_id))
+        if not days:
+            return None
+        i = bisect_right(days, day) - 1
+        return self.rates[(from_id, to_id)][i] if i >= 0 else None
+
+    def rate(self, from_id: int, to_id: int, day: date) -> Optional[float]:
+        """Rate converting one unit of ``from_id`` into ``to_id`` on ``day`` (None if unknown)"""
+        if from_id == to_id:
+            return 1.0
+        direct = self._direct(from_id, to_id, day)
+        if direct is not None:
+            return direct
+        inverse = self._direct(to_id, from_id, day)
+        if inverse:
+            return 1.0 / inverse
+        base_id = self.base.id if self.base else None
+        if base_id is not None and base_id not in (from_id, to_id):
+            to_base = self.rate(from_id, base_id, day)
+            from_base = self.rate(base_id, to_id, day)
+            if to_base is not None and from_base is not None:
+                return to_base * from_base
+        return None
+
+    def _direct_many(self, pair: Tuple[int, int], days: np.ndarray) -> np.ndarray:
+        idx = np.searchsorted(self.np_dates[pair], days, side="right") - 1
+        return np.where(idx >= 0, self.np_rates[pair][np.maximum(idx, 0)], np.nan)
+
+    def rates_many(self, from_id: int, to_id: int, days: np.ndarray) -> np.ndarray:
+        """Vectorized ``rate`` for an array of ``datetime64[D]`` days (NaN where unknown)"""
+        if from_id == to_id:
+            return np.ones(len(days))
+        if (from_id, to_id) in self.np_dates:
+            result = self._direct_many((from_id, to_id), days)
+        else:
+            result = np.full(len(days), np.nan)
+        missing = np.isnan(result)
+        if missing.any() and (to_id, from_id) in self.np_dates:
+            inverse = self._direct_many((to_id, from_id), days[missing])
+            with np.errstate(divide="ignore"):
+                result[missing] = np.where(inverse > 0, 1.0 / inverse, np.nan)
+            missing = np.isnan(result)
+        base_id = self.base.id if self.base else None
+        if missing.any() and base_id is not None and base_id not in (from_id, to_id):
+            sub = days[missing]
+            result[missing] = self.rates_many(from_id, base_id, sub) * self.rates_many(base_id, to_id, sub)
+        return result
+
+
+_rate_cache = CommitInvalidatedCache(ExchangeRateIndex.load, RATE_CACHE_TTL_SECONDS)
+_rate_cache.watch(ExchangeRate).watch(Currency)
+
+
+def get_rate_index(db: Session) -> ExchangeRateIndex:
+    """Cached rate index, reloaded when stale or after a committed currency/rate write"""
+    return _rate_cache.get(db)
+
+
+def invalidate_rate_index() -> None:
+    _rate_cache.invalidate()
+
+
+def _as_day(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+class CurrencyService:
+    @staticmethod
+    def base_currency_code(db: Session) -> str:
+        index = get_rate_index(db)
+        return index.base.code if index.base else DEFAULT_BASE_CURRENCY
+
+    @staticmethod
+    def convert(db: Session, amount: float, from_code: str, to_code: Optional[str] = None, as_of=None) -> float:
+        """Convert one amount between currency codes at the rate in force on ``as_of`` (default today)"""
+        index = get_rate_index(db)
+        source = index.by_code.get(from_code)
+        target = index.by_code.get(to_code) if to_code else index.base
+        if not source or not target:
+            raise ValueError(f"Unknown currency: {from_code if not source else to_code}")
+        rate = index.rate(source.id, target.id, _as_day(as_of or date.today()))
+        if rate is None:
+            raise ValueError(f"No exchange rate from {source.code} to {target.code} on or before {as_of or date.today()}")
+        return round(amount * rate, target.decimal_places)
+
+    @staticmethod
+    def convert_many(
+        db: Session,
+        amounts: Sequence[float],
+        currency_ids: Sequence[Optional[int]],
+        dates: Sequence[Any],
+        to_currency_id: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Convert parallel arrays of amounts, currency ids and dates into one currency (base by default)
+        with one rate lookup per source currency. Rows without a currency are taken to be in the
+        target currency; rows with no known rate come back as NaN.
+        """
+        index = get_rate_index(db)
+        target_id = to_currency_id if to_currency_id is not None else (index.base.id if index.base else None)
+        values = np.asarray(amounts, dtype=np.float64)
+        result = values.copy()
+        if target_id is None or len(values) == 0:
+            return result
+
+        ids = np.array([target_id if c is None else c for c in currency_ids], dtype=np.int64)
+        days = np.array([_as_day(d) for d in dates], dtype="datetime64[D]")
+        for source_id in np.unique(ids):
+            if source_id == target_id:
+                continue
+            mask = ids == source_id
+            result[mask] = values[mask] * index.rates_many(int(source_id), target_id, days[mask])
+        return result
+
+    @staticmethod
+    def consolidated_total(db: Session, model, start_date: datetime, end_date: datetime, approved_only: bool = True) -> Dict[str, Any]:
+        """
+        Base-currency total of revenue/expense entries in a period: the amount recorded in base
+        currency at entry time when present, otherwise the amount converted at the entry date's rate.
+        """
+        filters = [model.date >= start_date, model.date <= end_date]
+        if approved_only:
+            filters.append(model.is_approved == True)
+        rows = db.query(model.amount, model.currency_id, model.date, model.amount_base_currency).filter(and_(*filters)).all()
+
+        index = get_rate_index(db)
+        base = index.base
+        result = {
+            "base_currency": base.code if base else DEFAULT_BASE_CURRENCY,
+            "total": 0.0,
+            "by_currency": {},
+            "unconverted_entries": 0,
+        }
+        if not rows:
+            return result
+
+        amounts = np.array([r.amount or 0.0 for r in rows], dtype=np.float64)
+        recorded = np.array([np.nan if r.amount_base_currency is None else r.amount_base_currency for r in rows], dtype=np.float64)
+        converted = CurrencyService.convert_many(db, amounts, [r.currency_id for r in rows], [r.date for r in rows])
+        base_amounts = np.where(np.isnan(recorded), converted, recorded)
+
+        missing = np.isnan(base_amounts)
+        result["unconverted_entries"] = int(missing.sum())
+        result["total"] = round(float(base_amounts[~missing].sum()), 2)
+
+        codes = np.array([
+            index.by_id[r.currency_id].code if r.currency_id in index.by_id else result["base_currency"]
+            for r in rows
+        ])
+        for code in np.unique(codes):
+            mask = codes == code
+            result["by_currency"][str(code)] = {
+                "amount": round(float(amounts[mask].sum()), 2),
+                "base_amount": round(float(np.nansum(base_amounts[mask])), 2),
+                "entries": int(mask.sum()),
+            }
+        return result
+
+
+currency_service = CurrencyService()
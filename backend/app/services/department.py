@@ -0,0 +1,89 @@
+from typing import List, Dict, Any, Optional
+from sqlalchemy import func, case, and_ # type: ignore[import-untyped]
+from sqlalchemy.orm import Session # type: ignore[import-untyped]
+
+from ..core.cache import CommitInvalidatedCache
+from ..models.user import User
+from ..models.department import Department
+
+
+DEPARTMENT_CACHE_TTL_SECONDS = 60
+
+# User columns that affect department summaries
+_DEPARTMENT_USER_FIELDS = ("department", "is_active")
+
+
+def department_id(name: str) -> str:
+    """URL id used by the departments API for a department name."""
+    return name.lower().replace(" ", "_")
+
+
+class DepartmentService:
+    """Department summaries derived from ``User.department`` plus optional ``Department`` metadata"""
+
+    @staticmethod
+    def _load_summaries(db: Session) -> List[Dict[str, Any]]:
+        """One grouped outer join: every department name in use, its metadata and active user count"""
+        rows = db.query(
+            User.department,
+            func.count(case((User.is_active == True, User.id))).label("user_count"),
+            func.max(Department.description).label("description"),
+            func.max(Department.created_at).label("created_at"),
+            func.max(Department.updated_at).label("updated_at"),
+        ).outerjoin(
+            Department, Department.name == User.department
+        ).filter(
+            and_(User.department.isnot(None), User.department != "")
+        ).group_by(User.department).order_by(User.department).all()
+
+        return [
+            {
+                "id": department_id(row.department),
+                "name": row.department,
+                "description": row.description or f"{row.department} department",
+                "user_count": row.user_count or 0,
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+                "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def get_departments(db: Session) -> List[Dict[str, Any]]:
+        """Cached department summaries, reloaded when stale or after a committed user/department write"""
+        summaries = _department_cache.get(db)
+        # Callers get copies so the cached entries are never mutated
+        return [dict(s) for s in summaries]
+
+    @staticmethod
+    def find_department(db: Session, decoded_id: str) -> Optional[Dict[str, Any]]:
+        """Match a department id against names in use (title case, spaces or exact, case-insensitive)"""
+        candidates = {
+            decoded_id.replace("_", " ").title().lower(),
+            decoded_id.replace("_", " ").lower(),
+            decoded_id.lower(),
+        }
+        for summary in DepartmentService.get_departments(db):
+            name = summary["name"]
+            if name.lower() in candidates or department_id(name) == decoded_id.lower():
+                return summary
+        return None
+
+    @staticmethod
+    def get_active_users(db: Session, name: str) -> List[Dict[str, Any]]:
+        rows = db.query(User.id, User.full_name, User.username, User.email).filter(
+            User.department == name,
+            User.is_active == True
+        ).order_by(User.id).all()
+        return [{"id": r.id, "name": r.full_name or r.username, "email": r.email} for r in rows]
+
+
+_department_cache = CommitInvalidatedCache(DepartmentService._load_summaries, DEPARTMENT_CACHE_TTL_SECONDS)
+_department_cache.watch(User, _DEPARTMENT_USER_FIELDS).watch(Department)
+
+
+def invalidate_department_cache() -> None:
+    _department_cache.invalidate()
+
+
+department_service = DepartmentService()
@@ -1,9 +1,22 @@
-from datetime import datetime, date
-from typing import List, Optional
+from datetime import datetime, date, timedelta
+from collections import defaultdict
+from typing import List, Optional, Dict, Any, Tuple
+import numpy as np
+from sqlalchemy import insert, update
 from sqlalchemy.orm import Session
 from ..models.fixed_asset import FixedAsset, DepreciationLog, DepreciationMethod, FixedAssetStatus
 from ..models.journal_entry import AccountingJournalEntry, JournalEntryLine, JournalEntryStatus, ReferenceType
 from ..crud.fixed_asset import fixed_asset as fixed_asset_crud
+from .ledger import LedgerService
+from .numbering import NumberingService
+
+def _month_bounds(period: date) -> Tuple[datetime, datetime]:
+    """First instant of the month containing ``period`` and of the following month."""
+    start = datetime(period.year, period.month, 1)
+    if period.month == 12:
+        return start, datetime(period.year + 1, 1, 1)
+    return start, datetime(period.year, period.month + 1, 1)
+
 
 class FixedAssetService:
     @staticmethod
@@ -29,9 +42,16 @@ class FixedAssetService:
         if not asset or asset.status != FixedAssetStatus.ACTIVE:
             return None
 
-        # Check if already depreciated this month (simplified check)
-        # In production, check DepreciationLog for the current month
-        
+        # Skip if already depreciated this month
+        month_start, next_month = _month_bounds(date.today())
+        already_logged = db.query(DepreciationLog.id).filter(
+            DepreciationLog.fixed_asset_id == asset.id,
+            DepreciationLog.period_start >= month_start,
+            DepreciationLog.period_start < next_month
+        ).first()
+        if already_logged:
+            return None
+
         annual_amount = FixedAssetService.calculate_straight_line_depreciation(asset)
         monthly_amount = annual_amount / 12
         
@@ -80,6 +100,11 @@ class FixedAssetService:
             description=f"Accumulated depreciation - {asset.name}"
         ))
 
+        LedgerService.apply_lines(db, db_entry.entry_date, [
+            (asset.depreciation_expense_account_id, monthly_amount, 0.0),
+            (asset.accumulated_depreciation_account_id, 0.0, monthly_amount),
+        ])
+
         # 2. Update Asset
         asset.accumulated_depreciation += monthly_amount
         asset.current_book_value -= monthly_amount
@@ -102,4 +127,149 @@ class FixedAssetService:
         db.refresh(log)
         return log
 
+    @staticmethod
+    def run_period_depreciation(db: Session, period: date, current_user_id: int) -> Dict[str, Any]:
+        """
+        Depreciate every active asset for the month containing ``period`` in one transaction.
+
+        Monthly charges are computed for all assets at once (straight-line on
+        cost less salvage, declining-balance at twice the straight-line rate on
+        book value), capped so book value never drops below salvage. One posted
+        journal entry is created per (expense, accumulated depreciation) account
+        pair, and logs and asset balances are written in bulk. Assets that already
+        have a log for the month are skipped, so re-running a period is a no-op.
+        The eligible assets are locked (FOR UPDATE) before the logs are read, so
+        concurrent runs for the same period wait for each other instead of
+        depreciating the same assets twice.
+        """
+        month_start, next_month = _month_bounds(period)
+        period_end = next_month - timedelta(days=1)
+        now = datetime.now()
+
+        eligible = db.query(FixedAsset).filter(
+            FixedAsset.status == FixedAssetStatus.ACTIVE,
+            FixedAsset.purchase_date < next_month
+        ).order_by(FixedAsset.id).with_for_update().populate_existing().all()
+
+        done_ids = {
+            row.fixed_asset_id for row in db.query(DepreciationLog.fixed_asset_id).filter(
+                DepreciationLog.period_start >= month_start,
+                DepreciationLog.period_start < next_month
+            ).all()
+        }
+        assets = [asset for asset in eligible if asset.id not in done_ids]
+
+        result = {
+            "period_start": month_start,
+            "period_end": period_end,
+            "assets_depreciated": 0,
+            "assets_skipped": len(eligible) - len(assets),
+            "fully_depreciated": 0,
+            "total_amount": 0.0,
+            "journal_entry_ids": [],
+        }
+        if not assets:
+            return result
+
+        cost = np.array([a.purchase_cost for a in assets], dtype=float)
+        salvage = np.array([a.salvage_value or 0.0 for a in assets], dtype=float)
+        book = np.array([a.current_book_value for a in assets], dtype=float)
+        life = np.array([a.useful_life_years or 0 for a in assets], dtype=float)
+        declining = np.array([a.depreciation_method == DepreciationMethod.DECLINING_BALANCE for a in assets])
+
+        safe_life = np.where(life > 0, life, 1.0)
+        straight_line = (cost - salvage) / safe_life / 12
+        declining_balance = book * (2.0 / safe_life) / 12
+        monthly = np.where(declining, declining_balance, straight_line)
+        monthly = np.where(life > 0, monthly, 0.0)
+        monthly = np.round(np.minimum(monthly, book - salvage), 2)
+        monthly = np.maximum(monthly, 0.0)
+        new_book = book - monthly
+        fully = new_book <= salvage + 0.005
+
+        # Group charges by account pair for consolidated journal entries
+        groups: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for i, asset in enumerate(assets):
+            if monthly[i] > 0:
+                groups[(asset.depreciation_expense_account_id, asset.accumulated_depreciation_account_id)].append(i)
+
+        numbering_key = f"DEP-{month_start.strftime('%Y%m')}"
+        numbers = NumberingService.allocate(db, numbering_key, len(groups))
+
+        entry_for_asset: Dict[int, int] = {}
+        lines = []
+        for n, ((expense_account_id, accumulated_account_id), indexes) in zip(numbers, sorted(groups.items())):
+            amount = float(round(monthly[indexes].sum(), 2))
+            db_entry = AccountingJournalEntry(
+                entry_number=f"{numbering_key}-{n:04d}",
+                entry_date=period_end,
+                description=f"Depreciation for {month_start.strftime('%B %Y')} ({len(indexes)} assets)",
+                reference_type=ReferenceType.ADJUSTMENT,
+                reference_id=None,
+                status=JournalEntryStatus.POSTED,
+                created_by_id=current_user_id,
+                posted_at=now,
+                posted_by_id=current_user_id
+            )
+            db.add(db_entry)
+            db.flush()
+            lines.append({
+                "journal_entry_id": db_entry.id,
+                "account_id": expense_account_id,
+                "debit_amount": amount,
+                "credit_amount": 0.0,
+                "description": "Depreciation expense",
+            })
+            lines.append({
+                "journal_entry_id": db_entry.id,
+                "account_id": accumulated_account_id,
+                "debit_amount": 0.0,
+                "credit_amount": amount,
+                "description": "Accumulated depreciation",
+            })
+            for i in indexes:
+                entry_for_asset[i] = db_entry.id
+            result["journal_entry_ids"].append(db_entry.id)
+
+        if lines:
+            db.execute(insert(JournalEntryLine), lines)
+            LedgerService.apply_lines(
+                db, period_end,
+                [(line["account_id"], line["debit_amount"], line["credit_amount"]) for line in lines]
+            )
+
+        logs = [
+            {
+                "fixed_asset_id": assets[i].id,
+                "amount": float(monthly[i]),
+                "depreciation_date": now,
+                "period_start": month_start,
+                "period_end": period_end,
+                "journal_entry_id": entry_id,
+            }
+            for i, entry_id in entry_for_asset.items()
+        ]
+        if logs:
+            db.execute(insert(DepreciationLog), logs)
+
+        asset_updates = []
+        for i, asset in enumerate(assets):
+            if monthly[i] <= 0 and not fully[i]:
+                continue
+            asset_updates.append({
+                "id": asset.id,
+                "accumulated_depreciation": float((asset.accumulated_depreciation or 0.0) + monthly[i]),
+                "current_book_value": float(new_book[i]),
+                "status": FixedAssetStatus.FULLY_DEPRECIATED if fully[i] else FixedAssetStatus.ACTIVE,
+            })
+        if asset_updates:
+            db.execute(update(FixedAsset), asset_updates)
+
+        db.commit()
+
+        result["assets_depreciated"] = len(logs)
+        result["fully_depreciated"] = int(fully.sum())
+        result["total_amount"] = float(round(monthly.sum(), 2))
+        return result
+
 fixed_asset_service = FixedAssetService()
@@ -1,10 +1,96 @@
 from typing import List, Dict, Any, Optional
+from collections import defaultdict, deque
+from sqlalchemy import select # type: ignore[import-untyped]
 from sqlalchemy.orm import Session # type: ignore[import-untyped]
 
+from ..core.cache import CommitInvalidatedCache
 from ..crud.user import user as user_crud
 from ..models.user import User, UserRole
 
 
+HIERARCHY_CACHE_TTL_SECONDS = 30
+
+# User columns that affect the index; updates touching only other columns keep the cache
+_INDEXED_USER_FIELDS = ("manager_id", "username", "full_name", "email", "role", "department", "is_active")
+
+
+class HierarchyIndex:
+    """In-memory adjacency index of the user tree (parent and children maps)."""
+
+    def __init__(self, rows):
+        self.users: Dict[int, Dict[str, Any]] = {}
+        self.parent: Dict[int, Optional[int]] = {}
+        self.children: Dict[int, List[int]] = defaultdict(list)
+        for row in rows:
+            self.users[row.id] = {
+                "id": row.id,
+                "username": row.username,
+                "full_name": row.full_name,
+                "email": row.email,
+                "role": row.role.value if hasattr(row.role, "value") else row.role,
+                "department": row.department,
+                "is_active": row.is_active,
+            }
+            self.parent[row.id] = row.manager_id
+            if row.manager_id is not None:
+                self.children[row.manager_id].append(row.id)
+
+    @classmethod
+    def load(cls, db: Session) -> "HierarchyIndex":
+        rows = db.query(
+            User.id, User.username, User.full_name, User.email,
+            User.role, User.department, User.is_active, User.manager_id
+        ).order_by(User.id).all()
+        return cls(rows)
+
+    def ancestors(self, user_id: int) -> List[int]:
+        """Manager chain above ``user_id``, nearest first (stops on missing users or cycles)."""
+        chain = []
+        seen = {user_id}
+        current = self.parent.get(user_id)
+        while current is not None and current in self.users and current not in seen:
+            chain.append(current)
+            seen.add(current)
+            current = self.parent.get(current)
+        return chain
+
+    def descendants(self, user_id: int) -> List[int]:
+        """All users below ``user_id`` in breadth-first order."""
+        result = []
+        seen = {user_id}
+        queue = deque(self.children.get(user_id, ()))
+        while queue:
+            current = queue.popleft()
+            if current in seen:
+                continue
+            seen.add(current)
+            result.append(current)
+            queue.extend(self.children.get(current, ()))
+        return result
+
+
+_hierarchy_cache = CommitInvalidatedCache(HierarchyIndex.load, HIERARCHY_CACHE_TTL_SECONDS)
+_hierarchy_cache.watch(User, _INDEXED_USER_FIELDS)
+
+
+def get_hierarchy_index(db: Session) -> HierarchyIndex:
+    """Return the cached hierarchy index, rebuilding it with a single query when stale."""
+    return _hierarchy_cache.get(db)
+
+
+def _index_containing(db: Session, *user_ids: int) -> HierarchyIndex:
+    """Cached index, rebuilt once if it predates any of the given users (e.g. created by another worker)."""
+    index = get_hierarchy_index(db)
+    if any(uid not in index.users for uid in user_ids):
+        invalidate_hierarchy_index()
+        index = get_hierarchy_index(db)
+    return index
+
+
+def invalidate_hierarchy_index() -> None:
+    _hierarchy_cache.invalidate()
+
+
 class HierarchyService:
     """Service for managing user hierarchy and permissions"""
     
@@ -24,7 +110,7 @@ class HierarchyService:
         direct_subordinates = user_crud.get_subordinates(db, user_id)
         
         # Get all subordinates (recursive)
-        all_subordinates = user_crud.get_hierarchy(db, user_id)
+        all_subordinates = _index_containing(db, user_id).descendants(user_id)
         
         # Get hierarchy level
         hierarchy_level = HierarchyService._get_hierarchy_level(db, user_id)
@@ -58,17 +144,15 @@ class HierarchyService:
             "can_manage": len(direct_subordinates) > 0
         }
     
+    @staticmethod
+    def get_index(db: Session) -> HierarchyIndex:
+        """Cached adjacency index of the whole organisation"""
+        return get_hierarchy_index(db)
+
     @staticmethod
     def _get_hierarchy_level(db: Session, user_id: int) -> int:
         """Calculate the hierarchy level of a user (0 = top level)"""
-        level = 0
-        current_user = user_crud.get(db, user_id)
-        
-        while current_user and current_user.manager_id:
-            level += 1
-            current_user = user_crud.get(db, current_user.manager_id)
-        
-        return level
+        return len(_index_containing(db, user_id).ancestors(user_id))
     
     @staticmethod
     def can_manage_user(db: Session, manager_id: int, subordinate_id: int) -> bool:
@@ -86,9 +170,9 @@ class HierarchyService:
         if manager.role in [UserRole.ADMIN, UserRole.SUPER_ADMIN]:
             return True
         
-        # Check if subordinate is in manager's hierarchy
-        subordinate_ids = [sub.id for sub in user_crud.get_hierarchy(db, manager_id)]
-        return subordinate_id in subordinate_ids
+        # Check if subordinate is in manager's hierarchy. This grants access, so the chain is
+        # read from the database rather than from the per-process index, which may be stale.
+        return HierarchyService._is_ancestor(db, manager_id, subordinate_id)
     
     @staticmethod
     def get_accessible_user_ids(db: Session, user_id: int) -> List[int]:
@@ -147,26 +231,23 @@ class HierarchyService:
     @staticmethod
     def _build_hierarchy_tree(users: List[User]) -> List[Dict[str, Any]]:
         """Build a hierarchical tree structure from users"""
-        # Create user lookup
-        user_lookup = {user.id: user for user in users}
+        # Create one node per user, then attach each to its manager's node (O(n))
+        nodes = {user.id: HierarchyService._build_user_node(user) for user in users}
         
-        # Find top-level users (no manager in the same department)
-        top_level = []
-        for user in users:
-            if user.manager_id is None or user.manager_id not in user_lookup:
-                top_level.append(user)
-        
-        # Build tree recursively
+        # Top-level users have no manager in the same set
         tree = []
-        for user in top_level:
-            tree.append(HierarchyService._build_user_node(user, user_lookup))
+        for user in users:
+            if user.manager_id is None or user.manager_id not in nodes or user.manager_id == user.id:
+                tree.append(nodes[user.id])
+            else:
+                nodes[user.manager_id]["subordinates"].append(nodes[user.id])
         
         return tree
     
     @staticmethod
-    def _build_user_node(user: User, user_lookup: Dict[int, User]) -> Dict[str, Any]:
+    def _build_user_node(user: User) -> Dict[str, Any]:
         """Build a node in the hierarchy tree"""
-        node = {
+        return {
             "id": user.id,
             "username": user.username,
             "full_name": user.full_name,
@@ -174,13 +255,6 @@ class HierarchyService:
             "department": user.department,
             "subordinates": []
         }
-        
-        # Find direct subordinates
-        for other_user in user_lookup.values():
-            if other_user.manager_id == user.id:
-                node["subordinates"].append(HierarchyService._build_user_node(other_user, user_lookup))
-        
-        return node
     
     @staticmethod
     def validate_hierarchy_change(db: Session, user_id: int, new_manager_id: Optional[int]) -> bool:
@@ -215,43 +289,38 @@ class HierarchyService:
     @staticmethod
     def _would_create_cycle(db: Session, user_id: int, manager_id: int) -> bool:
         """Check if assigning manager_id to user_id would create a cycle"""
-        # Check if user_id is already an ancestor of manager_id
-        current = user_crud.get(db, manager_id)
-        visited = set()
-        
-        while current and current.id not in visited:
-            if current.id == user_id:
-                return True  # Cycle detected
-            
-            visited.add(current.id)
-            if current.manager_id:
-                current = user_crud.get(db, current.manager_id)
-            else:
-                break
-        
-        return False
+        # Check if user_id is already an ancestor of manager_id. This guards a write, so the
+        # chain is read inside the caller's transaction rather than from the shared index.
+        if manager_id == user_id:
+            return True
+        return HierarchyService._is_ancestor(db, user_id, manager_id)
+
+    @staticmethod
+    def _is_ancestor(db: Session, ancestor_id: int, user_id: int) -> bool:
+        """Check in the database whether ancestor_id is in user_id's management chain"""
+        ancestors = select(User.manager_id.label("id")).where(User.id == user_id).cte("ancestors", recursive=True)
+        ancestors = ancestors.union(
+            select(User.manager_id).where(User.id == ancestors.c.id)
+        )
+        return db.execute(select(ancestors.c.id).where(ancestors.c.id == ancestor_id).limit(1)).first() is not None
     
     @staticmethod
     def get_management_chain(db: Session, user_id: int) -> List[Dict[str, Any]]:
         """Get the management chain up to the top"""
-        chain = []
-        current = user_crud.get(db, user_id)
-        
-        while current:
-            chain.append({
-                "id": current.id,
-                "username": current.username,
-                "full_name": current.full_name,
-                "role": current.role.value,
-                "department": current.department
-            })
-            
-            if current.manager_id:
-                current = user_crud.get(db, current.manager_id)
-            else:
-                break
+        index = _index_containing(db, user_id)
+        if user_id not in index.users:
+            return []
         
-        return chain
+        return [
+            {
+                "id": index.users[uid]["id"],
+                "username": index.users[uid]["username"],
+                "full_name": index.users[uid]["full_name"],
+                "role": index.users[uid]["role"],
+                "department": index.users[uid]["department"]
+            }
+            for uid in [user_id] + index.ancestors(user_id)
+        ]
     
     @staticmethod
     def get_role_permissions() -> Dict[str, Dict[str, Any]]:
@@ -7,14 +7,15 @@ from ..models.sale import Sale
 
 class InvoiceService:
     @staticmethod
-    def generate_json_einvoice(sale: Sale) -> Dict[str, Any]:
+    def generate_json_einvoice(sale: Sale, currency_code: str = "USD") -> Dict[str, Any]:
         """
         Generate a standardized E-Invoice in JSON format (UBL-flavored).
+        Amounts are in ``currency_code`` (the base currency sales are recorded in).
         """
         invoice = {
             "invoice_id": sale.receipt_number or f"INV-{sale.id}",
             "issue_date": sale.created_at.strftime("%Y-%m-%d"),
-            "currency": "USD", # Default to USD, could be from sale.item.warehouse.currency in future
+            "currency": currency_code,
             "merchant": {
                 "name": "Next-Gen Enterprises", # Default merchant name
                 "id": "GST-123456789"
@@ -42,7 +43,7 @@ class InvoiceService:
         return invoice
 
     @staticmethod
-    def generate_ubl_xml(sale: Sale) -> str:
+    def generate_ubl_xml(sale: Sale, currency_code: str = "USD") -> str:
         """
         Generate a UBL 2.1 compliant XML invoice string.
         """
@@ -65,7 +66,7 @@ class InvoiceService:
         cbc_date.text = sale.created_at.strftime("%Y-%m-%d")
         
         cbc_currency = ET.SubElement(root, f"{{{ns_cbc}}}DocumentCurrencyCode")
-        cbc_currency.text = "USD"
+        cbc_currency.text = currency_code
 
         # Supplier (Merchant)
         cac_supplier = ET.SubElement(root, f"{{{ns_cac}}}AccountingSupplierParty")
@@ -90,7 +91,7 @@ class InvoiceService:
         cbc_qty.text = str(sale.quantity_sold)
         
         cbc_line_ext = ET.SubElement(cac_line, f"{{{ns_cbc}}}LineExtensionAmount")
-        cbc_line_ext.set("currencyID", "USD")
+        cbc_line_ext.set("currencyID", currency_code)
         cbc_line_ext.text = str(sale.total_sale)
 
         cac_item = ET.SubElement(cac_line, f"{{{ns_cac}}}Item")
@@ -104,13 +105,13 @@ class InvoiceService:
 
         cac_price = ET.SubElement(cac_line, f"{{{ns_cac}}}Price")
         cbc_price_amt = ET.SubElement(cac_price, f"{{{ns_cbc}}}PriceAmount")
-        cbc_price_amt.set("currencyID", "USD")
+        cbc_price_amt.set("currencyID", currency_code)
         cbc_price_amt.text = str(sale.selling_price)
 
         # Totals
         cac_legal = ET.SubElement(root, f"{{{ns_cac}}}LegalMonetaryTotal")
         cbc_payable = ET.SubElement(cac_legal, f"{{{ns_cbc}}}PayableAmount")
-        cbc_payable.set("currencyID", "USD")
+        cbc_payable.set("currencyID", currency_code)
         cbc_payable.text = str(sale.total_sale)
 
         # Convert to string and pretty print
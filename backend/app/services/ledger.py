@@ -0,0 +1,294 @@
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+import logging
+
+from sqlalchemy import func, and_, insert, select, Date, cast # type: ignore[import-untyped]
+from sqlalchemy.orm import Session # type: ignore[import-untyped]
+
+from ..models.account import Account
+from ..models.account_balance import AccountPeriodBalance
+from ..models.journal_entry import AccountingJournalEntry, JournalEntryLine, JournalEntryStatus
+
+logger = logging.getLogger(__name__)
+
+
+def period_start(value) -> date:
+    """
+    First day of the UTC calendar month containing ``value`` (date or datetime).
+    Aware datetimes are converted to UTC and naive ones are taken as UTC, matching ``period_start_sql``.
+    """
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return date(value.year, value.month, 1)
+
+
+def period_start_sql(column, dialect: str):
+    """``period_start`` of a timestamp column, computed in SQL"""
+    if dialect == "sqlite":
+        # SQLite stores datetimes as written, without an offset
+        return func.date(column, "start of month")
+    # date_trunc would otherwise use the session time zone
+    return cast(func.date_trunc("month", func.timezone("UTC", column)), Date)
+
+
+def _day_start(value: date) -> datetime:
+    """Midnight UTC, so date ranges line up with the UTC months of the snapshots"""
+    return datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+
+
+class LedgerService:
+    """
+    Account balances kept as per-account, per-month debit/credit snapshots.
+
+    Posting a journal entry adds its lines to the snapshot of the entry's month, so an
+    as-of-date balance is the sum of the closed months' snapshots plus the posted lines
+    of the as-of month only.
+    """
+
+    @staticmethod
+    def apply_lines(db: Session, entry_date, lines: Iterable[Tuple[int, float, float]]) -> None:
+        """
+        Add posted lines ``(account_id, debit, credit)`` dated ``entry_date`` to the snapshots.
+        Runs in the caller's transaction; the caller commits.
+        """
+        deltas: Dict[int, List[float]] = defaultdict(lambda: [0.0, 0.0, 0])
+        for account_id, debit, credit in lines:
+            delta = deltas[account_id]
+            delta[0] += float(debit or 0.0)
+            delta[1] += float(credit or 0.0)
+            delta[2] += 1
+        if not deltas:
+            return
+
+        period = period_start(entry_date)
+        rows = [
+            {"account_id": account_id, "period": period, "debit_total": d, "credit_total": c, "line_count": n}
+            for account_id, (d, c, n) in sorted(deltas.items())
+        ]
+
+        dialect = db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert as upsert # type: ignore[import-untyped]
+            else:
+                from sqlalchemy.dialects.sqlite import insert as upsert # type: ignore[import-untyped]
+            stmt = upsert(AccountPeriodBalance)
+            # Atomic increment: concurrent postings to the same account/month cannot lose updates
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["account_id", "period"],
+                set_={
+                    "debit_total": AccountPeriodBalance.debit_total + stmt.excluded.debit_total,
+                    "credit_total": AccountPeriodBalance.credit_total + stmt.excluded.credit_total,
+                    "line_count": AccountPeriodBalance.line_count + stmt.excluded.line_count,
+                    "updated_at": func.now(),
+                }
+            )
+            db.execute(stmt, rows)
+            return
+
+        existing = {
+            b.account_id: b for b in db.query(AccountPeriodBalance).filter(
+                AccountPeriodBalance.period == period,
+                AccountPeriodBalance.account_id.in_(list(deltas))
+            ).with_for_update().all()
+        }
+        for row in rows:
+            balance = existing.get(row["account_id"])
+            if balance:
+                balance.debit_total += row["debit_total"]
+                balance.credit_total += row["credit_total"]
+                balance.line_count += row["line_count"]
+            else:
+                db.add(AccountPeriodBalance(**row))
+        db.flush()
+
+    @staticmethod
+    def apply_entry(db: Session, entry: AccountingJournalEntry) -> None:
+        """Add a just-posted journal entry's lines to the snapshots"""
+        lines = db.query(
+            JournalEntryLine.account_id, JournalEntryLine.debit_amount, JournalEntryLine.credit_amount
+        ).filter(JournalEntryLine.journal_entry_id == entry.id).all()
+        LedgerService.apply_lines(db, entry.entry_date, lines)
+
+    @staticmethod
+    def rebuild_balances(db: Session) -> int:
+        """Recompute every snapshot from posted journal lines (backfill / repair). Returns the snapshot count."""
+        month = period_start_sql(AccountingJournalEntry.entry_date, db.get_bind().dialect.name)
+
+        totals = select(
+            JournalEntryLine.account_id,
+            month.label("period"),
+            func.sum(JournalEntryLine.debit_amount),
+            func.sum(JournalEntryLine.credit_amount),
+            func.count(JournalEntryLine.id),
+        ).join(
+            AccountingJournalEntry, JournalEntryLine.journal_entry_id == AccountingJournalEntry.id
+        ).where(
+            AccountingJournalEntry.status == JournalEntryStatus.POSTED
+        ).group_by(JournalEntryLine.account_id, month)
+
+        db.query(AccountPeriodBalance).delete(synchronize_session=False)
+        db.execute(insert(AccountPeriodBalance).from_select(
+            ["account_id", "period", "debit_total", "credit_total", "line_count"], totals
+        ))
+        db.commit()
+        count = db.query(func.count(AccountPeriodBalance.id)).scalar() or 0
+        logger.info(f"Rebuilt {count} account period balances")
+        return count
+
+    @staticmethod
+    def balances_as_of(db: Session, as_of: date, account_ids: Optional[List[int]] = None) -> Dict[int, Tuple[float, float]]:
+        """Cumulative (debit, credit) per account for posted entries dated on or before ``as_of``"""
+        month = period_start(as_of)
+        totals: Dict[int, List[float]] = defaultdict(lambda: [0.0, 0.0])
+
+        closed = db.query(
+            AccountPeriodBalance.account_id,
+            func.sum(AccountPeriodBalance.debit_total),
+            func.sum(AccountPeriodBalance.credit_total)
+        ).filter(AccountPeriodBalance.period < month)
+        if account_ids is not None:
+            closed = closed.filter(AccountPeriodBalance.account_id.in_(account_ids))
+        for account_id, debit, credit in closed.group_by(AccountPeriodBalance.account_id):
+            totals[account_id][0] += debit or 0.0
+            totals[account_id][1] += credit or 0.0
+
+        # Only the as-of month is read from journal lines
+        current = db.query(
+            JournalEntryLine.account_id,
+            func.sum(JournalEntryLine.debit_amount),
+            func.sum(JournalEntryLine.credit_amount)
+        ).join(
+            AccountingJournalEntry, JournalEntryLine.journal_entry_id == AccountingJournalEntry.id
+        ).filter(
+            and_(
+                AccountingJournalEntry.status == JournalEntryStatus.POSTED,
+                AccountingJournalEntry.entry_date >= _day_start(month),
+                AccountingJournalEntry.entry_date < _day_start(as_of + timedelta(days=1))
+            )
+        )
+        if account_ids is not None:
+            current = current.filter(JournalEntryLine.account_id.in_(account_ids))
+        for account_id, debit, credit in current.group_by(JournalEntryLine.account_id):
+            totals[account_id][0] += debit or 0.0
+            totals[account_id][1] += credit or 0.0
+
+        return {account_id: (round(d, 2), round(c, 2)) for account_id, (d, c) in totals.items()}
+
+    @staticmethod
+    def trial_balance(db: Session, as_of: Optional[date] = None) -> Dict[str, Any]:
+        """Net debit/credit per account as of a date; total debits equal total credits for a balanced ledger"""
+        as_of = as_of or date.today()
+        balances = LedgerService.balances_as_of(db, as_of)
+        accounts = db.query(Account).filter(Account.id.in_(list(balances))).order_by(Account.code).all() if balances else []
+
+        lines = []
+        total_debit = 0.0
+        total_credit = 0.0
+        for account in accounts:
+            debit, credit = balances[account.id]
+            net = round(debit - credit, 2)
+            if net == 0:
+                continue
+            line = {
+                "account_id": account.id,
+                "code": account.code,
+                "name": account.name,
+                "account_type": account.account_type,
+                "debit": net if net > 0 else 0.0,
+                "credit": -net if net < 0 else 0.0,
+            }
+            total_debit += line["debit"]
+            total_credit += line["credit"]
+            lines.append(line)
+
+        return {
+            "as_of": as_of,
+            "lines": lines,
+            "total_debit": round(total_debit, 2),
+            "total_credit": round(total_credit, 2),
+        }
+
+    @staticmethod
+    def account_ledger(
+        db: Session,
+        account: Account,
+        start_date: date,
+        end_date: date,
+        skip: int = 0,
+        limit: int = 100
+    ) -> Dict[str, Any]:
+        """Posted lines for one account in a date range with running balances (debit minus credit)"""
+        opening_debit, opening_credit = LedgerService.balances_as_of(
+            db, start_date - timedelta(days=1), [account.id]
+        ).get(account.id, (0.0, 0.0))
+        opening_balance = round(opening_debit - opening_credit, 2)
+
+        in_range = and_(
+            JournalEntryLine.account_id == account.id,
+            AccountingJournalEntry.status == JournalEntryStatus.POSTED,
+            AccountingJournalEntry.entry_date >= _day_start(start_date),
+            AccountingJournalEntry.entry_date < _day_start(end_date + timedelta(days=1))
+        )
+        ordering = (AccountingJournalEntry.entry_date, AccountingJournalEntry.id, JournalEntryLine.id)
+
+        period_debit, period_credit = db.query(
+            func.coalesce(func.sum(JournalEntryLine.debit_amount), 0.0),
+            func.coalesce(func.sum(JournalEntryLine.credit_amount), 0.0)
+        ).join(
+            AccountingJournalEntry, JournalEntryLine.journal_entry_id == AccountingJournalEntry.id
+        ).filter(in_range).one()
+
+        # Running balance at the top of the requested page
+        running = opening_balance
+        if skip:
+            skipped = db.query(
+                (JournalEntryLine.debit_amount - JournalEntryLine.credit_amount).label("net")
+            ).join(
+                AccountingJournalEntry, JournalEntryLine.journal_entry_id == AccountingJournalEntry.id
+            ).filter(in_range).order_by(*ordering).limit(skip).subquery()
+            running += db.query(func.coalesce(func.sum(skipped.c.net), 0.0)).scalar() or 0.0
+
+        rows = db.query(
+            JournalEntryLine.id,
+            JournalEntryLine.debit_amount,
+            JournalEntryLine.credit_amount,
+            JournalEntryLine.description,
+            AccountingJournalEntry.id.label("journal_entry_id"),
+            AccountingJournalEntry.entry_number,
+            AccountingJournalEntry.entry_date,
+        ).join(
+            AccountingJournalEntry, JournalEntryLine.journal_entry_id == AccountingJournalEntry.id
+        ).filter(in_range).order_by(*ordering).offset(skip).limit(limit).all()
+
+        lines = []
+        for row in rows:
+            running += (row.debit_amount or 0.0) - (row.credit_amount or 0.0)
+            lines.append({
+                "line_id": row.id,
+                "journal_entry_id": row.journal_entry_id,
+                "entry_number": row.entry_number,
+                "entry_date": row.entry_date,
+                "description": row.description,
+                "debit": row.debit_amount or 0.0,
+                "credit": row.credit_amount or 0.0,
+                "balance": round(running, 2),
+            })
+
+        return {
+            "account_id": account.id,
+            "code": account.code,
+            "name": account.name,
+            "account_type": account.account_type,
+            "start_date": start_date,
+            "end_date": end_date,
+            "opening_balance": opening_balance,
+            "period_debit": round(period_debit, 2),
+            "period_credit": round(period_credit, 2),
+            "closing_balance": round(opening_balance + period_debit - period_credit, 2),
+            "lines": lines,
+        }
+
+
+ledger_service = LedgerService()
@@ -14,6 +14,7 @@ Features:
 import os
 import json
 import logging
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any, List
 from pathlib import Path
@@ -22,6 +23,7 @@ from sqlalchemy.orm import Session  # type: ignore[import-untyped]
 logger = logging.getLogger(__name__)
 
 from ..core.database import SessionLocal
+from ..core.metrics import ML_TRAINING_DURATION, track_background_task
 from ..models.user import UserRole
 from .ml_forecasting import MLForecastingService
 
@@ -207,9 +209,14 @@ def _train_multiple_models(
     best_rmse = float('inf')
     
     for model_type, train_func in configs:
+        started = time.perf_counter()
         try:
             logger.info(f"Training {metric} {model_type} model...")
             result = train_func()
+            ML_TRAINING_DURATION.observe(
+                time.perf_counter() - started,
+                metric=metric, model_type=model_type, status=(result or {}).get('status') or 'failed'
+            )
             
             if result and result.get('status') == 'trained':
                 rmse = result.get('rmse')
@@ -238,6 +245,7 @@ def _train_multiple_models(
                 logger.warning(f"[WARNING] {metric} {model_type} training failed or returned no results")
                 
         except Exception as e:
+            ML_TRAINING_DURATION.observe(time.perf_counter() - started, metric=metric, model_type=model_type, status='error')
             error_msg = str(e)
             if "Insufficient data" not in error_msg:
                 logger.warning(f"[WARNING] {metric} {model_type} training failed: {error_msg}")
@@ -392,6 +400,7 @@ def trigger_auto_learn(metric: str, db: Optional[Session] = None, force: bool =
             db.close()
 
 
+@track_background_task("auto_learn")
 def trigger_auto_learn_background(metric: str):
     """
     Trigger auto-learning in background (for use with background tasks)
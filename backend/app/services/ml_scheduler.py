@@ -11,6 +11,7 @@ Automatically retrains AI models on a schedule with advanced features:
 
 import os
 import logging
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Optional, TYPE_CHECKING, Any, Dict, List
 from sqlalchemy.orm import Session  # type: ignore[import-untyped]
@@ -33,6 +34,7 @@ except ImportError as e:
     logger.warning(f"APScheduler import failed: {e}. Scheduled training will be disabled.")
 
 from ..core.database import SessionLocal
+from ..core.metrics import ML_TRAINING_DURATION, track_background_task
 from ..models.user import UserRole
 from .ml_forecasting import MLForecastingService
 from .ml_auto_learn import trigger_auto_learn
@@ -200,11 +202,13 @@ def schedule_metric_retraining(
         return False
 
 
+@track_background_task("ml_retrain")
 def retrain_all_models():
     """Retrain all models using train_all_models (called by scheduler)"""
     logger.info("Starting scheduled full model retraining...")
     
     db = SessionLocal()
+    started = time.perf_counter()
     try:
         # Calculate date range (last 2-3 years depending on metric)
         end_date = datetime.now(timezone.utc)
@@ -235,6 +239,9 @@ def retrain_all_models():
             f"Scheduled model retraining completed: {success_count} models trained, "
             f"{error_count} errors"
         )
+        ML_TRAINING_DURATION.observe(
+            time.perf_counter() - started, metric="all", model_type="all", status="trained" if not error_count else "partial"
+        )
         
         # Notify admins about completion
         try:
@@ -256,6 +263,7 @@ def retrain_all_models():
         return results
         
     except Exception as e:
+        ML_TRAINING_DURATION.observe(time.perf_counter() - started, metric="all", model_type="all", status="error")
         logger.error(f"Scheduled model retraining failed: {str(e)}", exc_info=True)
         # Notify about failure
         try:
@@ -277,6 +285,7 @@ def retrain_all_models():
         db.close()
 
 
+@track_background_task("ml_retrain")
 def retrain_all_models_auto_learn():
     """Retrain all models using auto-learn service (trains multiple models, selects best)"""
     logger.info("Starting scheduled auto-learn model retraining...")
@@ -337,6 +346,7 @@ def retrain_all_models_auto_learn():
     return results
 
 
+@track_background_task("ml_retrain")
 def retrain_metric_models(metric: str, use_auto_learn: bool = True):
     """Retrain models for a specific metric"""
     logger.info(f"Starting scheduled retraining for {metric}...")
@@ -0,0 +1,84 @@
+from typing import List, Optional
+from datetime import date, datetime
+import re
+
+from sqlalchemy import update # type: ignore[import-untyped]
+from sqlalchemy.exc import IntegrityError # type: ignore[import-untyped]
+from sqlalchemy.orm import Session # type: ignore[import-untyped]
+
+from ..models.journal_entry import AccountingJournalEntry
+from ..models.journal_number_counter import JournalNumberCounter
+
+# Numbering keys are the primary key of journal_number_counters (String(64))
+_KEY_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,48}$")
+
+
+class NumberingService:
+    """
+    Collision-free journal entry numbers of the form ``<key>-NNNN``, counted per key
+    (a prefix plus a day or month, e.g. ``AUTO-20260115``).
+
+    Every database increments the key's row in ``journal_number_counters`` inside the
+    caller's transaction. The UPDATE locks the row until commit, which serialises posters
+    on the same key (posters on other keys never wait) and leaves no gaps. Keys are made
+    per day or month, so no DDL is issued and the counter table grows by one row per key.
+    """
+
+    @staticmethod
+    def _existing_max(db: Session, key: str) -> int:
+        """Highest number already issued under ``key`` (entries numbered before the counter existed)"""
+        prefix = f"{key}-"
+        numbers = db.query(AccountingJournalEntry.entry_number).filter(
+            AccountingJournalEntry.entry_number.like(f"{prefix}%")
+        ).all()
+        highest = 0
+        for (number,) in numbers:
+            suffix = number[len(prefix):]
+            if suffix.isdigit():
+                highest = max(highest, int(suffix))
+        return highest
+
+    @staticmethod
+    def _allocate_counter(db: Session, key: str, count: int) -> List[int]:
+        for _ in range(2):
+            result = db.execute(
+                update(JournalNumberCounter)
+                .where(JournalNumberCounter.key == key)
+                .values(last_value=JournalNumberCounter.last_value + count)
+            )
+            if result.rowcount:
+                last = db.query(JournalNumberCounter.last_value).filter(JournalNumberCounter.key == key).scalar()
+                return list(range(last - count + 1, last + 1))
+
+            start = NumberingService._existing_max(db, key)
+            try:
+                with db.begin_nested():
+                    db.add(JournalNumberCounter(key=key, last_value=start + count))
+                return list(range(start + 1, start + count + 1))
+            except IntegrityError:
+                # Counter row inserted concurrently; increment it instead
+                continue
+        raise RuntimeError(f"Could not allocate journal numbers for {key}")
+
+    @staticmethod
+    def allocate(db: Session, key: str, count: int = 1) -> List[int]:
+        """Reserve ``count`` numbers under ``key`` in one round trip (block preallocation for bulk posting)"""
+        if not _KEY_PATTERN.match(key):
+            raise ValueError(f"Invalid numbering key: {key}")
+        if count < 1:
+            return []
+        return NumberingService._allocate_counter(db, key, count)
+
+    @staticmethod
+    def entry_numbers(db: Session, prefix: str, on: Optional[date] = None, count: int = 1) -> List[str]:
+        """``count`` entry numbers ``<prefix>-YYYYMMDD-NNNN`` for the given day (defaults to today)"""
+        on = on or datetime.now()
+        key = f"{prefix}-{on.strftime('%Y%m%d')}"
+        return [f"{key}-{n:04d}" for n in NumberingService.allocate(db, key, count)]
+
+    @staticmethod
+    def next_entry_number(db: Session, prefix: str, on: Optional[date] = None) -> str:
+        return NumberingService.entry_numbers(db, prefix, on, 1)[0]
+
+
+numbering_service = NumberingService()
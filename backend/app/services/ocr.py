@@ -1,44 +1,29 @@
-import google.generativeai as genai
+from abc import ABC, abstractmethod
+import asyncio
+import hashlib
 import json
+import logging
 import os
-from typing import Optional
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple
 from fastapi import UploadFile
-from PIL import Image
+from PIL import Image, ImageOps
 import io
 
 from ..core.config import settings
+from ..core.metrics import BACKGROUND_QUEUE_DEPTH
 from ..schemas.ocr import ReceiptData, AnalyzedDocument, LineItem
 
-class OCRService:
-    def __init__(self):
-        # Configure the Generative AI client
-        # Use settings or fallback to env var
-        api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
-        if not api_key:
-             # Try to get from settings if available
-             if hasattr(settings, "GOOGLE_API_KEY") and settings.GOOGLE_API_KEY:
-                 api_key = settings.GOOGLE_API_KEY
-             elif hasattr(settings, "GEMINI_API_KEY") and settings.GEMINI_API_KEY:
-                 api_key = settings.GEMINI_API_KEY
-        
-        if api_key:
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-flash') # Use Flash for speed/cost efficiency
-        else:
-            self.model = None
-            print("WARNING: GOOGLE_API_KEY not found. OCR features will not work.")
+logger = logging.getLogger(__name__)
 
-    async def analyze_image(self, file: UploadFile) -> AnalyzedDocument:
-        if not self.model:
-            raise ValueError("OCR Service not configured: Missing Google API Key")
+# Finished batch jobs are kept in memory this long for polling
+OCR_JOB_TTL_SECONDS = 3600
 
-        # Read file content
-        content = await file.read()
-        image = Image.open(io.BytesIO(content))
-
-        # Prepare the prompt
-        prompt = """
-        Analyze this image. It is likely a receipt or invoice. 
+OCR_PROMPT = """
+        Analyze this image. It is likely a receipt or invoice.
         Extract the following information in JSON format:
         - merchant_name: string
         - date: YYYY-MM-DD
@@ -47,43 +32,241 @@ class OCRService:
         - currency: string (ISO code, e.g., USD, EUR)
         - category: string (suggest a category like 'Meals', 'Travel', 'Office Supplies', 'Software')
         - items: list of objects { description: string, sku: string (if available), quantity: number, unit_price: number, total_amount: number }
-        
+
         Also calculate:
         - is_receipt: boolean (true if it looks like a valid receipt/invoice)
         - confidence_score: number (0.0 to 1.0)
-        
+
         Return ONLY valid JSON. Do not include markdown formatting like ```json.
         """
 
+
+class OCRProvider(ABC):
+    """Blocking model call: normalized image in, raw model text (JSON) out. Runs in a worker thread."""
+
+    name = "base"
+
+    @abstractmethod
+    def extract(self, image: Image.Image) -> str:
+        ...
+
+
+class GeminiOCRProvider(OCRProvider):
+    name = "gemini"
+
+    def __init__(self, api_key: str):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel('gemini-1.5-flash') # Use Flash for speed/cost efficiency
+
+    def extract(self, image: Image.Image) -> str:
+        response = self.model.generate_content([OCR_PROMPT, image])
+        return response.text
+
+
+class StubOCRProvider(OCRProvider):
+    """Deterministic fake receipts derived from the image, for local testing without the external model"""
+
+    name = "stub"
+
+    def extract(self, image: Image.Image) -> str:
+        digest = hashlib.sha256(image.tobytes()).hexdigest()
+        total = round(5 + int(digest[:6], 16) % 50000 / 100, 2)
+        tax = round(total * 0.15, 2)
+        return json.dumps({
+            "merchant_name": f"Stub Merchant {digest[:4].upper()}",
+            # Fixed, so the same image always yields the same receipt
+            "date": "2026-01-15",
+            "total_amount": total,
+            "tax_amount": tax,
+            "currency": "USD",
+            "category": "Office Supplies",
+            "items": [{"description": "Stub item", "quantity": 1, "unit_price": total, "total_amount": total}],
+            "is_receipt": True,
+            "confidence_score": 0.99,
+        })
+
+
+def _make_provider() -> Optional[OCRProvider]:
+    if settings.OCR_PROVIDER == "stub":
+        return StubOCRProvider()
+
+    # Use settings or fallback to env var
+    api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        # Try to get from settings if available
+        if hasattr(settings, "GOOGLE_API_KEY") and settings.GOOGLE_API_KEY:
+            api_key = settings.GOOGLE_API_KEY
+        elif hasattr(settings, "GEMINI_API_KEY") and settings.GEMINI_API_KEY:
+            api_key = settings.GEMINI_API_KEY
+
+    if api_key:
+        return GeminiOCRProvider(api_key)
+    logger.warning("GOOGLE_API_KEY not found. OCR features will not work.")
+    return None
+
+
+def normalize_image(content: bytes, max_side: int) -> Image.Image:
+    """Decode, apply EXIF orientation, convert to RGB and downscale so the longest side is ``max_side``"""
+    image = Image.open(io.BytesIO(content))
+    image = ImageOps.exif_transpose(image)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.thumbnail((max_side, max_side))
+    return image
+
+
+def _parse_result(filename: str, response_text: str, content_hash: str) -> AnalyzedDocument:
+    # Clean up potential markdown formatting
+    cleaned_text = response_text.replace("```json", "").replace("```", "").strip()
+    data = json.loads(cleaned_text)
+    receipt_data = ReceiptData(**data)
+    return AnalyzedDocument(
+        filename=filename,
+        document_type="receipt" if receipt_data.is_receipt else "unknown",
+        extracted_data=receipt_data,
+        raw_text=response_text, # Keep raw text for debugging if needed
+        content_hash=content_hash
+    )
+
+
+def _error_result(filename: str, error: Exception, content_hash: Optional[str] = None) -> AnalyzedDocument:
+    return AnalyzedDocument(
+        filename=filename,
+        document_type="error",
+        extracted_data=ReceiptData(is_receipt=False, confidence_score=0.0),
+        raw_text=str(error),
+        content_hash=content_hash
+    )
+
+
+class OCRService:
+    """
+    Receipt/invoice OCR pipeline.
+
+    Uploads are keyed by SHA-256: repeated content is answered from an LRU result cache and
+    concurrent identical uploads share one inference. Decoding/downscaling and the blocking
+    model call run in worker threads, with at most ``OCR_MAX_CONCURRENCY`` calls in flight.
+    Batch jobs run as background tasks in this process and are polled by job id.
+    """
+
+    def __init__(self):
+        self.provider = _make_provider()
+        self._cache: "OrderedDict[str, AnalyzedDocument]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+
+    def _limiter(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(max(1, settings.OCR_MAX_CONCURRENCY))
+        return self._semaphore
+
+    def _remember(self, content_hash: str, result: AnalyzedDocument) -> None:
+        self._cache[content_hash] = result
+        self._cache.move_to_end(content_hash)
+        while len(self._cache) > settings.OCR_CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    async def _infer(self, content: bytes, filename: str, content_hash: str) -> AnalyzedDocument:
+        image = await asyncio.to_thread(normalize_image, content, settings.OCR_MAX_IMAGE_SIDE)
+        async with self._limiter():
+            response_text = await asyncio.to_thread(self.provider.extract, image)
+        return _parse_result(filename, response_text, content_hash)
+
+    async def analyze_bytes(self, content: bytes, filename: str = "unknown") -> AnalyzedDocument:
+        if not self.provider:
+            raise ValueError("OCR Service not configured: Missing Google API Key")
+
+        content_hash = hashlib.sha256(content).hexdigest()
+        cached = self._cache.get(content_hash)
+        if cached is not None:
+            self._cache.move_to_end(content_hash)
+            return cached.model_copy(update={"filename": filename})
+
+        pending = self._inflight.get(content_hash)
+        if pending is not None:
+            result = await asyncio.shield(pending)
+            return result.model_copy(update={"filename": filename})
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[content_hash] = future
         try:
-            # Generate content
-            response = self.model.generate_content([prompt, image])
-            response_text = response.text
-            
-            # Clean up potential markdown formatting
-            cleaned_text = response_text.replace("```json", "").replace("```", "").strip()
-            
-            # Parse JSON
-            data = json.loads(cleaned_text)
-            
-            # Convert to Pydantic model
-            receipt_data = ReceiptData(**data)
-            
-            return AnalyzedDocument(
-                filename=file.filename or "unknown",
-                document_type="receipt" if receipt_data.is_receipt else "unknown",
-                extracted_data=receipt_data,
-                raw_text=response_text # Keep raw text for debugging if needed
-            )
-            
-        except Exception as e:
-            print(f"Error analyzing image: {str(e)}")
-            # Return empty/failed structure rather than crashing
-            return AnalyzedDocument(
-                filename=file.filename or "unknown",
-                document_type="error",
-                extracted_data=ReceiptData(is_receipt=False, confidence_score=0.0),
-                raw_text=str(e)
-            )
+            try:
+                result = await self._infer(content, filename, content_hash)
+                self._remember(content_hash, result)
+            except Exception as e:
+                logger.error(f"Error analyzing image: {str(e)}")
+                # Return empty/failed structure rather than crashing; failures are not cached
+                result = _error_result(filename, e, content_hash)
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(content_hash, None)
+            if not future.done():
+                # Cancelled mid-inference: waiters on the same content are cancelled too
+                future.cancel()
+
+    async def analyze_image(self, file: UploadFile) -> AnalyzedDocument:
+        content = await file.read()
+        return await self.analyze_bytes(content, file.filename or "unknown")
+
+    # ------------------------------------------------------------------
+    # Batch jobs
+    # ------------------------------------------------------------------
+
+    def _prune_jobs(self) -> None:
+        cutoff = time.monotonic() - OCR_JOB_TTL_SECONDS
+        for job_id in [j for j, job in self._jobs.items() if job["finished_monotonic"] and job["finished_monotonic"] < cutoff]:
+            del self._jobs[job_id]
+
+    def submit_batch(self, files: List[Tuple[str, bytes]], user_id: int) -> Dict[str, Any]:
+        """Queue many documents for analysis and return the job record; must be called from the event loop"""
+        if not self.provider:
+            raise ValueError("OCR Service not configured: Missing Google API Key")
+        self._prune_jobs()
+
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "status": "queued",
+            "total": len(files),
+            "completed": 0,
+            "failed": 0,
+            "created_at": datetime.utcnow(),
+            "finished_at": None,
+            "finished_monotonic": None,
+            "results": [None] * len(files),
+        }
+        self._jobs[job["job_id"]] = job
+        job["task"] = asyncio.get_running_loop().create_task(self._run_job(job, files))
+        return job
+
+    async def _run_job(self, job: Dict[str, Any], files: List[Tuple[str, bytes]]) -> None:
+        job["status"] = "running"
+
+        async def run_one(position: int, filename: str, content: bytes) -> None:
+            try:
+                result = await self.analyze_bytes(content, filename)
+            except Exception as e:
+                result = _error_result(filename, e)
+            job["results"][position] = result
+            job["completed"] += 1
+            if result.document_type == "error":
+                job["failed"] += 1
+
+        # The shared semaphore bounds inference; decoding for all files may overlap
+        await asyncio.gather(*(run_one(i, name, content) for i, (name, content) in enumerate(files)))
+        job["status"] = "completed"
+        job["finished_at"] = datetime.utcnow()
+        job["finished_monotonic"] = time.monotonic()
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._jobs.get(job_id)
+
+    def pending_documents(self) -> int:
+        """Documents submitted in batch jobs that have not been processed yet"""
+        return sum(job["total"] - job["completed"] for job in list(self._jobs.values()) if job["status"] != "completed")
 
 ocr_service = OCRService()
+BACKGROUND_QUEUE_DEPTH.set_function(ocr_service.pending_documents, queue="ocr")
@@ -1,9 +1,62 @@
+from abc import ABC, abstractmethod
 from datetime import datetime, date
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import insert, delete
 from sqlalchemy.orm import Session
 from ..models.payroll import EmployeeProfile, PayrollPeriod, Payslip, PayrollStatus
 from ..models.journal_entry import AccountingJournalEntry, JournalEntryLine, JournalEntryStatus, ReferenceType
 
+
+class TaxTable(ABC):
+    """Computes income tax for an array of taxable amounts."""
+
+    @abstractmethod
+    def compute(self, taxable: np.ndarray) -> np.ndarray:
+        ...
+
+
+class FlatTaxTable(TaxTable):
+    def __init__(self, rate: float):
+        self.rate = rate
+
+    def compute(self, taxable: np.ndarray) -> np.ndarray:
+        return np.maximum(taxable, 0.0) * self.rate
+
+
+class ProgressiveTaxTable(TaxTable):
+    """
+    Marginal brackets given as (lower_bound, rate) pairs sorted by lower bound;
+    each rate applies to the slice of income between its bound and the next one.
+    """
+
+    def __init__(self, brackets: Sequence[Tuple[float, float]]):
+        bounds = [float(lower) for lower, _ in brackets]
+        if bounds != sorted(bounds):
+            raise ValueError("Tax brackets must be sorted by lower bound")
+        self.lower = np.array(bounds)
+        self.upper = np.append(self.lower[1:], np.inf)
+        self.rates = np.array([float(rate) for _, rate in brackets])
+
+    def compute(self, taxable: np.ndarray) -> np.ndarray:
+        # (employees x brackets) slice of income falling into each bracket
+        slices = np.clip(taxable[:, None] - self.lower[None, :], 0.0, self.upper - self.lower)
+        return slices @ self.rates
+
+
+# Payslip deduction holding the tax computed by the run's tax table
+INCOME_TAX_DEDUCTION = "Income Tax"
+
+# Registered tax tables, selectable by name for a payroll run
+TAX_TABLES: Dict[str, TaxTable] = {
+    "default": FlatTaxTable(0.15),
+}
+
+
+def register_tax_table(name: str, table: TaxTable) -> None:
+    TAX_TABLES[name] = table
+
+
 class PayrollService:
     @staticmethod
     def calculate_payslip(
@@ -33,47 +86,85 @@ class PayrollService:
         """
         Generates payslips for all active employees for a given period.
         """
+        return PayrollService.run_payroll(db, period_id)
+
+    @staticmethod
+    def run_payroll(
+        db: Session,
+        period_id: int,
+        tax_table: str = "default",
+        adjustments: Optional[Dict[int, Dict[str, Any]]] = None
+    ) -> Optional[PayrollPeriod]:
+        """
+        Compute and store payslips for every active employee in one pass.
+
+        Salaries and per-employee adjustments (``{employee_id: {"allowances": {...},
+        "overtime_amount": float, "deductions": {...}}}``) are loaded into arrays,
+        gross/tax/net are computed for the whole population at once using the named
+        tax table, and payslips are bulk-inserted. Re-running a DRAFT period replaces
+        its payslips, so the run is idempotent. Income tax is always computed by the
+        tax table, so adjustments may not include an "Income Tax" deduction.
+        """
         period = db.query(PayrollPeriod).filter(PayrollPeriod.id == period_id).first()
         if not period or period.status != PayrollStatus.DRAFT:
             return None
-        
-        active_employees = db.query(EmployeeProfile).filter(EmployeeProfile.status == "active").all()
-        
-        total_gross = 0.0
-        total_deductions = 0.0
-        total_net = 0.0
-        
-        for emp in active_employees:
-            # Basic calculation for MVP (Real system would have complex tax logic)
-            # Default tax deduction of 15%
-            tax = emp.base_salary * 0.15
-            calc = PayrollService.calculate_payslip(
-                employee=emp,
-                allowances={},
-                overtime_amount=0.0,
-                deductions={"Income Tax": tax}
-            )
-            
-            payslip = Payslip(
-                employee_id=emp.id,
-                period_id=period.id,
-                base_salary=emp.base_salary,
-                gross_pay=calc["gross_pay"],
-                net_pay=calc["net_pay"],
-                deductions={"Income Tax": tax},
-                status=PayrollStatus.DRAFT
-            )
-            db.add(payslip)
-            
-            total_gross += calc["gross_pay"]
-            total_deductions += calc["total_deductions"]
-            total_net += calc["net_pay"]
-            
-        period.total_gross = total_gross
-        period.total_deductions = total_deductions
-        period.total_net = total_net
-        
+        if tax_table not in TAX_TABLES:
+            raise ValueError(f"Unknown tax table: {tax_table}")
+        adjustments = adjustments or {}
+        for emp_id, adj in adjustments.items():
+            if INCOME_TAX_DEDUCTION in ((adj or {}).get("deductions") or {}):
+                raise ValueError(
+                    f"Adjustments for employee {emp_id} include an '{INCOME_TAX_DEDUCTION}' deduction; "
+                    f"income tax is computed by the tax table"
+                )
+
+        employees = db.query(EmployeeProfile.id, EmployeeProfile.base_salary).filter(
+            EmployeeProfile.status == "active"
+        ).order_by(EmployeeProfile.id).all()
+
+        db.execute(delete(Payslip).where(Payslip.period_id == period.id))
+
+        count = len(employees)
+        employee_ids = [emp.id for emp in employees]
+        base = np.fromiter((emp.base_salary or 0.0 for emp in employees), dtype=float, count=count)
+        allowances = np.zeros(count)
+        overtime = np.zeros(count)
+        other_deductions = np.zeros(count)
+        for i, emp_id in enumerate(employee_ids):
+            adj = adjustments.get(emp_id)
+            if adj:
+                allowances[i] = sum((adj.get("allowances") or {}).values())
+                overtime[i] = adj.get("overtime_amount") or 0.0
+                other_deductions[i] = sum((adj.get("deductions") or {}).values())
+
+        gross = np.round(base + allowances + overtime, 2)
+        tax = np.round(TAX_TABLES[tax_table].compute(gross), 2)
+        total_deductions = tax + other_deductions
+        net = np.round(gross - total_deductions, 2)
+
+        if count:
+            rows = []
+            for i, emp_id in enumerate(employee_ids):
+                adj = adjustments.get(emp_id) or {}
+                rows.append({
+                    "employee_id": emp_id,
+                    "period_id": period.id,
+                    "base_salary": float(base[i]),
+                    "allowances": adj.get("allowances") or {},
+                    "overtime_amount": float(overtime[i]),
+                    "deductions": {INCOME_TAX_DEDUCTION: float(tax[i]), **(adj.get("deductions") or {})},
+                    "gross_pay": float(gross[i]),
+                    "net_pay": float(net[i]),
+                    "status": PayrollStatus.DRAFT,
+                })
+            db.execute(insert(Payslip), rows)
+
+        period.total_gross = float(gross.sum())
+        period.total_deductions = float(total_deductions.sum())
+        period.total_net = float(net.sum())
+
         db.commit()
+        db.refresh(period)
         return period
 
     @staticmethod
@@ -1,7 +1,9 @@
 import os
 import json
+import logging
+from contextvars import ContextVar
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Callable, Optional
 from sqlalchemy.orm import Session # type: ignore[import-untyped]
 from sqlalchemy import func, text # type: ignore[import-untyped]
 
@@ -12,15 +14,40 @@ from ..crud.user import user as user_crud
 from ..models.report import Report, ReportType, ReportStatus
 from ..models.user import User, UserRole
 from ..core.database import SessionLocal
+from .report_cache import ReportResultCache
+from ..utils.file_download import prepare_download_variants
+
+logger = logging.getLogger(__name__)
+
+# Progress callback of the report being generated in this thread (set by generate_report)
+_progress_callback: ContextVar[Optional[Callable[[int], None]]] = ContextVar("report_progress_callback", default=None)
+
+
+# File name prefixes of the report types served from the result cache
+CACHED_FILE_PREFIXES = {
+    ReportType.FINANCIAL_SUMMARY: "financial_summary",
+    ReportType.PROFIT_LOSS: "profit_loss",
+    ReportType.CASH_FLOW: "cash_flow",
+}
+
+
+class ReportCancelled(Exception):
+    """Raised by a progress callback to stop generating a report whose job was cancelled"""
 
 
 class ReportService:
     """Service for generating and managing reports"""
     
     @staticmethod
-    def generate_report(report_id: int) -> bool:
-        """Generate a report in the background"""
+    def generate_report(report_id: int, progress_callback: Optional[Callable[[int], None]] = None) -> bool:
+        """
+        Generate a report in the background.
+
+        ``progress_callback`` receives a completion percentage at each stage and may
+        raise ``ReportCancelled``, which is propagated without marking the report failed.
+        """
         db = SessionLocal()
+        callback_token = _progress_callback.set(progress_callback)
         
         try:
             report = report_crud.get(db, report_id)
@@ -32,8 +59,16 @@ class ReportService:
                 print(f"Report {report_id} is not in generating status")
                 return False
             
+            ReportService._report_progress(10)
+            
+            # Identical report (same type, period and data) generated before
+            cache_key = ReportResultCache.key_for(db, report)
+            cached_data = ReportResultCache.load(cache_key, report) if cache_key else None
+            
+            if cached_data is not None:
+                file_path = ReportService._save_report_file(report, cached_data, CACHED_FILE_PREFIXES[report.type])
             # Generate report based on type
-            if report.type == ReportType.FINANCIAL_SUMMARY:
+            elif report.type == ReportType.FINANCIAL_SUMMARY:
                 file_path = ReportService._generate_financial_summary(db, report)
             elif report.type == ReportType.REVENUE_REPORT:
                 file_path = ReportService._generate_revenue_report(db, report)
@@ -54,6 +89,14 @@ class ReportService:
             
             # Update report with file info
             if file_path and os.path.exists(file_path):
+                if cache_key and cached_data is None:
+                    ReportResultCache.store(cache_key, file_path)
+                # Content hash (ETag) and gzip copy for downloads; otherwise built on first download
+                try:
+                    prepare_download_variants(file_path)
+                except OSError as e:
+                    logger.warning(f"Could not prepare download of report {report_id}: {str(e)}")
+                ReportService._report_progress(95)
                 file_size = os.path.getsize(file_path)
                 report_crud.mark_completed(db, report_id, file_path, file_size)
                 print(f"Report {report_id} generated successfully")
@@ -63,13 +106,39 @@ class ReportService:
                 print(f"Report {report_id} generation failed")
                 return False
                 
+        except ReportCancelled:
+            db.rollback()
+            raise
         except Exception as e:
             print(f"Error generating report {report_id}: {str(e)}")
             report_crud.mark_failed(db, report_id)
             return False
         finally:
+            _progress_callback.reset(callback_token)
             db.close()
     
+    @staticmethod
+    def _save_report_file(report: Report, report_data: Dict[str, Any], prefix: str) -> str:
+        """Write report data to the report's file and return its path"""
+        reports_dir = "reports"
+        os.makedirs(reports_dir, exist_ok=True)
+        
+        # Compact JSON, replaced atomically so a download never sees a half-written file
+        file_path = f"{reports_dir}/{prefix}_{report.id}.json"
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(report_data, f, separators=(",", ":"), default=str)
+        os.replace(tmp_path, file_path)
+        
+        return file_path
+    
+    @staticmethod
+    def _report_progress(percent: int) -> None:
+        """Report a completion percentage to the caller of ``generate_report`` (no-op without a callback)"""
+        callback = _progress_callback.get()
+        if callback is not None:
+            callback(percent)
+    
     @staticmethod
     def _generate_financial_summary(db: Session, report: Report) -> str:
         """Generate financial summary report"""
@@ -105,14 +174,8 @@ class ReportService:
         }
         
         # Save as JSON file (in production, this would be PDF)
-        reports_dir = "reports"
-        os.makedirs(reports_dir, exist_ok=True)
-        
-        file_path = f"{reports_dir}/financial_summary_{report.id}.json"
-        with open(file_path, "w") as f:
-            json.dump(report_data, f, indent=2)
-        
-        return file_path
+        ReportService._report_progress(80)
+        return ReportService._save_report_file(report, report_data, "financial_summary")
     
     @staticmethod
     def _generate_revenue_report(db: Session, report: Report) -> str:
@@ -152,14 +215,8 @@ class ReportService:
         }
         
         # Save file
-        reports_dir = "reports"
-        os.makedirs(reports_dir, exist_ok=True)
-        
-        file_path = f"{reports_dir}/revenue_report_{report.id}.json"
-        with open(file_path, "w") as f:
-            json.dump(report_data, f, indent=2)
-        
-        return file_path
+        ReportService._report_progress(80)
+        return ReportService._save_report_file(report, report_data, "revenue_report")
     
     @staticmethod
     def _generate_expense_report(db: Session, report: Report) -> str:
@@ -201,14 +258,8 @@ class ReportService:
         }
         
         # Save file
-        reports_dir = "reports"
-        os.makedirs(reports_dir, exist_ok=True)
-        
-        file_path = f"{reports_dir}/expense_report_{report.id}.json"
-        with open(file_path, "w") as f:
-            json.dump(report_data, f, indent=2)
-        
-        return file_path
+        ReportService._report_progress(80)
+        return ReportService._save_report_file(report, report_data, "expense_report")
     
     @staticmethod
     def _generate_profit_loss_report(db: Session, report: Report) -> str:
@@ -248,14 +299,8 @@ class ReportService:
         }
         
         # Save file
-        reports_dir = "reports"
-        os.makedirs(reports_dir, exist_ok=True)
-        
-        file_path = f"{reports_dir}/profit_loss_{report.id}.json"
-        with open(file_path, "w") as f:
-            json.dump(report_data, f, indent=2)
-        
-        return file_path
+        ReportService._report_progress(80)
+        return ReportService._save_report_file(report, report_data, "profit_loss")
     
     @staticmethod
     def _generate_cash_flow_report(db: Session, report: Report) -> str:
@@ -304,14 +349,8 @@ class ReportService:
         }
         
         # Save file
-        reports_dir = "reports"
-        os.makedirs(reports_dir, exist_ok=True)
-        
-        file_path = f"{reports_dir}/cash_flow_{report.id}.json"
-        with open(file_path, "w") as f:
-            json.dump(report_data, f, indent=2)
-        
-        return file_path
+        ReportService._report_progress(80)
+        return ReportService._save_report_file(report, report_data, "cash_flow")
     
     @staticmethod
     def _generate_budget_vs_actual_report(db: Session, report: Report) -> str:
@@ -375,14 +414,8 @@ class ReportService:
         }
         
         # Save file
-        reports_dir = "reports"
-        os.makedirs(reports_dir, exist_ok=True)
-        
-        file_path = f"{reports_dir}/budget_vs_actual_{report.id}.json"
-        with open(file_path, "w") as f:
-            json.dump(report_data, f, indent=2)
-        
-        return file_path
+        ReportService._report_progress(80)
+        return ReportService._save_report_file(report, report_data, "budget_vs_actual")
     
     @staticmethod
     def _generate_audit_report(db: Session, report: Report) -> str:
@@ -449,14 +482,8 @@ class ReportService:
         }
         
         # Save file
-        reports_dir = "reports"
-        os.makedirs(reports_dir, exist_ok=True)
-        
-        file_path = f"{reports_dir}/audit_report_{report.id}.json"
-        with open(file_path, "w") as f:
-            json.dump(report_data, f, indent=2)
-        
-        return file_path
+        ReportService._report_progress(80)
+        return ReportService._save_report_file(report, report_data, "audit_report")
     
     @staticmethod
     def get_report_templates() -> List[Dict[str, Any]]:
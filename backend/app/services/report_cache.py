@@ -0,0 +1,165 @@
+"""
+Content-addressed cache of report results.
+
+Financial summary, profit & loss and cash flow reports aggregate the
+organisation's revenue and expense entries for a period. The result depends
+only on the report type, the period and the data; it does not depend on who
+requested it. Results are stored as JSON files under
+``<REPORTS_DIR>/cache``, named by the SHA-256 of:
+
+* the report type,
+* the normalized parameters (parsed ``start_date``/``end_date``),
+* a data watermark over the period's revenue and expense rows: row count,
+  approved row count, amount total and latest ``created_at``/``updated_at``.
+
+Any insert, approval, edit or delete inside the period changes the watermark,
+so a stale result is never found. No explicit invalidation is needed, and all
+processes share the cache. Reports without an explicit period ("the last
+30 days until now") are not cached.
+"""
+from typing import Any, Dict, Optional
+from datetime import datetime
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from sqlalchemy import and_, case, func # type: ignore[import-untyped]
+from sqlalchemy.orm import Session # type: ignore[import-untyped]
+
+from ..core.config import settings
+from ..core.metrics import REPORT_CACHE_LOOKUPS
+from ..models.expense import ExpenseEntry
+from ..models.report import Report, ReportType
+from ..models.revenue import RevenueEntry
+
+logger = logging.getLogger(__name__)
+
+CACHEABLE_TYPES = (ReportType.FINANCIAL_SUMMARY, ReportType.PROFIT_LOSS, ReportType.CASH_FLOW)
+
+# Bump when a cached report's layout changes so old entries are not served
+CACHE_FORMAT_VERSION = 1
+
+# Per-report fields, filled in for the report being generated on a hit
+PER_REPORT_FIELDS = ("title", "generated_at")
+
+
+def _cache_dir() -> str:
+    return os.path.join(settings.REPORTS_DIR, "cache")
+
+
+def _normalized_period(parameters: Optional[str]) -> Optional[Dict[str, str]]:
+    """Explicit reporting period in canonical ISO form, or None for a rolling/invalid period"""
+    try:
+        params = json.loads(parameters or "{}")
+        start_date = datetime.fromisoformat(params["start_date"])
+        end_date = datetime.fromisoformat(params["end_date"])
+    except (ValueError, TypeError, KeyError):
+        return None
+    return {"start_date": start_date.isoformat(), "end_date": end_date.isoformat()}
+
+
+def _watermark(db: Session, model, start_date: datetime, end_date: datetime) -> list:
+    row = db.query(
+        func.count(model.id),
+        func.sum(case((model.is_approved == True, 1), else_=0)),
+        func.sum(model.amount),
+        func.max(model.created_at),
+        func.max(model.updated_at),
+    ).filter(and_(model.date >= start_date, model.date <= end_date)).one()
+    return [str(value) if value is not None else None for value in row]
+
+
+class ReportResultCache:
+    @staticmethod
+    def key_for(db: Session, report: Report) -> Optional[str]:
+        """Cache key of the report's result at the current state of the data, or None if not cacheable"""
+        if not settings.REPORT_CACHE_ENABLED or report.type not in CACHEABLE_TYPES:
+            return None
+        period = _normalized_period(report.parameters)
+        if period is None:
+            return None
+        start_date = datetime.fromisoformat(period["start_date"])
+        end_date = datetime.fromisoformat(period["end_date"])
+        try:
+            watermark = {
+                "revenue": _watermark(db, RevenueEntry, start_date, end_date),
+                "expense": _watermark(db, ExpenseEntry, start_date, end_date),
+            }
+        except Exception as e:
+            # The cache must never fail a report: generate it from scratch instead
+            logger.warning(f"Report cache watermark failed for report {report.id}: {e}")
+            db.rollback()
+            return None
+        material = {
+            "version": CACHE_FORMAT_VERSION,
+            "type": report.type.value,
+            "parameters": period,
+            "watermark": watermark,
+        }
+        return hashlib.sha256(json.dumps(material, sort_keys=True).encode()).hexdigest()
+
+    @staticmethod
+    def load(key: str, report: Report) -> Optional[Dict[str, Any]]:
+        """Cached result for ``key`` with the report's own title and generation time, or None on a miss"""
+        path = os.path.join(_cache_dir(), f"{key}.json")
+        try:
+            with open(path) as f:
+                report_data = json.load(f)
+        except FileNotFoundError:
+            REPORT_CACHE_LOOKUPS.inc(report_type=report.type.value, result="miss")
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable report cache entry {key}: {e}")
+            REPORT_CACHE_LOOKUPS.inc(report_type=report.type.value, result="miss")
+            return None
+        # Touch for least-recently-used pruning
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        REPORT_CACHE_LOOKUPS.inc(report_type=report.type.value, result="hit")
+        report_data["title"] = report.title
+        report_data["generated_at"] = datetime.now().isoformat()
+        return report_data
+
+    @staticmethod
+    def store(key: str, file_path: str) -> None:
+        """Cache the generated report file under ``key`` (written atomically, then pruned)"""
+        try:
+            with open(file_path) as f:
+                report_data = json.load(f)
+            for field in PER_REPORT_FIELDS:
+                report_data.pop(field, None)
+
+            cache_dir = _cache_dir()
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(report_data, f)
+            os.replace(tmp_path, os.path.join(cache_dir, f"{key}.json"))
+            ReportResultCache.prune()
+        except Exception as e:
+            logger.warning(f"Failed to cache report result {key}: {e}")
+
+    @staticmethod
+    def prune(max_entries: Optional[int] = None) -> int:
+        """Delete the least recently used entries beyond ``REPORT_CACHE_MAX_ENTRIES``"""
+        max_entries = settings.REPORT_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        cache_dir = _cache_dir()
+        try:
+            entries = [entry for entry in os.scandir(cache_dir) if entry.name.endswith(".json")]
+        except FileNotFoundError:
+            return 0
+        if len(entries) <= max_entries:
+            return 0
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        removed = 0
+        for entry in entries[:len(entries) - max_entries]:
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
@@ -0,0 +1,416 @@
+"""
+Database-backed report job queue.
+
+``POST /reports/`` and ``/reports/{id}/regenerate`` add a ``ReportJob`` row
+instead of running the report inside the request's process. Worker threads
+(``REPORT_WORKERS`` per process) claim queued rows with a conditional
+``UPDATE``, so any number of API processes can share the queue without
+generating a report twice. A claim also enforces ``REPORT_MAX_CONCURRENT_PER_USER``.
+On PostgreSQL, claims for the same user hold a transaction-level advisory lock,
+so each claim's count sees every earlier claim and the cap is exact across
+threads and processes. SQLite runs one writer at a time, which has the same effect.
+
+Running jobs write their progress and a heartbeat to their row. A cancelled
+job stops at its next progress update. When a process dies mid-report, its
+heartbeat stops too. After ``REPORT_JOB_STALE_SECONDS`` the job is requeued, up
+to ``REPORT_JOB_MAX_ATTEMPTS`` times. Reports left ``GENERATING`` without a live
+job, e.g. from before this queue existed, are requeued at start-up.
+
+Run the workers in a separate process (with ``REPORT_QUEUE_ENABLED=false`` on
+the API) with:
+
+    python -m app.services.report_queue
+"""
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta, timezone
+import logging
+import os
+import socket
+import threading
+
+from sqlalchemy import func, select, update, or_ # type: ignore[import-untyped]
+from sqlalchemy.orm import Session, aliased # type: ignore[import-untyped]
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.metrics import BACKGROUND_QUEUE_DEPTH, BACKGROUND_TASKS_IN_PROGRESS
+from ..crud.report import report as report_crud
+from ..models.report import Report, ReportStatus
+from ..models.report_job import ReportJob, ReportJobStatus
+from .report import ReportService, ReportCancelled
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = (ReportJobStatus.QUEUED.value, ReportJobStatus.RUNNING.value)
+FINISHED_STATUSES = (ReportJobStatus.COMPLETED.value, ReportJobStatus.FAILED.value, ReportJobStatus.CANCELLED.value)
+
+# Queued rows considered per claim attempt (the oldest may belong to users at their cap)
+CLAIM_CANDIDATES = 20
+
+# First key of the per-user advisory locks (pg_advisory_xact_lock(key, user_id)) held while claiming
+CLAIM_LOCK_KEY = 7301
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _running_for_user():
+    """Correlated count of the running jobs of the job's user"""
+    running = aliased(ReportJob)
+    return (
+        select(func.count(running.id))
+        .where(running.user_id == ReportJob.user_id, running.status == ReportJobStatus.RUNNING.value)
+        .correlate(ReportJob)
+        .scalar_subquery()
+    )
+
+
+class ReportJobQueue:
+    """Enqueue/cancel API for the endpoints, plus the worker pool that drains the queue"""
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        # Job id -> report id for the jobs running in this process
+        self._running: Dict[int, int] = {}
+
+    # ------------------------------------------------------------------
+    # API side
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def active_jobs(db: Session, user_id: int) -> int:
+        """Queued and running jobs of one user"""
+        return db.query(func.count(ReportJob.id)).filter(
+            ReportJob.user_id == user_id,
+            ReportJob.status.in_(ACTIVE_STATUSES)
+        ).scalar() or 0
+
+    def enqueue(self, db: Session, report: Report) -> ReportJob:
+        """Queue ``report`` (already in ``GENERATING`` status) for generation"""
+        job = db.query(ReportJob).filter(ReportJob.report_id == report.id).first()
+        if job is None:
+            job = ReportJob(report_id=report.id, user_id=report.created_by_id)
+            db.add(job)
+        job.status = ReportJobStatus.QUEUED.value
+        job.progress = 0
+        job.cancel_requested = False
+        job.attempts = 0
+        job.worker_id = None
+        job.error = None
+        job.queued_at = _now()
+        job.started_at = None
+        job.heartbeat_at = None
+        job.finished_at = None
+        db.commit()
+        db.refresh(job)
+        self._wake.set()
+        return job
+
+    @staticmethod
+    def get_job(db: Session, report_id: int) -> Optional[ReportJob]:
+        return db.query(ReportJob).filter(ReportJob.report_id == report_id).first()
+
+    def cancel(self, db: Session, report_id: int) -> Optional[ReportJob]:
+        """
+        Cancel the report's job. A queued job is cancelled at once; a running one
+        stops at its next progress update. Finished jobs are returned unchanged.
+        """
+        job = self.get_job(db, report_id)
+        if job is None or job.status not in ACTIVE_STATUSES:
+            return job
+
+        cancelled = db.execute(
+            update(ReportJob)
+            .where(ReportJob.id == job.id, ReportJob.status == ReportJobStatus.QUEUED.value)
+            .values(status=ReportJobStatus.CANCELLED.value, cancel_requested=True, finished_at=_now())
+        ).rowcount
+        if cancelled:
+            db.commit()
+            report_crud.mark_failed(db, report_id)
+        else:
+            # Claimed in the meantime: let the worker stop it
+            db.execute(update(ReportJob).where(ReportJob.id == job.id).values(cancel_requested=True))
+            db.commit()
+        db.refresh(job)
+        return job
+
+    @staticmethod
+    def pending_jobs() -> int:
+        """Queued and running jobs across all processes (for the queue-depth gauge)"""
+        db = SessionLocal()
+        try:
+            return db.query(func.count(ReportJob.id)).filter(ReportJob.status.in_(ACTIVE_STATUSES)).scalar() or 0
+        finally:
+            db.close()
+
+    # ------------------------------------------------------------------
+    # Worker side
+    # ------------------------------------------------------------------
+
+    def start(self) -> bool:
+        """Recover interrupted jobs and start the worker and heartbeat threads"""
+        if self._threads:
+            return False
+        self._stop.clear()
+        try:
+            self.recover()
+        except Exception as e:
+            logger.error(f"Report queue recovery failed: {e}", exc_info=True)
+
+        for index in range(max(1, settings.REPORT_WORKERS)):
+            self._threads.append(threading.Thread(target=self._worker_loop, name=f"report-worker-{index}", daemon=True))
+        self._threads.append(threading.Thread(target=self._heartbeat_loop, name="report-heartbeat", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Report queue started with {settings.REPORT_WORKERS} workers ({self.worker_id})")
+        return True
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """
+        Stop claiming jobs and wait up to ``timeout`` seconds for running reports.
+        Reports still running afterwards are put back in the queue for the next start.
+        """
+        if not self._threads:
+            return
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+        with self._lock:
+            job_ids = list(self._running)
+        if job_ids:
+            db = SessionLocal()
+            try:
+                db.execute(
+                    update(ReportJob)
+                    .where(ReportJob.id.in_(job_ids), ReportJob.worker_id == self.worker_id,
+                           ReportJob.status == ReportJobStatus.RUNNING.value)
+                    .values(status=ReportJobStatus.QUEUED.value, worker_id=None, progress=0, queued_at=_now())
+                )
+                db.commit()
+                logger.warning(f"Requeued {len(job_ids)} report jobs interrupted by shutdown")
+            except Exception as e:
+                logger.error(f"Failed to requeue interrupted report jobs: {e}")
+            finally:
+                db.close()
+        logger.info("Report queue stopped")
+
+    def recover(self) -> int:
+        """Requeue stale running jobs and reports left ``GENERATING`` without a live job"""
+        recovered = self._requeue_stale()
+        db = SessionLocal()
+        try:
+            orphans = (
+                db.query(Report)
+                .outerjoin(ReportJob, ReportJob.report_id == Report.id)
+                .filter(
+                    Report.status == ReportStatus.GENERATING,
+                    or_(ReportJob.id.is_(None), ReportJob.status.in_(FINISHED_STATUSES))
+                )
+                .all()
+            )
+            for report in orphans:
+                self.enqueue(db, report)
+            recovered += len(orphans)
+        finally:
+            db.close()
+        if recovered:
+            logger.info(f"Report queue recovered {recovered} interrupted reports")
+        return recovered
+
+    def _requeue_stale(self) -> int:
+        """Requeue running jobs whose heartbeat stopped; fail them after the last attempt"""
+        cutoff = _now() - timedelta(seconds=settings.REPORT_JOB_STALE_SECONDS)
+        db = SessionLocal()
+        try:
+            stale = db.query(ReportJob).filter(
+                ReportJob.status == ReportJobStatus.RUNNING.value,
+                ReportJob.heartbeat_at < cutoff
+            ).all()
+            for job in stale:
+                job_id, report_id, worker_id, attempts = job.id, job.report_id, job.worker_id, job.attempts
+                exhausted = job.attempts >= settings.REPORT_JOB_MAX_ATTEMPTS or job.cancel_requested
+                values = (
+                    {"status": ReportJobStatus.CANCELLED.value if job.cancel_requested else ReportJobStatus.FAILED.value,
+                     "error": "Worker stopped responding", "finished_at": _now()}
+                    if exhausted else
+                    {"status": ReportJobStatus.QUEUED.value, "worker_id": None, "progress": 0, "queued_at": _now()}
+                )
+                # Conditional on the heartbeat so a job that just reported progress is left alone
+                requeued = db.execute(
+                    update(ReportJob)
+                    .where(ReportJob.id == job_id, ReportJob.status == ReportJobStatus.RUNNING.value,
+                           ReportJob.heartbeat_at < cutoff)
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                db.commit()
+                if not requeued:
+                    continue
+                if exhausted:
+                    report_crud.mark_failed(db, report_id)
+                logger.warning(f"Report job {job_id} (report {report_id}) from {worker_id} was stale; "
+                               f"{'gave up' if exhausted else 'requeued'} after {attempts} attempts")
+            if stale:
+                self._wake.set()
+            return len(stale)
+        finally:
+            db.close()
+
+    def _worker_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self._claim_next()
+            except Exception as e:
+                logger.error(f"Report queue claim failed: {e}", exc_info=True)
+                job = None
+            if job is None:
+                self._wake.wait(settings.REPORT_QUEUE_POLL_SECONDS)
+                self._wake.clear()
+                continue
+            self._run(*job)
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(settings.REPORT_JOB_HEARTBEAT_SECONDS):
+            try:
+                with self._lock:
+                    job_ids = list(self._running)
+                if job_ids:
+                    db = SessionLocal()
+                    try:
+                        db.execute(
+                            update(ReportJob)
+                            .where(ReportJob.id.in_(job_ids), ReportJob.worker_id == self.worker_id)
+                            .values(heartbeat_at=_now())
+                        )
+                        db.commit()
+                    finally:
+                        db.close()
+                self._requeue_stale()
+            except Exception as e:
+                logger.error(f"Report queue heartbeat failed: {e}", exc_info=True)
+
+    def _claim_next(self):
+        """Atomically move the oldest eligible queued job to running; returns (job id, report id)"""
+        cap = settings.REPORT_MAX_CONCURRENT_PER_USER
+        db = SessionLocal()
+        try:
+            lock_per_user = db.get_bind().dialect.name == "postgresql"
+            candidates = (
+                db.query(ReportJob.id, ReportJob.report_id, ReportJob.user_id)
+                .filter(ReportJob.status == ReportJobStatus.QUEUED.value, _running_for_user() < cap)
+                .order_by(ReportJob.queued_at, ReportJob.id)
+                .limit(CLAIM_CANDIDATES)
+                .all()
+            )
+            for job_id, report_id, user_id in candidates:
+                if lock_per_user:
+                    # Under READ COMMITTED two claims could both count the same running jobs;
+                    # serialised per user, the count below sees every committed claim
+                    db.execute(select(func.pg_advisory_xact_lock(CLAIM_LOCK_KEY, user_id)))
+                now = _now()
+                claimed = db.execute(
+                    update(ReportJob)
+                    .where(ReportJob.id == job_id, ReportJob.status == ReportJobStatus.QUEUED.value,
+                           _running_for_user() < cap)
+                    .values(status=ReportJobStatus.RUNNING.value, worker_id=self.worker_id,
+                            attempts=ReportJob.attempts + 1, started_at=now, heartbeat_at=now)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                db.commit()
+                if claimed:
+                    return job_id, report_id
+            return None
+        finally:
+            db.close()
+
+    def _progress_callback(self, job_id: int):
+        def callback(percent: int) -> None:
+            db = SessionLocal()
+            try:
+                db.execute(
+                    update(ReportJob)
+                    .where(ReportJob.id == job_id, ReportJob.worker_id == self.worker_id)
+                    .values(progress=max(0, min(int(percent), 99)), heartbeat_at=_now())
+                )
+                db.commit()
+                cancel_requested = db.query(ReportJob.cancel_requested).filter(ReportJob.id == job_id).scalar()
+            finally:
+                db.close()
+            if cancel_requested:
+                raise ReportCancelled()
+        return callback
+
+    def _run(self, job_id: int, report_id: int) -> None:
+        with self._lock:
+            self._running[job_id] = report_id
+        BACKGROUND_TASKS_IN_PROGRESS.inc(task="report")
+        error = None
+        try:
+            if ReportService.generate_report(report_id, progress_callback=self._progress_callback(job_id)):
+                status = ReportJobStatus.COMPLETED
+            else:
+                status, error = ReportJobStatus.FAILED, "Report generation failed"
+        except ReportCancelled:
+            status = ReportJobStatus.CANCELLED
+        except Exception as e:
+            logger.error(f"Report job {job_id} (report {report_id}) crashed: {e}", exc_info=True)
+            status, error = ReportJobStatus.FAILED, str(e)
+        finally:
+            BACKGROUND_TASKS_IN_PROGRESS.dec(task="report")
+            with self._lock:
+                self._running.pop(job_id, None)
+        self._finish(job_id, report_id, status, error)
+
+    def _finish(self, job_id: int, report_id: int, status: ReportJobStatus, error: Optional[str]) -> None:
+        db = SessionLocal()
+        try:
+            values = {"status": status.value, "error": error, "finished_at": _now()}
+            if status == ReportJobStatus.COMPLETED:
+                values["progress"] = 100
+            # Only if this worker still owns the job (it may have been requeued as stale)
+            owned = db.execute(
+                update(ReportJob)
+                .where(ReportJob.id == job_id, ReportJob.worker_id == self.worker_id,
+                       ReportJob.status == ReportJobStatus.RUNNING.value)
+                .values(**values)
+            ).rowcount
+            db.commit()
+            if owned and status != ReportJobStatus.COMPLETED:
+                report = report_crud.get(db, report_id)
+                if report is not None and report.status == ReportStatus.GENERATING:
+                    report_crud.mark_failed(db, report_id)
+            logger.info(f"Report job {job_id} (report {report_id}) finished: {status.value}")
+        except Exception as e:
+            logger.error(f"Failed to record result of report job {job_id}: {e}", exc_info=True)
+        finally:
+            db.close()
+
+
+report_queue = ReportJobQueue()
+BACKGROUND_QUEUE_DEPTH.set_function(report_queue.pending_jobs, queue="reports")
+
+
+def main() -> int:
+    """Run the report workers until interrupted (for a dedicated worker process)"""
+    from ..core.logging_config import configure_logging
+    configure_logging(settings)
+    report_queue.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        report_queue.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,344 @@
+"""
+Scheduled report execution.
+
+Each ``ReportSchedule`` points at a template report (type, title, parameters,
+owner). A schedule's ``frequency`` is a shortcut (``daily``, ``weekly``,
+``monthly``, ``quarterly``, ``yearly``) or a five-field cron expression. The
+shortcuts run at ``REPORT_SCHEDULE_RUN_HOUR`` (UTC) and may be narrowed by
+``day_of_week`` (0 = Monday), ``day_of_month`` and ``month``.
+
+Every ``REPORT_SCHEDULE_POLL_SECONDS`` the scheduler thread:
+
+1. During the off-peak window (``REPORT_SCHEDULE_OFF_PEAK_HOURS``), claims the
+   due schedules. A conditional ``UPDATE`` of ``next_run`` makes this safe with
+   several processes, and missed runs collapse into one. Each run reports on
+   the period since the schedule's previous run. Schedules that resolve to the
+   same report type and parameters are coalesced: one report is generated
+   through the report job queue, and the others are marked ``SCHEDULED`` and
+   wait for it.
+2. Delivers finished runs. Each run is first claimed with a conditional
+   ``UPDATE`` (``pending`` -> ``delivering``), so only one process delivers it.
+   Coalesced reports get a hard link (or copy) of the generated file. Each
+   schedule owner is emailed a download link with
+   ``EmailService.send_report_ready``.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, time, timedelta, timezone
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+
+from sqlalchemy import update # type: ignore[import-untyped]
+from sqlalchemy.orm import Session # type: ignore[import-untyped]
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..crud.report import report as report_crud
+from ..crud.user import user as user_crud
+from ..models.report import Report, ReportSchedule, ReportStatus
+from ..models.report_schedule_run import ReportScheduleRun, ReportScheduleRunStatus
+from ..utils.cron import CronExpression
+from .email import EmailService
+from .report_queue import report_queue
+
+logger = logging.getLogger(__name__)
+
+# Variants written next to a report file (see app.utils.file_download)
+FILE_VARIANT_SUFFIXES = ("", ".gz", ".sha256")
+
+# Runs left "delivering" this long (their process died mid-delivery) are retried
+DELIVERY_CLAIM_TIMEOUT = timedelta(minutes=15)
+
+
+def _utc(value: datetime) -> datetime:
+    """SQLite returns naive datetimes; schedules are kept in UTC"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def schedule_expression(schedule: ReportSchedule) -> CronExpression:
+    """Cron expression of a schedule (frequency shortcut or a literal expression)"""
+    hour = settings.REPORT_SCHEDULE_RUN_HOUR
+    day = schedule.day_of_month or 1
+    frequency = (schedule.frequency or "").strip().lower()
+    if frequency == "daily":
+        return CronExpression(f"0 {hour} * * *")
+    if frequency == "weekly":
+        # day_of_week is 0 = Monday (as date.weekday()); cron counts from Sunday
+        return CronExpression(f"0 {hour} * * {((schedule.day_of_week or 0) + 1) % 7}")
+    if frequency == "monthly":
+        return CronExpression(f"0 {hour} {day} * *")
+    if frequency == "quarterly":
+        return CronExpression(f"0 {hour} {day} 1,4,7,10 *")
+    if frequency == "yearly":
+        return CronExpression(f"0 {hour} {day} {schedule.month or 1} *")
+    return CronExpression(schedule.frequency)
+
+
+def reporting_period(expression: CronExpression, scheduled_for: datetime) -> Tuple[datetime, datetime]:
+    """
+    Period covered by a run: from the previous run to this one, in whole days when the
+    runs are on different days (a monthly run on the 1st covers the previous calendar month).
+    """
+    previous = expression.previous_before(scheduled_for)
+    if previous.date() == scheduled_for.date():
+        return previous, scheduled_for
+    start = datetime.combine(previous.date(), time(0), tzinfo=scheduled_for.tzinfo)
+    end = datetime.combine(scheduled_for.date(), time(0), tzinfo=scheduled_for.tzinfo) - timedelta(seconds=1)
+    return start, end
+
+
+def in_off_peak_window(moment: datetime, window: Optional[str] = None) -> bool:
+    """Whether ``moment`` (UTC) falls in the ``start-end`` hour window; wraps past midnight"""
+    window = settings.REPORT_SCHEDULE_OFF_PEAK_HOURS if window is None else window
+    if not window or not window.strip():
+        return True
+    start_text, _, end_text = window.partition("-")
+    start, end = int(start_text), int(end_text or start_text)
+    hour = moment.hour
+    if start == end:
+        return True
+    return start <= hour < end if start < end else hour >= start or hour < end
+
+
+def _coalesce_key(template: Report, parameters: Dict[str, Any]) -> str:
+    material = {"type": template.type.value, "parameters": parameters}
+    return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _link_or_copy(source: str, target: str) -> None:
+    """Hard link (report files are replaced, never rewritten in place, so links stay intact) or copy"""
+    if os.path.exists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+class ReportScheduler:
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> bool:
+        if self._thread is not None:
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="report-scheduler", daemon=True)
+        self._thread.start()
+        logger.info("Report scheduler started")
+        return True
+
+    def stop(self, timeout: float = 10.0) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info("Report scheduler stopped")
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Report scheduler tick failed: {e}", exc_info=True)
+            self._stop.wait(settings.REPORT_SCHEDULE_POLL_SECONDS)
+
+    def tick(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Start due schedules (in the off-peak window) and deliver finished runs"""
+        now = now or datetime.now(timezone.utc)
+        started = self.run_due_schedules(now) if in_off_peak_window(now) else 0
+        delivered = self.deliver_finished_runs()
+        return {"started": started, "delivered": delivered}
+
+    # ------------------------------------------------------------------
+    # Starting runs
+    # ------------------------------------------------------------------
+
+    def _claim(self, db: Session, schedule: ReportSchedule, now: datetime) -> Optional[Tuple[datetime, CronExpression]]:
+        """Advance ``next_run`` past ``now`` if no other process did; returns the run time claimed"""
+        try:
+            expression = schedule_expression(schedule)
+            # Parsing is not enough: fields may never match together (e.g. 30 February)
+            latest = expression.previous_before(now.replace(second=0, microsecond=0) + timedelta(minutes=1))
+            next_run = expression.next_after(now)
+        except ValueError as e:
+            logger.error(f"Deactivating report schedule {schedule.id}: invalid frequency '{schedule.frequency}': {e}")
+            schedule.is_active = False
+            db.commit()
+            return None
+        scheduled_for = _utc(schedule.next_run)
+        # Missed runs (e.g. downtime) collapse into the latest one
+        if latest > scheduled_for:
+            scheduled_for = latest
+        claimed = db.execute(
+            update(ReportSchedule)
+            .where(ReportSchedule.id == schedule.id, ReportSchedule.next_run == schedule.next_run)
+            .values(next_run=next_run)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        return (scheduled_for, expression) if claimed else None
+
+    def run_due_schedules(self, now: datetime) -> int:
+        """Create and enqueue the reports of all due schedules; returns the number of runs started"""
+        db = SessionLocal()
+        try:
+            due = db.query(ReportSchedule).filter(
+                ReportSchedule.is_active == True,
+                ReportSchedule.next_run <= now
+            ).all()
+
+            groups: Dict[str, List[Tuple[ReportSchedule, Report, Dict[str, Any], datetime]]] = {}
+            for schedule in due:
+                claim = self._claim(db, schedule, now)
+                if claim is None:
+                    continue
+                scheduled_for, expression = claim
+                template = report_crud.get(db, schedule.report_id)
+                if template is None:
+                    logger.warning(f"Report schedule {schedule.id} refers to missing report {schedule.report_id}")
+                    continue
+                start_date, end_date = reporting_period(expression, scheduled_for)
+                parameters = json.loads(template.parameters or "{}")
+                parameters.update(start_date=start_date.isoformat(), end_date=end_date.isoformat())
+                groups.setdefault(_coalesce_key(template, parameters), []).append(
+                    (schedule, template, parameters, scheduled_for)
+                )
+
+            started = 0
+            for key, members in groups.items():
+                source_report = None
+                for schedule, template, parameters, scheduled_for in members:
+                    report = Report(
+                        title=f"{template.title} ({parameters['start_date'][:10]} to {parameters['end_date'][:10]})",
+                        description=template.description,
+                        type=template.type,
+                        # The first schedule's report is generated; the others wait for it
+                        status=ReportStatus.GENERATING if source_report is None else ReportStatus.SCHEDULED,
+                        parameters=json.dumps(parameters),
+                        is_public=template.is_public,
+                        created_by_id=template.created_by_id,
+                    )
+                    db.add(report)
+                    db.flush()
+                    if source_report is None:
+                        source_report = report
+                    db.add(ReportScheduleRun(
+                        schedule_id=schedule.id,
+                        report_id=report.id,
+                        source_report_id=source_report.id,
+                        coalesce_key=key,
+                        scheduled_for=scheduled_for,
+                        status=ReportScheduleRunStatus.PENDING.value,
+                    ))
+                    started += 1
+                db.commit()
+                report_queue.enqueue(db, source_report)
+                if len(members) > 1:
+                    logger.info(f"Coalesced {len(members)} report schedules into report {source_report.id}")
+            return started
+        finally:
+            db.close()
+
+    # ------------------------------------------------------------------
+    # Delivery
+    # ------------------------------------------------------------------
+
+    def deliver_finished_runs(self) -> int:
+        """Copy coalesced results, email schedule owners and close runs whose report finished"""
+        db = SessionLocal()
+        try:
+            self._release_stale_claims(db)
+            pending = db.query(ReportScheduleRun).filter(
+                ReportScheduleRun.status == ReportScheduleRunStatus.PENDING.value
+            ).all()
+            delivered = 0
+            for run in pending:
+                source = report_crud.get(db, run.source_report_id)
+                if source is not None and source.status == ReportStatus.GENERATING:
+                    continue
+                if not self._claim_run(db, run):
+                    # Another process is delivering it
+                    continue
+                try:
+                    if source is None or source.status != ReportStatus.COMPLETED or not source.file_url:
+                        self._close_run(db, run, ReportScheduleRunStatus.FAILED, "Report generation failed")
+                        continue
+                    report = source if run.report_id == source.id else self._copy_result(db, source, run.report_id)
+                    self._notify(db, report)
+                    self._close_run(db, run, ReportScheduleRunStatus.DELIVERED)
+                    delivered += 1
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Failed to deliver report schedule run {run.id}: {e}", exc_info=True)
+                    self._close_run(db, run, ReportScheduleRunStatus.FAILED, str(e))
+            return delivered
+        finally:
+            db.close()
+
+    @staticmethod
+    def _claim_run(db: Session, run: ReportScheduleRun) -> bool:
+        """Move a run from pending to delivering; False if another process claimed it first"""
+        claimed = db.execute(
+            update(ReportScheduleRun)
+            .where(ReportScheduleRun.id == run.id, ReportScheduleRun.status == ReportScheduleRunStatus.PENDING.value)
+            # delivered_at holds the claim time until the run is closed
+            .values(status=ReportScheduleRunStatus.DELIVERING.value, delivered_at=datetime.now(timezone.utc))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        return bool(claimed)
+
+    @staticmethod
+    def _release_stale_claims(db: Session) -> None:
+        released = db.execute(
+            update(ReportScheduleRun)
+            .where(
+                ReportScheduleRun.status == ReportScheduleRunStatus.DELIVERING.value,
+                ReportScheduleRun.delivered_at < datetime.now(timezone.utc) - DELIVERY_CLAIM_TIMEOUT
+            )
+            .values(status=ReportScheduleRunStatus.PENDING.value, delivered_at=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if released:
+            logger.warning(f"Retrying {released} report schedule runs abandoned during delivery")
+
+    @staticmethod
+    def _copy_result(db: Session, source: Report, report_id: int) -> Report:
+        """Give a coalesced run's report the generated file of the source report"""
+        directory, name = os.path.split(source.file_url)
+        prefix, _, extension = name.rpartition(f"_{source.id}")
+        target = os.path.join(directory, f"{prefix}_{report_id}{extension}")
+        for suffix in FILE_VARIANT_SUFFIXES:
+            if os.path.exists(source.file_url + suffix):
+                _link_or_copy(source.file_url + suffix, target + suffix)
+        return report_crud.mark_completed(db, report_id, target, source.file_size)
+
+    @staticmethod
+    def _notify(db: Session, report: Report) -> None:
+        owner = user_crud.get(db, report.created_by_id)
+        if owner is None or not owner.email:
+            return
+        download_url = f"{settings.REPORT_DOWNLOAD_BASE_URL}/api/v1/reports/{report.id}/file"
+        if not EmailService.send_report_ready(owner.email, report.title, download_url):
+            logger.warning(f"Report {report.id} is ready but the email to {owner.email} was not sent")
+
+    @staticmethod
+    def _close_run(db: Session, run: ReportScheduleRun, status: ReportScheduleRunStatus, error: Optional[str] = None) -> None:
+        if status == ReportScheduleRunStatus.FAILED and run.report_id != run.source_report_id:
+            report = report_crud.get(db, run.report_id)
+            if report is not None and report.status == ReportStatus.SCHEDULED:
+                report_crud.mark_failed(db, run.report_id)
+        run.status = status.value
+        run.error = error
+        run.delivered_at = datetime.now(timezone.utc)
+        db.commit()
+
+
+report_scheduler = ReportScheduler()
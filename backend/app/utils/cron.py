@@ -0,0 +1,83 @@
+"""
+Five-field cron expressions (minute hour day-of-month month day-of-week).
+
+Supports ``*``, lists (``1,15``), ranges (``1-5``) and steps (``*/15``, ``0-30/10``).
+Day of week is 0-6 from Sunday (7 is also Sunday). As in cron, when both day
+fields are restricted a day matches either of them.
+"""
+from typing import List, Set, Tuple
+from datetime import date, datetime, time, timedelta
+
+FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+# A valid expression matches at least once in any 5-year span (Feb 29 every 4 years)
+MAX_SEARCH_DAYS = 366 * 5
+
+
+def _parse_field(text: str, low: int, high: int) -> Set[int]:
+    values: Set[int] = set()
+    for part in text.split(","):
+        spec, _, step_text = part.partition("/")
+        step = int(step_text) if step_text else 1
+        if step < 1:
+            raise ValueError(f"Invalid step in cron field '{text}'")
+        if spec == "*":
+            start, end = low, high
+        elif "-" in spec:
+            start_text, end_text = spec.split("-", 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = int(spec)
+            end = high if step_text else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron field '{text}' is outside {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronExpression:
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression '{expression}' must have 5 fields")
+        minutes, hours, days, months, weekdays = (
+            _parse_field(text, low, high) for text, (low, high) in zip(fields, FIELD_RANGES)
+        )
+        self.expression = expression
+        self.days = days
+        self.months = months
+        self.weekdays = {0 if day == 7 else day for day in weekdays}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+        self.times: List[Tuple[int, int]] = sorted((hour, minute) for hour in hours for minute in minutes)
+
+    def _day_matches(self, day: date) -> bool:
+        if day.month not in self.months:
+            return False
+        day_match = day.day in self.days
+        # date.weekday() is 0 for Monday; cron counts from Sunday
+        weekday_match = (day.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_match and weekday_match
+        return day_match or weekday_match
+
+    def _search(self, moment: datetime, forward: bool) -> datetime:
+        moment = moment.replace(second=0, microsecond=0) if forward else moment
+        day = moment.date()
+        times = self.times if forward else list(reversed(self.times))
+        for _ in range(MAX_SEARCH_DAYS):
+            if self._day_matches(day):
+                for hour, minute in times:
+                    candidate = datetime.combine(day, time(hour, minute), tzinfo=moment.tzinfo)
+                    if (candidate > moment) if forward else (candidate < moment):
+                        return candidate
+            day += timedelta(days=1 if forward else -1)
+        raise ValueError(f"Cron expression '{self.expression}' never matches")
+
+    def next_after(self, moment: datetime) -> datetime:
+        """First matching minute strictly after ``moment`` (same tzinfo)"""
+        return self._search(moment, forward=True)
+
+    def previous_before(self, moment: datetime) -> datetime:
+        """Last matching minute strictly before ``moment`` (same tzinfo)"""
+        return self._search(moment, forward=False)
@@ -0,0 +1,221 @@
+"""
+Streaming file downloads with conditional, range and pre-compressed responses.
+
+``prepare_download_variants`` reads a file once. It computes the SHA-256
+content hash and writes a gzip copy next to the file (``<file>.gz``). The hash
+goes to ``<file>.sha256`` with the size and mtime it was computed for, so later
+downloads only need to ``stat`` the file.
+
+``file_download_response`` serves a prepared file:
+
+* ``If-None-Match`` matching the content hash ETag: ``304`` with no body.
+* ``Range: bytes=...`` (a single range): ``206`` with that slice streamed from
+  disk, or ``416`` when it is outside the file. With ``If-Range``, the range
+  only applies while the ETag still matches. Multi-range requests get the
+  whole file.
+* ``Accept-Encoding: gzip``: the ``.gz`` copy with ``Content-Encoding: gzip``.
+* Otherwise the file itself.
+
+Bodies are always streamed in chunks, never loaded into memory.
+"""
+from typing import Iterator, NamedTuple, Optional, Tuple
+from urllib.parse import quote
+import gzip
+import hashlib
+import os
+import re
+import tempfile
+
+from starlette.requests import Request # type: ignore
+from starlette.responses import FileResponse, Response, StreamingResponse # type: ignore
+
+CHUNK_SIZE = 1024 * 1024
+GZIP_LEVEL = 6
+
+# Downloads are access-controlled: browsers may keep them but must revalidate (cheap with the ETag)
+CACHE_CONTROL = "private, no-cache"
+
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+class DownloadVariants(NamedTuple):
+    sha256: str
+    size: int
+    gzip_path: Optional[str]
+
+
+def _sidecar_path(path: str) -> str:
+    return f"{path}.sha256"
+
+
+def _read_sidecar(path: str, stat_result: os.stat_result) -> Optional[str]:
+    """Stored hash if it was computed for the file as it is now"""
+    try:
+        with open(_sidecar_path(path)) as f:
+            digest, size, mtime_ns = f.read().split()
+    except (OSError, ValueError):
+        return None
+    if int(size) != stat_result.st_size or int(mtime_ns) != stat_result.st_mtime_ns:
+        return None
+    return digest
+
+
+def _write_atomically(target: str, write) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, target)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def prepare_download_variants(path: str) -> DownloadVariants:
+    """Content hash and gzip copy of ``path``, (re)built in one pass when the file changed"""
+    stat_result = os.stat(path)
+    gzip_path = f"{path}.gz"
+    digest = _read_sidecar(path, stat_result)
+    if digest is not None and os.path.exists(gzip_path):
+        return DownloadVariants(digest, stat_result.st_size, gzip_path)
+
+    sha256 = hashlib.sha256()
+
+    def write_gzip(raw):
+        # mtime=0 keeps the compressed bytes (and so the gzip ETag) stable across rebuilds
+        with open(path, "rb") as source, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=GZIP_LEVEL, mtime=0) as target:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                sha256.update(chunk)
+                target.write(chunk)
+
+    _write_atomically(gzip_path, write_gzip)
+    digest = sha256.hexdigest()
+    # Written last: a valid sidecar implies an up-to-date gzip copy
+    _write_atomically(
+        _sidecar_path(path),
+        lambda f: f.write(f"{digest} {stat_result.st_size} {stat_result.st_mtime_ns}\n".encode())
+    )
+    return DownloadVariants(digest, stat_result.st_size, gzip_path)
+
+
+def _accepts_gzip(request: Request) -> bool:
+    for part in request.headers.get("accept-encoding", "").split(","):
+        token, _, params = part.partition(";")
+        if token.strip().lower() not in ("gzip", "*"):
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        return quality > 0
+    return False
+
+
+def _etag_matches(header: str, etags: Tuple[str, ...]) -> bool:
+    if header.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return any(etag in candidates for etag in etags)
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    ``(start, end)`` (inclusive) for a single satisfiable byte range. Raises ``ValueError``
+    for an unsatisfiable one and returns None when the header should be ignored.
+    """
+    match = RANGE_PATTERN.fullmatch(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("range not satisfiable")
+    return start, end
+
+
+def _iter_file_range(path: str, start: int, length: int) -> Iterator[bytes]:
+    # A plain generator: Starlette iterates it in the threadpool
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _content_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def file_download_response(request: Request, path: str, filename: str, media_type: str) -> Response:
+    """Response for downloading ``path`` (see the module docstring for the cases handled)"""
+    variants = prepare_download_variants(path)
+    etag = f'"{variants.sha256[:32]}"'
+    gzip_etag = f'"{variants.sha256[:32]}-gzip"'
+    headers = {
+        "accept-ranges": "bytes",
+        "cache-control": CACHE_CONTROL,
+        "vary": "Accept-Encoding",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, (etag, gzip_etag)):
+        current = gzip_etag if _etag_matches(if_none_match, (gzip_etag,)) else etag
+        return Response(status_code=304, headers={**headers, "etag": current})
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        try:
+            byte_range = _parse_range(range_header, variants.size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "content-range": f"bytes */{variants.size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            length = end - start + 1
+            return StreamingResponse(
+                _iter_file_range(path, start, length),
+                status_code=206,
+                media_type=media_type,
+                headers={
+                    **headers,
+                    "etag": etag,
+                    "content-range": f"bytes {start}-{end}/{variants.size}",
+                    "content-length": str(length),
+                    "content-disposition": _content_disposition(filename),
+                },
+            )
+
+    if variants.gzip_path and _accepts_gzip(request):
+        return FileResponse(
+            variants.gzip_path,
+            media_type=media_type,
+            filename=filename,
+            method=request.method,
+            headers={**headers, "etag": gzip_etag, "content-encoding": "gzip"},
+        )
+    return FileResponse(path, media_type=media_type, filename=filename, method=request.method, headers={**headers, "etag": etag})
@@ -0,0 +1,150 @@
+"""
+Catalog search indexes for inventory items.
+
+PostgreSQL: pg_trgm GIN indexes on item_name, sku and description, so the
+existing ``ILIKE '%term%'`` filters are answered from the index.
+SQLite: an external-content FTS5 table using the trigram tokenizer, kept in
+sync with ``inventory_items`` by triggers; substring search becomes a MATCH
+against the shadow table.
+
+Other databases (or SQLite builds without FTS5 or its trigram tokenizer)
+keep the plain ILIKE search. ``create_inventory_search_index`` holds the DDL
+for both the Alembic migration and the startup check.
+"""
+from typing import Dict
+import logging
+
+from sqlalchemy import text # type: ignore[import-untyped]
+from sqlalchemy.engine import Engine, Connection # type: ignore[import-untyped]
+from sqlalchemy.orm import Session # type: ignore[import-untyped]
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "inventory_items_fts"
+
+# The trigram tokenizer only matches terms of at least three characters
+FTS_MIN_TERM_LENGTH = 3
+
+SEARCH_LIKE = "like"
+SEARCH_TRIGRAM = "trigram"
+SEARCH_FTS5 = "fts5"
+
+KEYSET_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS ix_inventory_items_created_at_id ON inventory_items (created_at DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_inventory_items_created_by_id_created_at_id ON inventory_items (created_by_id, created_at DESC, id DESC)",
+)
+
+POSTGRES_TRIGRAM_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS ix_inventory_items_item_name_trgm ON inventory_items USING gin (item_name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_inventory_items_sku_trgm ON inventory_items USING gin (sku gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_inventory_items_description_trgm ON inventory_items USING gin (description gin_trgm_ops)",
+)
+
+SQLITE_FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "item_name, sku, description, content='inventory_items', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON inventory_items BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, item_name, sku, description) VALUES (new.id, new.item_name, new.sku, new.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON inventory_items BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, item_name, sku, description) VALUES ('delete', old.id, old.item_name, old.sku, old.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF item_name, sku, description ON inventory_items BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, item_name, sku, description) VALUES ('delete', old.id, old.item_name, old.sku, old.description); "
+    f"INSERT INTO {FTS_TABLE}(rowid, item_name, sku, description) VALUES (new.id, new.item_name, new.sku, new.description); END",
+)
+
+SQLITE_FTS_DROP_DDL = (
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+)
+
+_backend_cache: Dict[str, str] = {}
+
+
+def _sqlite_has_trigram(conn: Connection) -> bool:
+    """Whether this SQLite build has FTS5 with the trigram tokenizer (3.34+, FTS5 compiled in or loaded)."""
+    probe = f"temp.{FTS_TABLE}_probe"
+    try:
+        conn.execute(text(f"CREATE VIRTUAL TABLE {probe} USING fts5(x, tokenize='trigram')"))
+    except Exception:
+        return False
+    conn.execute(text(f"DROP TABLE {probe}"))
+    return True
+
+
+def _sqlite_has_fts_table(conn: Connection) -> bool:
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE}
+    ).first() is not None
+
+
+def create_inventory_search_index(conn: Connection) -> None:
+    """Create the keyset and search indexes on ``conn`` if missing (idempotent)."""
+    for ddl in KEYSET_INDEXES:
+        conn.execute(text(ddl))
+
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for ddl in POSTGRES_TRIGRAM_INDEXES:
+            conn.execute(text(ddl))
+    elif dialect == "sqlite":
+        if not _sqlite_has_trigram(conn):
+            logger.info("SQLite build lacks FTS5 or its trigram tokenizer; inventory search uses LIKE")
+            return
+        created = not _sqlite_has_fts_table(conn)
+        for ddl in SQLITE_FTS_DDL:
+            conn.execute(text(ddl))
+        if created:
+            # Index rows that existed before the shadow table
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def drop_inventory_search_index(conn: Connection) -> None:
+    """Drop everything ``create_inventory_search_index`` creates."""
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        for col in ("description", "sku", "item_name"):
+            conn.execute(text(f"DROP INDEX IF EXISTS ix_inventory_items_{col}_trgm"))
+    elif dialect == "sqlite":
+        for ddl in SQLITE_FTS_DROP_DDL:
+            conn.execute(text(ddl))
+
+    conn.execute(text("DROP INDEX IF EXISTS ix_inventory_items_created_by_id_created_at_id"))
+    conn.execute(text("DROP INDEX IF EXISTS ix_inventory_items_created_at_id"))
+
+
+def ensure_inventory_search_index(engine: Engine) -> None:
+    """Create the keyset and search indexes if missing (safe to run at startup)."""
+    try:
+        with engine.begin() as conn:
+            create_inventory_search_index(conn)
+    except Exception as e:
+        logger.warning(f"Could not create inventory search index: {e}")
+    finally:
+        _backend_cache.pop(str(engine.url), None)
+
+
+def inventory_search_backend(db: Session) -> str:
+    """Which search strategy the session's database supports (cached per database URL)."""
+    engine = db.get_bind()
+    key = str(engine.url)
+    backend = _backend_cache.get(key)
+    if backend is None:
+        dialect = engine.dialect.name
+        if dialect == "postgresql":
+            backend = SEARCH_TRIGRAM
+        elif dialect == "sqlite":
+            # Probe through the session's connection: with StaticPool a second checkout would share it
+            backend = SEARCH_FTS5 if _sqlite_has_fts_table(db.connection()) else SEARCH_LIKE
+        else:
+            backend = SEARCH_LIKE
+        _backend_cache[key] = backend
+    return backend
+
+
+def fts_phrase(term: str) -> str:
+    """Quote a user search term as a single FTS5 phrase (substring match under the trigram tokenizer)."""
+    return '"' + term.replace('"', '""') + '"'
@@ -0,0 +1,164 @@
+"""
+Micro-benchmark: the old stacked ``@app.middleware("http")`` layers against the
+single pure-ASGI ``RequestContextMiddleware``.
+
+Both apps have the same ``CORSMiddleware`` configuration and two routes. One is a
+``/health`` check and the other is a typical list endpoint that serializes 100 rows
+through a response model. Requests go in-process over ``httpx.ASGITransport``, so the
+numbers measure framework and middleware overhead, not the network or the database.
+
+    python -m app.utils.middleware_benchmark [--requests 2000] [--concurrency 20]
+"""
+from typing import List, Dict, Callable
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+import httpx # type: ignore
+from fastapi import FastAPI, Request # type: ignore
+from fastapi.middleware.cors import CORSMiddleware # type: ignore
+from fastapi.responses import JSONResponse # type: ignore
+from pydantic import BaseModel
+
+from ..core.middleware import RequestContextMiddleware
+
+ORIGIN = "http://localhost:3000"
+ROUTES = ("/health", "/api/v1/items")
+
+bench_logger = logging.getLogger("app.benchmark")
+
+
+class Item(BaseModel):
+    id: int
+    item_name: str
+    sku: str
+    quantity: int
+    selling_price: float
+    created_at: datetime
+
+
+ITEMS = [
+    Item(id=i, item_name=f"Item {i}", sku=f"SKU-{i:05d}", quantity=i % 40, selling_price=9.99 + i, created_at=datetime(2026, 1, 1))
+    for i in range(100)
+]
+
+
+def _base_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[ORIGIN],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Requires-2FA", "Content-Disposition", "*"],
+    )
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.get("/api/v1/items", response_model=List[Item])
+    async def list_items():
+        return ITEMS
+
+    return app
+
+
+def build_legacy_app() -> FastAPI:
+    """The previous stack: three ``BaseHTTPMiddleware`` functions as they were in ``app.main``"""
+    app = _base_app()
+    allowed_origins = [ORIGIN]
+
+    @app.middleware("http")
+    async def add_cors_headers(request: Request, call_next):
+        origin = request.headers.get("Origin")
+        if request.method == "OPTIONS":
+            response = JSONResponse(content={}, status_code=200)
+            if origin and origin in allowed_origins:
+                response.headers["Access-Control-Allow-Origin"] = origin
+                response.headers["Access-Control-Allow-Credentials"] = "true"
+            return response
+        response = await call_next(request)
+        if origin and origin in allowed_origins:
+            response.headers["Access-Control-Allow-Origin"] = origin
+            response.headers["Access-Control-Allow-Credentials"] = "true"
+            response.headers["Access-Control-Expose-Headers"] = "*"
+        return response
+
+    @app.middleware("http")
+    async def add_process_time_header(request: Request, call_next):
+        start_time = time.time()
+        response = await call_next(request)
+        response.headers["X-Process-Time"] = str(time.time() - start_time)
+        return response
+
+    @app.middleware("http")
+    async def log_requests(request: Request, call_next):
+        start_time = time.time()
+        bench_logger.info(f"Request: {request.method} {request.url}")
+        response = await call_next(request)
+        bench_logger.info(f"Response: {response.status_code} in {time.time() - start_time:.4f}s")
+        return response
+
+    return app
+
+
+def build_asgi_app() -> FastAPI:
+    app = _base_app()
+    app.add_middleware(RequestContextMiddleware, allowed_origins=[ORIGIN])
+    return app
+
+
+async def _requests_per_second(app: FastAPI, path: str, total: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver", headers={"Origin": ORIGIN}) as client:
+        # Warm up route resolution and model serialization
+        for _ in range(20):
+            (await client.get(path)).raise_for_status()
+
+        remaining = total
+
+        async def worker() -> None:
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                (await client.get(path)).raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return total / (time.perf_counter() - started)
+
+
+async def run(total: int, concurrency: int) -> Dict[str, Dict[str, float]]:
+    builders: Dict[str, Callable[[], FastAPI]] = {"legacy": build_legacy_app, "asgi": build_asgi_app}
+    results: Dict[str, Dict[str, float]] = {path: {} for path in ROUTES}
+    for path in ROUTES:
+        for name, build in builders.items():
+            results[path][name] = await _requests_per_second(build(), path, total, concurrency)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--with-logging", action="store_true", help="Emit the request log lines (off: measure middleware only)")
+    args = parser.parse_args()
+
+    level = logging.INFO if args.with_logging else logging.WARNING
+    logging.basicConfig(level=level)
+    for name in ("app.benchmark", "app.core.middleware"):
+        logging.getLogger(name).setLevel(level)
+
+    results = asyncio.run(run(args.requests, args.concurrency))
+    for path, by_stack in results.items():
+        legacy, asgi = by_stack["legacy"], by_stack["asgi"]
+        print(f"{path:<16} legacy {legacy:9.1f} req/s   asgi {asgi:9.1f} req/s   ({asgi / legacy:.2f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
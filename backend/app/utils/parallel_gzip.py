@@ -0,0 +1,103 @@
+"""
+Multi-threaded gzip compression of a byte stream.
+
+The input is cut into fixed-size blocks. Each block is compressed as its own
+gzip member on a thread pool (zlib releases the GIL, so the blocks compress on
+all cores), and the members are written out in order. Concatenated gzip members
+form a valid gzip file (RFC 1952), so ``gunzip``, ``gzip.open`` and
+``GzipDecompressor``-style readers decompress the output unchanged, as with
+``pigz``.
+
+Memory is bounded to about ``2 * threads`` blocks, so callers can pipe any
+stream of unknown length through ``ParallelGzipWriter``.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO, Deque, Optional
+from collections import deque
+import gzip
+import hashlib
+import os
+
+BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def _compress_block(block: bytes, level: int) -> bytes:
+    # mtime=0 keeps the output byte-identical for identical input
+    return gzip.compress(block, compresslevel=level, mtime=0)
+
+
+class ParallelGzipWriter:
+    """
+    Write-only file object that gzip-compresses on ``threads`` threads into ``raw``.
+
+    ``raw_size`` counts the uncompressed bytes written. ``size`` and ``sha256``
+    describe the compressed output. ``close()`` flushes the last block but does
+    not close ``raw``.
+    """
+
+    def __init__(self, raw: BinaryIO, level: int = 6, threads: Optional[int] = None, block_size: int = BLOCK_SIZE):
+        self.raw = raw
+        self.level = level
+        self.threads = max(1, threads or os.cpu_count() or 1)
+        self.block_size = block_size
+        self.raw_size = 0
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._buffer = bytearray()
+        self._pending: Deque[Future] = deque()
+        self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="gzip")
+        self.closed = False
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError("write to closed ParallelGzipWriter")
+        self._buffer += data
+        self.raw_size += len(data)
+        while len(self._buffer) >= self.block_size:
+            block = bytes(self._buffer[:self.block_size])
+            del self._buffer[:self.block_size]
+            self._submit(block)
+        return len(data)
+
+    def _submit(self, block: bytes) -> None:
+        self._pending.append(self._executor.submit(_compress_block, block, self.level))
+        # Back-pressure: wait for the oldest block once enough are in flight
+        while len(self._pending) > 2 * self.threads:
+            self._write_out(self._pending.popleft())
+
+    def _write_out(self, future: Future) -> None:
+        member = future.result()
+        self.raw.write(member)
+        self._sha256.update(member)
+        self.size += len(member)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            if self._buffer or self.raw_size == 0:
+                # An empty input still needs one (empty) member to be valid gzip
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            while self._pending:
+                self._write_out(self._pending.popleft())
+        finally:
+            self.closed = True
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "ParallelGzipWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.closed = True
+            self._executor.shutdown(wait=False, cancel_futures=True)
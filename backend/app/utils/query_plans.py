@@ -0,0 +1,162 @@
+"""
+EXPLAIN checks for the hot CRUD queries.
+
+``hot_queries()`` calls the real CRUD methods behind list views, dashboards and
+approval queues. ``explain_query`` captures the SQL a call emits and EXPLAINs
+it, reporting every table read with a full sequential scan.
+``tests/test_query_plans.py`` runs the checks against a seeded database, and
+``python -m app.utils.query_plans`` against the configured one.
+"""
+from typing import Any, Callable, Dict, Iterator, List, Set, Tuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import json
+
+from sqlalchemy import event # type: ignore[import-untyped]
+from sqlalchemy.engine import Connection # type: ignore[import-untyped]
+from sqlalchemy.orm import Session # type: ignore[import-untyped]
+
+# Representative parameters for the hot queries
+PERIOD_END = datetime(2026, 1, 31)
+PERIOD_START = PERIOD_END - timedelta(days=30)
+USER_ID = 1
+RESOURCE_ID = 1
+
+
+def hot_queries() -> List[Tuple[str, Callable[[Session], Any]]]:
+    """(name, call) pairs; each call runs one CRUD read method with representative parameters."""
+    from .. import crud
+
+    queries: List[Tuple[str, Callable[[Session], Any]]] = []
+    for name, crud_entry in (("revenue", crud.revenue), ("expense", crud.expense)):
+        queries += [
+            (f"{name}.get_by_user", lambda db, c=crud_entry: c.get_by_user(db, user_id=USER_ID)),
+            (f"{name}.get_total_by_period", lambda db, c=crud_entry: c.get_total_by_period(db, PERIOD_START, PERIOD_END)),
+            (f"{name}.get_summary_by_category", lambda db, c=crud_entry: c.get_summary_by_category(db, PERIOD_START, PERIOD_END)),
+            (f"{name}.get_pending_approval", lambda db, c=crud_entry: c.get_pending_approval(db)),
+        ]
+
+    queries += [
+        ("notification.get_by_user", lambda db: crud.notification.get_by_user(db, user_id=USER_ID)),
+        ("notification.get_unread", lambda db: crud.notification.get_unread(db, user_id=USER_ID)),
+        ("notification.get_unread_count", lambda db: crud.notification.get_unread_count(db, user_id=USER_ID)),
+        ("audit_log.get_multi", lambda db: crud.audit_log.get_multi(db)),
+        ("audit_log.get_by_user", lambda db: crud.audit_log.get_by_user(db, user_id=USER_ID)),
+        ("audit_log.get_by_resource", lambda db: crud.audit_log.get_by_resource(db, "expense", RESOURCE_ID)),
+        ("approval.get_pending", lambda db: crud.approval.get_pending(db, approver_id=USER_ID)),
+        ("approval.get_by_revenue_entry", lambda db: crud.approval.get_by_revenue_entry(db, RESOURCE_ID)),
+    ]
+    return queries
+
+
+@contextmanager
+def captured_selects(connection: Connection) -> Iterator[List[Tuple[str, Any]]]:
+    """Collect the (statement, parameters) of every SELECT executed on ``connection`` inside the block."""
+    statements: List[Tuple[str, Any]] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(connection, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(connection, "before_cursor_execute", record)
+
+
+def _postgres_seq_scans(plan: Dict[str, Any]) -> List[str]:
+    tables = []
+    if plan.get("Node Type") == "Seq Scan":
+        tables.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        tables.extend(_postgres_seq_scans(child))
+    return tables
+
+
+def _sqlite_full_scans(rows, tables: Set[str]) -> List[str]:
+    scans = []
+    for row in rows:
+        detail = row[-1]
+        # "SCAN t" is a full table scan; "SCAN t USING [COVERING] INDEX ..." walks an index.
+        # Subqueries show up as "SCAN <alias>" and are not tables.
+        if detail.startswith("SCAN ") and "USING" not in detail and detail.split()[1] in tables:
+            scans.append(detail.split()[1])
+    return scans
+
+
+def _explain(connection: Connection, statement: str, parameters: Any) -> Tuple[List[str], str]:
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return _postgres_seq_scans(plan[0]["Plan"]), json.dumps(plan[0]["Plan"])
+    if dialect == "sqlite":
+        tables = set(connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'").scalars())
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        return _sqlite_full_scans(rows, tables), "\n".join(row[-1] for row in rows)
+    raise ValueError(f"Query plan checks are not supported on {dialect}")
+
+
+def explain_query(db: Session, call: Callable[[Session], Any]) -> Dict[str, Any]:
+    """
+    Run ``call(db)`` and EXPLAIN every SELECT it issues.
+
+    On PostgreSQL this sets ``enable_seqscan = off`` for the caller's transaction,
+    so a sequential scan in the plan means no usable index exists (rather than
+    the planner preferring a scan on a small table). Callers roll back afterwards.
+    """
+    connection = db.connection()
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+
+    with captured_selects(connection) as statements:
+        call(db)
+
+    scans: List[str] = []
+    plans = []
+    for statement, parameters in statements:
+        statement_scans, plan = _explain(connection, statement, parameters)
+        scans.extend(t for t in statement_scans if t)
+        plans.append(plan)
+    return {
+        "statements": len(statements),
+        "sequential_scans": sorted(set(scans)),
+        "ok": not scans,
+        "plan": "\n".join(plans),
+    }
+
+
+def explain_hot_queries(db: Session) -> List[Dict[str, Any]]:
+    """``explain_query`` for each of ``hot_queries()``, in one rolled-back transaction."""
+    results = []
+    try:
+        for name, call in hot_queries():
+            results.append({"query": name, **explain_query(db, call)})
+    finally:
+        db.rollback()
+    return results
+
+
+def main() -> int:
+    """Print a plan report and return a non-zero exit code if any hot query falls back to a sequential scan."""
+    from ..core.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        results = explain_hot_queries(db)
+    finally:
+        db.close()
+
+    failures = [r for r in results if not r["ok"]]
+    for r in results:
+        status = "OK  " if r["ok"] else "SCAN"
+        detail = f" ({', '.join(r['sequential_scans'])})" if r["sequential_scans"] else ""
+        print(f"[{status}] {r['query']}{detail}")
+    print(f"{len(results) - len(failures)}/{len(results)} hot queries use an index")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
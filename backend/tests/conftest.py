@@ -0,0 +1,126 @@
+"""
+Fixtures for database-backed tests.
+
+``engine`` builds the schema from the models on ``TEST_DATABASE_URL`` (an
+in-memory SQLite database by default), adds the hot-path indexes from their
+Alembic migration and seeds users, entries, notifications, audit logs and
+approval workflows. ``db`` is a session on that engine, rolled back after each test.
+"""
+from datetime import timedelta
+from pathlib import Path
+import importlib.util
+import os
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app import crud  # noqa: F401  (imports the models the CRUD modules query)
+from app.core.database import Base
+from app.utils.query_plans import PERIOD_END
+
+HOT_PATH_INDEXES_MIGRATION = (
+    Path(__file__).resolve().parents[1] / "alembic" / "versions" / "c3a9f1d27e64_add_hot_path_composite_indexes.py"
+)
+
+SEED_USERS = 20
+SEED_ROWS_PER_USER = 50
+
+
+def _upgrade_with(connection, migration_path: Path) -> None:
+    """Run one migration's ``upgrade()`` on ``connection`` without the rest of the revision chain"""
+    spec = importlib.util.spec_from_file_location(migration_path.stem, migration_path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    with Operations.context(MigrationContext.configure(connection)):
+        migration.upgrade()
+
+
+def _seed(connection) -> None:
+    tables = Base.metadata.tables
+    connection.execute(insert(tables["users"]), [
+        {"id": i, "email": f"user{i}@example.com", "username": f"user{i}", "hashed_password": "x", "is_active": True}
+        for i in range(1, SEED_USERS + 1)
+    ])
+
+    for table in ("revenue_entries", "expense_entries"):
+        connection.execute(insert(tables[table]), [
+            {
+                "title": f"Entry {user_id}-{n}",
+                "amount": float(n),
+                "date": PERIOD_END - timedelta(days=n),
+                "created_by_id": user_id,
+                "is_approved": n % 4 != 0,
+                "created_at": PERIOD_END - timedelta(days=n),
+            }
+            for user_id in range(1, SEED_USERS + 1)
+            for n in range(SEED_ROWS_PER_USER)
+        ])
+
+    connection.execute(insert(tables["notifications"]), [
+        {
+            "user_id": user_id,
+            "title": "Notice",
+            "message": "Seeded notification",
+            "type": "SYSTEM_ALERT",
+            "is_read": n % 3 == 0,
+            "created_at": PERIOD_END - timedelta(hours=n),
+        }
+        for user_id in range(1, SEED_USERS + 1)
+        for n in range(SEED_ROWS_PER_USER)
+    ])
+
+    connection.execute(insert(tables["audit_logs"]), [
+        {
+            "user_id": user_id,
+            "action": "VIEW",
+            "resource_type": "expense",
+            "resource_id": n + 1,
+            "created_at": PERIOD_END - timedelta(hours=n),
+        }
+        for user_id in range(1, SEED_USERS + 1)
+        for n in range(SEED_ROWS_PER_USER)
+    ])
+
+    connection.execute(insert(tables["approval_workflows"]), [
+        {
+            "title": f"Approve revenue {n + 1}",
+            "type": "REVENUE",
+            "status": "PENDING" if n % 2 else "APPROVED",
+            "requester_id": SEED_USERS,
+            "approver_id": n % SEED_USERS + 1,
+            "revenue_entry_id": n + 1,
+            "created_at": PERIOD_END - timedelta(hours=n),
+        }
+        for n in range(SEED_USERS * SEED_ROWS_PER_USER)
+    ])
+
+
+@pytest.fixture(scope="session")
+def engine():
+    url = os.environ.get("TEST_DATABASE_URL", "sqlite://")
+    if url.startswith("sqlite"):
+        engine = create_engine(url, poolclass=StaticPool, connect_args={"check_same_thread": False})
+    else:
+        engine = create_engine(url)
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        _upgrade_with(connection, HOT_PATH_INDEXES_MIGRATION)
+        _seed(connection)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = Session(bind=engine)
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
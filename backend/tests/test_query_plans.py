@@ -0,0 +1,13 @@
+import pytest
+
+from app.utils.query_plans import explain_query, hot_queries
+
+HOT_QUERIES = hot_queries()
+
+
+@pytest.mark.parametrize("call", [call for _, call in HOT_QUERIES], ids=[name for name, _ in HOT_QUERIES])
+def test_hot_query_uses_an_index(db, call):
+    result = explain_query(db, call)
+
+    assert result["statements"] > 0
+    assert result["ok"], f"sequential scan on {', '.join(result['sequential_scans'])}:\n{result['plan']}"